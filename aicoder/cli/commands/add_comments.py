@@ -1,14 +1,21 @@
 import typer
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from aicoder.config import Config
 from aicoder.profiles import profile_loader, ProfileType
-from aicoder.strategies import UDiffStrategy, WholeFileStrategy, SearchReplaceStrategy
-from aicoder.core.processor import improve_file_documentation
+from aicoder.strategies import create_strategy
+from aicoder.core.batch import collect_files, document_file, process_files
+from aicoder.core.chain import FallbackChain
+from aicoder.core.git_changes import collect_changes
+from aicoder.core.manifest import RunManifests
+from aicoder.core.planner import TokenBudget, pin_rules
+from aicoder.core.router import ModelRouter
+from aicoder.llm.rate_limiter import configure_rate_limit
 from aicoder.utils.error_handler import handle_error
 from aicoder.utils.output import print_success
 from aicoder.utils.logger import myLogger
+from aicoder.utils.tracing import span
 
 def add_comments_command(
     profile: str = typer.Option(
@@ -23,14 +30,62 @@ def add_comments_command(
     ),
     strategy: Optional[str] = typer.Option(
         None, "--strategy",
-        help="Strategy for output format: wholefile, udiff, or searchreplace (overrides profile setting)",
+        help="Strategy for output format: wholefile, udiff, searchreplace or docblock (overrides profile setting)",
         show_default=False
     ),
     verbose: bool = typer.Option(
         False, "--verbose", "-v",
         help="Enable verbose output"
     ),
-    file_path: Path = typer.Argument(..., help="Path to PHP or Twig file to document", exists=True)
+    stream: bool = typer.Option(
+        Config.LLM_STREAMING, "--stream/--no-stream",
+        help="Stream the LLM response and apply changes while it is generated"
+    ),
+    no_cache: bool = typer.Option(
+        False, "--no-cache",
+        help="Do not read or write the persistent LLM response cache"
+    ),
+    force: bool = typer.Option(
+        False, "--force",
+        help="Process files even if the run manifest says they are unchanged or keep failing"
+    ),
+    no_manifest: bool = typer.Option(
+        False, "--no-manifest",
+        help="Neither read nor update the per-repository run manifest"
+    ),
+    max_tokens_total: Optional[int] = typer.Option(
+        None, "--max-tokens-total",
+        help="Stop sending files once this many estimated tokens (prompt + completion) are used",
+        min=1, show_default=False
+    ),
+    max_tokens_per_file: Optional[int] = typer.Option(
+        None, "--max-tokens-per-file",
+        help="Skip files estimated to need more tokens than this (prompt + completion)",
+        min=1, show_default=False
+    ),
+    jobs: int = typer.Option(
+        Config.DEFAULT_JOBS, "--jobs", "-j",
+        help="Number of files to process concurrently when documenting multiple files",
+        min=1, show_default=True
+    ),
+    trace_out: Optional[Path] = typer.Option(
+        None, "--trace-out",
+        help="Append timing spans of every stage (OTLP/JSON, one span per line) to this file",
+        dir_okay=False, show_default=False
+    ),
+    since: Optional[str] = typer.Option(
+        None, "--since",
+        help="Only document the functions, classes and Twig blocks changed since this git revision",
+        show_default=False
+    ),
+    staged: bool = typer.Option(
+        False, "--staged",
+        help="Only document the functions, classes and Twig blocks of files with staged changes"
+    ),
+    file_paths: Optional[List[str]] = typer.Argument(
+        None, help="PHP or Twig files, directories or glob patterns to document (default with --since/--staged: .)",
+        show_default=False
+    )
 ):
     """
     Add PHPDoc comments and section markers to PHP and Twig files
@@ -40,47 +95,109 @@ def add_comments_command(
     - Generates TwigDoc comments for Twig templates
     - Adds section separators
     - Preserves original code structure
+    - Accepts directories and glob patterns, processing files concurrently (--jobs)
+    - Documents only what changed in git with --since <rev> or --staged
     """
     try:
         myLogger.set_verbose(verbose)
-        myLogger.info(f"Processing file {file_path.resolve()}...")
+        Config.LLM_STREAMING = stream
+        if no_cache:
+            Config.LLM_CACHE_ENABLED = False
+        if trace_out:
+            Config.TRACE_OUT = trace_out
+        if since and staged:
+            raise ValueError("--since and --staged can't be combined")
+        changes = collect_changes(since=since, staged=staged) if since or staged else None
+        if not file_paths:
+            if changes is None:
+                raise ValueError("No files given")
+            file_paths = ["."]
+        files = collect_files(file_paths)
+        if not files:
+            raise ValueError(f"No PHP or Twig files found in: {', '.join(file_paths)}")
+        if changes is not None:
+            files = [path for path in files if path.resolve() in changes]
+            if not files:
+                myLogger.info(f"No PHP or Twig files changed {'in the index' if staged else f'since {since}'}")
+                return
         
-        # Load profile settings
-        profile_settings = profile_loader.get_profile(ProfileType.COMMENTER, profile)
-        if not profile_settings:
-            # Get available profiles with their details
-            available_profiles = [
-                f"- {name} (model: {details['model']}, strategy: {details['strategy']})"
-                for name, details in profile_loader.profiles[ProfileType.COMMENTER].items()
-            ]
-            raise ValueError(
-                f"Profile '{profile}' not found. Available profiles:\n" +
-                "\n".join(available_profiles)
-            )
+        with span("profile.resolve", profile=profile) as resolved:
+            # Load profile settings
+            profile_settings = profile_loader.get_profile(ProfileType.COMMENTER, profile)
+            if not profile_settings:
+                # Get available profiles with their details
+                available_profiles = [
+                    f"- {name} (model: {details['model']}, strategy: {details['strategy']})"
+                    for name, details in profile_loader.profiles[ProfileType.COMMENTER].items()
+                ]
+                raise ValueError(
+                    f"Profile '{profile}' not found. Available profiles:\n" +
+                    "\n".join(available_profiles)
+                )
         
-        # Override profile settings with CLI arguments if provided
-        selected_model = model or profile_settings["model"]
-        selected_strategy = strategy or profile_settings["strategy"]
+            # Override profile settings with CLI arguments if provided
+            selected_model = model or profile_settings["model"]
+            selected_strategy = strategy or profile_settings["strategy"]
         
-        myLogger.debug(f"Using profile: {profile}")
-        myLogger.debug(f"Model: {selected_model}")
-        myLogger.debug(f"Strategy: {selected_strategy}")
+            myLogger.debug(f"Using profile: {profile}")
+            myLogger.debug(f"Model: {selected_model}")
+            myLogger.debug(f"Strategy: {selected_strategy}")
+            # --model pins every file to one model; otherwise a `pool` lets the router pick per file
+            router = None if model else ModelRouter.from_profile(profile_settings)
+            for pool_model in (router.pool if router else [selected_model]):
+                configure_rate_limit(pool_model, profile_settings.get("rate_limit"))
+            if router:
+                myLogger.debug(f"Model pool: {', '.join(router.pool)}")
+            if profile_settings.get("provider"):
+                Config.OPENROUTER_PROVIDER_PREFERENCES = profile_settings["provider"]
+            rules = pin_rules(profile_settings.get("rules"), model_pinned=bool(model), strategy_pinned=bool(strategy))
+            # --model/--strategy pin every file to one model/strategy pair
+            chain = None if model or strategy else FallbackChain.from_profile(profile_settings)
+            if chain:
+                myLogger.debug(f"Fallback chain: {', '.join(f'{e.model} ({e.strategy})' for e in chain.entries)}")
+            resolved.set(model=selected_model, strategy=selected_strategy)
+        budget = None
+        if max_tokens_total or max_tokens_per_file:
+            budget = TokenBudget(max_tokens_total, max_tokens_per_file)
         
         # Select strategy based on strategy parameter
-        if selected_strategy.lower() == "searchreplace":
-            strategy_obj = SearchReplaceStrategy()
-        elif selected_strategy.lower() == "udiff":
-            strategy_obj = UDiffStrategy()
-        elif selected_strategy.lower() == "wholefile":
-            strategy_obj = WholeFileStrategy()
-        else:
-            raise ValueError(f"Invalid strategy: {selected_strategy}. Choose from: wholefile, udiff, searchreplace")
-        
+        strategy_obj = create_strategy(selected_strategy)
         myLogger.debug(f"Using strategy: {strategy_obj.__class__.__name__}")
-        myLogger.info(f"Sending request to LLM {selected_model}...")
-        
-        improve_file_documentation(file_path, model=selected_model, strategy=strategy_obj)
-        print_success(f"\n✅ Successfully updated documentation in [bold]{file_path}[/bold]")
-            
+
+        manifest = None
+        if Config.MANIFEST_ENABLED and not no_manifest:
+            # each file's outcome goes to the manifest of its own repository
+            manifest = RunManifests(files)
+
+        if len(files) > 1:
+            using = f"models routed from {', '.join(router.pool)}" if router else f"LLM {selected_model}"
+            myLogger.info(f"Processing {len(files):,} files with {jobs} parallel jobs using {using}...")
+            results = process_files(files, model=selected_model, strategy_name=selected_strategy, jobs=jobs,
+                                    profile=profile, manifest=manifest, force=force, rules=rules, budget=budget,
+                                    chain=chain, router=router, changes=changes)
+            if not all(result.success for result in results):
+                raise typer.Exit(1)
+            return
+
+        file_path = files[0]
+        myLogger.info(f"Processing file {file_path.resolve()}...")
+        if not router:
+            myLogger.info(f"Sending request to LLM {selected_model}...")
+
+        result = document_file(file_path, model=selected_model, strategy_name=selected_strategy,
+                               profile=profile, manifest=manifest, force=force, rules=rules, budget=budget,
+                               chain=chain, router=router,
+                               changed_lines=None if changes is None else changes[file_path.resolve()])
+        if manifest:
+            manifest.save()
+        if result.skipped:
+            myLogger.info(f"Skipped {file_path}: {result.skip_reason}")
+        elif not result.success:
+            raise result.exception
+        else:
+            print_success(f"\n✅ Successfully updated documentation in [bold]{file_path}[/bold]")
+
+    except typer.Exit:
+        raise
     except Exception as e:
         handle_error(e)
@@ -3,7 +3,6 @@ from pathlib import Path
 from rich.console import Console
 from rich.syntax import Syntax
 from typing import Optional
-import yaml
 
 from aicoder.cli.util import format_bytes
 from aicoder.llm.api_client import LLMClient
@@ -14,17 +13,12 @@ from aicoder.utils.logger import myLogger
 console = Console()
 
 def load_prompts():
-    """Load prompts from analyzer-prompts.yaml"""
-    prompts_path = Path(__file__).resolve().parent.parent.parent.parent / "config" / "profiles" / "analyzer-prompts.yaml"
-    try:
-        with open(prompts_path) as f:
-            prompts = yaml.safe_load(f)["prompts"]
-            if "default" not in prompts:
-                raise ValueError("Default prompt not found in analyzer-prompts.yaml")
-            return prompts
-    except Exception as e:
-        console.print(f"[red]Error:[/red] Could not load prompts: {str(e)}")
+    """Prompts from analyzer-prompts.yaml (compiled with the rest of the configuration)"""
+    prompts = profile_loader.analyzer_prompts
+    if "default" not in prompts:
+        console.print("[red]Error:[/red] Could not load prompts: Default prompt not found in analyzer-prompts.yaml")
         raise typer.Exit(1)
+    return prompts
 
 def analyze_command(
     file: Path = typer.Argument(..., help="File to analyze"),
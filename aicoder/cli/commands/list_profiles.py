@@ -13,13 +13,16 @@ def list_profiles_command():
     table.add_column("Profile", style="cyan")
     table.add_column("Model", style="green")
     table.add_column("Strategy", style="magenta")
+    table.add_column("Fallback chain", style="yellow")
     
     commenter_profiles = profile_loader.profiles[ProfileType.COMMENTER]
     for profile_name, profile_data in commenter_profiles.items():
+        chain = profile_data.get("chain") or []
         table.add_row(
             profile_name,
-            profile_data.get("model", "N/A"),
-            profile_data.get("strategy", "N/A")
+            profile_data.get("model") or ", ".join(profile_data.get("pool") or []) or "N/A",
+            profile_data.get("strategy", "N/A"),
+            ", ".join(entry if isinstance(entry, str) else str(entry.get("model")) for entry in chain)
         )
     
     console.print(table)
@@ -0,0 +1,57 @@
+import typer
+from pathlib import Path
+from typing import Optional
+
+from aicoder.llm.mock_server import MockServerSettings, serve
+from aicoder.utils.error_handler import handle_error
+
+
+def mock_server_command(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to listen on"),
+    port: int = typer.Option(8765, "--port", help="Port to listen on", show_default=True),
+    config: Optional[Path] = typer.Option(
+        None, "--config", "-c",
+        help="YAML/JSON file with server settings (field names of MockServerSettings, incl. scripted `responses`)",
+        exists=True, dir_okay=False
+    ),
+    latency: Optional[float] = typer.Option(None, "--latency", help="Seconds until the first token"),
+    latency_jitter: Optional[float] = typer.Option(None, "--latency-jitter", help="Spread of the latency in seconds"),
+    latency_distribution: Optional[str] = typer.Option(
+        None, "--latency-distribution", help="fixed, uniform, normal or exponential"
+    ),
+    tokens_per_second: Optional[float] = typer.Option(None, "--tokens-per-second", help="Generation speed (0 = instant)"),
+    rate_limit_rpm: Optional[int] = typer.Option(None, "--rpm", help="Answer 429 above this many requests per minute"),
+    rate_limit_every: Optional[int] = typer.Option(None, "--429-every", help="Start a burst of 429s after every N requests"),
+    rate_limit_burst: Optional[int] = typer.Option(None, "--429-burst", help="Number of 429 responses per burst"),
+    retry_after: Optional[float] = typer.Option(None, "--retry-after", help="Retry-After of 429 responses in seconds"),
+    server_error_rate: Optional[float] = typer.Option(None, "--error-rate", help="Probability of a 5xx response"),
+    server_error_status: Optional[int] = typer.Option(None, "--error-status", help="Status code of 5xx responses"),
+    truncate_rate: Optional[float] = typer.Option(
+        None, "--truncate-rate", help="Probability of a truncated response (finish_reason=length)"
+    ),
+    seed: Optional[int] = typer.Option(None, "--seed", help="Random seed for reproducible runs"),
+):
+    """
+    Run a local OpenAI/OpenRouter-compatible LLM server for load and failure testing
+
+    Answers /chat/completions (also streamed) without calling any real model: by
+    default the code of the prompt is returned unchanged. Drive any command
+    against it with `aicoder --base-url http://127.0.0.1:8765/v1 ...`; the API key
+    environment variables must be set, but any value works.
+    """
+    try:
+        settings = MockServerSettings.from_file(config) if config else MockServerSettings()
+        overrides = {
+            "latency": latency, "latency_jitter": latency_jitter, "latency_distribution": latency_distribution,
+            "tokens_per_second": tokens_per_second, "rate_limit_rpm": rate_limit_rpm,
+            "rate_limit_every": rate_limit_every, "rate_limit_burst": rate_limit_burst,
+            "retry_after": retry_after, "server_error_rate": server_error_rate,
+            "server_error_status": server_error_status, "truncate_rate": truncate_rate, "seed": seed,
+        }
+        for name, value in overrides.items():
+            if value is not None:
+                setattr(settings, name, value)
+        serve(settings, host, port)
+    except Exception as e:
+        handle_error(e)
+        raise typer.Exit(code=1)
@@ -0,0 +1,117 @@
+import typer
+from typing import List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from aicoder.config import Config
+from aicoder.profiles import profile_loader, ProfileType
+from aicoder.core.batch import collect_files
+from aicoder.core.manifest import RunManifests
+from aicoder.core.planner import pin_rules, plan_file
+from aicoder.core.router import ModelRouter
+from aicoder.utils.error_handler import handle_error
+
+console = Console()
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def plan_command(
+    profile: str = typer.Option(
+        Config.DEFAULT_PROFILE, "--profile", "-p",
+        help="Profile to plan with (model, strategy and rules)",
+        show_default=True
+    ),
+    model: Optional[str] = typer.Option(
+        None, "--model",
+        help="Model to plan with (overrides profile setting)",
+        show_default=False
+    ),
+    strategy: Optional[str] = typer.Option(
+        None, "--strategy",
+        help="Strategy to plan with (overrides profile setting)",
+        show_default=False
+    ),
+    jobs: int = typer.Option(
+        Config.DEFAULT_JOBS, "--jobs", "-j",
+        help="Parallel jobs assumed for the wall-clock estimate",
+        min=1, show_default=True
+    ),
+    no_manifest: bool = typer.Option(
+        False, "--no-manifest",
+        help="Do not mark files the run manifest would skip"
+    ),
+    file_paths: List[str] = typer.Argument(..., help="PHP or Twig files, directories or glob patterns")
+):
+    """
+    Predict tokens and time for documenting files, without calling any LLM
+
+    Shows the model and strategy each file would get (after profile rules),
+    the estimated prompt and completion tokens and the expected duration.
+    """
+    try:
+        files = collect_files(file_paths)
+        if not files:
+            raise ValueError(f"No PHP or Twig files found in: {', '.join(file_paths)}")
+
+        profile_settings = profile_loader.get_profile(ProfileType.COMMENTER, profile)
+        if not profile_settings:
+            raise ValueError(f"Profile '{profile}' not found. Run `aicoder list-profiles` to see available profiles.")
+        selected_model = model or profile_settings["model"]
+        selected_strategy = strategy or profile_settings["strategy"]
+        rules = pin_rules(profile_settings.get("rules"), model_pinned=bool(model), strategy_pinned=bool(strategy))
+        router = None if model else ModelRouter.from_profile(profile_settings)
+        manifest = None if no_manifest or not Config.MANIFEST_ENABLED else RunManifests(files)
+
+        table = Table()
+        table.add_column("File", style="cyan")
+        table.add_column("Lines", justify="right")
+        table.add_column("Comments", justify="right")
+        table.add_column("Model", style="green")
+        table.add_column("Strategy", style="magenta")
+        table.add_column("Requests", justify="right")
+        table.add_column("Prompt tok", justify="right")
+        table.add_column("Output tok", justify="right")
+        table.add_column("Time", justify="right")
+        table.add_column("Note", style="yellow")
+
+        total_input = total_output = 0
+        durations = []
+        for path in files:
+            content = path.read_text()
+            skip_reason = manifest.skip_reason(path, content, profile) if manifest else None
+            plan = plan_file(path, content, selected_model, selected_strategy, rules, router)
+            note = ""
+            if skip_reason:
+                note = f"skipped: {skip_reason}"
+            elif plan.may_be_truncated:
+                note = f"response may exceed {plan.output_limit:,} token limit"
+            if not skip_reason:
+                total_input += plan.input_tokens
+                total_output += plan.output_tokens
+                durations.append(plan.seconds)
+            table.add_row(
+                str(path), f"{plan.lines:,}", f"{plan.comment_density:.0%}", plan.model, plan.strategy,
+                str(plan.requests), f"{plan.input_tokens:,}", f"{plan.output_tokens:,}",
+                _format_duration(plan.seconds), note
+            )
+
+        console.print(table)
+
+        # files run `jobs` at a time: the run takes at least as long as the slowest file
+        wall_clock = max(max(durations, default=0.0), sum(durations) / jobs)
+        console.print(
+            f"\n[bold]{len(durations):,} of {len(files):,} files to process:[/bold] "
+            f"~{total_input:,} prompt + ~{total_output:,} completion tokens, "
+            f"~{_format_duration(wall_clock)} with {jobs} parallel jobs"
+        )
+
+    except Exception as e:
+        handle_error(e)
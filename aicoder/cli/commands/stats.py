@@ -0,0 +1,89 @@
+import typer
+from datetime import datetime
+from typing import Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from aicoder.config import Config
+from aicoder.llm.ledger import RequestLedger, parse_since, summarize
+from aicoder.utils.error_handler import handle_error
+
+console = Console()
+
+GROUP_COLUMNS = ("model", "profile", "strategy", "size_bucket", "file")
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def _format_number(value: Optional[float], spec: str = ".1f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def stats_command(
+    since: Optional[str] = typer.Option(
+        None, "--since",
+        help="Only requests from this far back, e.g. 30m, 12h or 7d (default: all)",
+        show_default=False
+    ),
+    by: str = typer.Option(
+        "model,profile", "--by",
+        help=f"Comma-separated columns to group by ({', '.join(GROUP_COLUMNS)})",
+        show_default=True
+    ),
+):
+    """
+    Report throughput, latency and validation pass rate of past LLM requests
+
+    Reads the request ledger written by add-comments and groups the requests by
+    model and profile (or the --by columns). Latency and tokens/sec only count
+    requests that reached the API; cache hits are listed separately.
+    """
+    try:
+        group_by = [column.strip() for column in by.split(",") if column.strip()]
+        unknown = [column for column in group_by if column not in GROUP_COLUMNS]
+        if unknown or not group_by:
+            raise ValueError(f"Cannot group by '{by}', choose from: {', '.join(GROUP_COLUMNS)}")
+
+        if not Config.LEDGER_PATH.exists():
+            console.print(f"No requests recorded yet ({Config.LEDGER_PATH})")
+            return
+        rows = RequestLedger(Config.LEDGER_PATH).rows(parse_since(since))
+        if not rows:
+            console.print(f"No requests recorded{f' in the last {since}' if since else ''}")
+            return
+
+        table = Table()
+        for column in group_by:
+            table.add_column(column.capitalize(), style="cyan" if column == "model" else "green")
+        for heading in ("Requests", "Cached", "Errors", "Cancelled", "Retries", "Req/min",
+                        "p50", "p95", "p99", "TTFT p50", "Tok/s", "Pass rate"):
+            table.add_column(heading, justify="right")
+
+        for summary in summarize(rows, group_by):
+            table.add_row(
+                *(str(summary[column]) for column in group_by),
+                f"{summary['requests']:,}",
+                f"{summary['cache_hits']:,}",
+                f"{summary['errors']:,}",
+                f"{summary['cancelled']:,}",
+                f"{summary['retries']:,}",
+                _format_number(summary["requests_per_min"]),
+                _format_seconds(summary["p50"]),
+                _format_seconds(summary["p95"]),
+                _format_seconds(summary["p99"]),
+                _format_seconds(summary["ttft_p50"]),
+                _format_number(summary["tokens_per_sec"]),
+                _format_number(summary["pass_rate"], ".0%"),
+            )
+
+        console.print(table)
+        console.print(
+            f"\n[bold]{len(rows):,} requests[/bold] since "
+            f"{datetime.fromtimestamp(rows[0]['started_at']):%Y-%m-%d %H:%M}"
+        )
+
+    except Exception as e:
+        handle_error(e)
@@ -0,0 +1,102 @@
+# ---- Lazy Commands ----
+# File: aicoder/cli/lazy.py
+#
+# Command modules import the LLM client, provider SDKs, profile loading and rich
+# rendering. The root group only knows each command's name and module, so
+# `aicoder --help` and `aicoder version` start without importing any of them; a
+# command's module is imported when that command is run (or its help is shown).
+# The command list shows the first paragraph of each command function's docstring,
+# read from the module's source without importing it.
+
+import ast
+import importlib
+import importlib.util
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import typer
+from typer.core import TyperCommand, TyperGroup
+
+
+@dataclass(frozen=True)
+class LazyCommandSpec:
+    """Where to find a command function"""
+    module: str
+    function: str
+
+    @property
+    def short_help(self) -> str:
+        """First paragraph of the command function's docstring, for the command list"""
+        return _docstring_summary(self.module, self.function)
+
+
+@lru_cache(maxsize=None)
+def _docstring_summary(module: str, function: str) -> str:
+    spec = importlib.util.find_spec(module)
+    with open(spec.origin, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == function:
+            docstring = ast.get_docstring(node) or ""
+            return " ".join(docstring.split("\n\n")[0].split())
+    raise LookupError(f"{module} has no function {function}")
+
+
+class LazyCommand(TyperCommand):
+    """Stand-in listed in the root help; loads the real command once it is needed"""
+
+    def __init__(self, name: str, spec: LazyCommandSpec):
+        self.spec = spec
+        super().__init__(name=name)
+        self._command: Optional[Any] = None
+
+    # read only when the command list is shown, not on every start
+    @property
+    def short_help(self) -> str:
+        return self.spec.short_help
+
+    @short_help.setter
+    def short_help(self, value: Optional[str]) -> None:
+        pass  # always the command function's docstring
+
+    @property
+    def help(self) -> str:
+        return self.spec.short_help
+
+    @help.setter
+    def help(self, value: Optional[str]) -> None:
+        pass
+
+    def load(self):
+        """The real click command, built from the command function like `app.command(name=...)` would"""
+        if self._command is None:
+            function = getattr(importlib.import_module(self.spec.module), self.spec.function)
+            single = typer.Typer()
+            single.command(name=self.name)(function)
+            self._command = typer.main.get_command(single)
+        return self._command
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # the context (and so parsing, --help and invoke) belongs to the real command
+        return self.load().make_context(info_name, args, parent=parent, **extra)
+
+    def get_params(self, ctx):
+        return self.load().get_params(ctx)
+
+    def shell_complete(self, ctx, incomplete):
+        return self.load().shell_complete(ctx, incomplete)
+
+
+class LazyGroup(TyperGroup):
+    """Root group whose commands from `lazy_commands` are imported on first use"""
+
+    lazy_commands: Dict[str, LazyCommandSpec] = {}
+
+    def __init__(self, **attrs: Any):
+        super().__init__(**attrs)
+        for name, spec in self.lazy_commands.items():
+            self.commands.setdefault(name, LazyCommand(name, spec))
+
+    def list_commands(self, ctx) -> List[str]:
+        return list(self.commands)
@@ -1,26 +1,58 @@
+import sys
 import typer
+from typing import Optional
 
-from aicoder.cli.commands.add_comments import add_comments_command
-from aicoder.cli.commands.list_profiles import list_profiles_command
-from aicoder.cli.commands.analyze import analyze_command
+from aicoder.cli.lazy import LazyCommandSpec, LazyGroup
+from aicoder.cli.startup_trace import STARTUP_TRACE_OPTION, run_with_startup_trace
 from aicoder.config import Config
 
+
+class AicoderGroup(LazyGroup):
+    # command modules are only imported when the command runs; their help is read from the docstrings
+    lazy_commands = {
+        "add-comments": LazyCommandSpec("aicoder.cli.commands.add_comments", "add_comments_command"),
+        "list-profiles": LazyCommandSpec("aicoder.cli.commands.list_profiles", "list_profiles_command"),
+        "analyze": LazyCommandSpec("aicoder.cli.commands.analyze", "analyze_command"),
+        "plan": LazyCommandSpec("aicoder.cli.commands.plan", "plan_command"),
+        "mock-server": LazyCommandSpec("aicoder.cli.commands.mock_server", "mock_server_command"),
+        "stats": LazyCommandSpec("aicoder.cli.commands.stats", "stats_command"),
+    }
+
+
 app = typer.Typer(
+    cls=AicoderGroup,
     help="Automated PHP documentation tool",
     context_settings={"help_option_names": ["-h", "--help"]}
 )
 
 
+@app.callback()
+def options(
+    base_url: Optional[str] = typer.Option(
+        None, "--base-url", envvar="AICODER_LLM_BASE_URL",
+        help="Send LLM requests to this OpenAI-compatible base URL (e.g. `aicoder mock-server`)",
+        show_default=False
+    ),
+    startup_trace: bool = typer.Option(
+        False, STARTUP_TRACE_OPTION,
+        help="Run the command and report which imports its start-up time went to"
+    ),
+):
+    """Options for all commands"""
+    if base_url:
+        Config.LLM_BASE_URL = base_url.rstrip("/")
+
+
 @app.command()
 def version():
     """Print version information"""
     typer.echo(f"aicoder {Config.APP_VERSION}")
 
-app.command(name="add-comments")(add_comments_command)
-app.command(name="list-profiles")(list_profiles_command)
-app.command(name="analyze")(analyze_command)
 
 def main():
+    # handled before typer parses anything: the command runs again in a child interpreter
+    if STARTUP_TRACE_OPTION in sys.argv[1:]:
+        sys.exit(run_with_startup_trace([arg for arg in sys.argv[1:] if arg != STARTUP_TRACE_OPTION]))
     app()
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+# ---- Startup Trace ----
+# File: aicoder/cli/startup_trace.py
+#
+# `aicoder --startup-trace <command>` runs the command in a child interpreter with
+# `-X importtime` and reports where start-up time went: the slowest imports by
+# cumulative and by own time, and the total against the command's wall time.
+
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+STARTUP_TRACE_OPTION = "--startup-trace"
+TOP_IMPORTS = 15
+
+# "import time:       381 |       1234 |     aicoder.config"
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for imports made by the command itself
+
+
+def parse_import_times(stderr: str) -> Tuple[List[ImportTime], List[str]]:
+    """`-X importtime` lines and the remaining stderr output of the child"""
+    imports, other = [], []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append(ImportTime(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+        elif not line.startswith("import time: self [us]"):
+            other.append(line)
+    return imports, other
+
+
+def run_with_startup_trace(args: List[str]) -> int:
+    """Run `aicoder <args>` with import timing, then print the report to stderr; returns its exit code"""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-m", "aicoder.cli.main", *args],
+                             stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    imports, other = parse_import_times(process.stderr)
+    for line in other:
+        print(line, file=sys.stderr)
+
+    from rich.console import Console
+    from rich.table import Table
+
+    total_ms = sum(item.cumulative_us for item in imports if item.depth == 0) / 1000
+    table = Table(title=f"Imports {total_ms:.0f} ms, wall time {wall * 1000:.0f} ms")
+    table.add_column("Module")
+    table.add_column("Cumulative ms", justify="right")
+    table.add_column("Self ms", justify="right")
+    for item in sorted(imports, key=lambda item: item.cumulative_us, reverse=True)[:TOP_IMPORTS]:
+        table.add_row("  " * item.depth + item.module, f"{item.cumulative_us / 1000:.1f}", f"{item.self_us / 1000:.1f}")
+    Console(stderr=True).print(table)
+    return process.returncode
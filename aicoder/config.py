@@ -1,4 +1,11 @@
 # config.py
+import os
+from pathlib import Path
+
+# Per-user cache directory for persistent state (LLM response cache, ...)
+CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "aicoder"
+
+
 class Config:
     # Default profile to use if none specified
     APP_VERSION = "1.0.0"
@@ -12,6 +19,100 @@ class Config:
     LLM_RETRY_MIN_DELAY = 2
     LLM_RETRY_MAX_DELAY = 30
 
+    # Proactive client-side rate limiting per provider/model (profiles may set `rate_limit: {rpm, tpm, max_concurrency}`)
+    LLM_RATE_LIMIT_ENABLED = True
+    LLM_MAX_CONCURRENCY = 8  # starting/maximum concurrent requests; halved on every 429
+    LLM_MIN_CONCURRENCY = 1
+    # Share budgets and 429 back-offs with other aicoder processes using the same API key (file lock based)
+    LLM_SHARED_QUOTA_ENABLED = True
+    LLM_SHARED_QUOTA_DIR = CACHE_DIR / "quota"
+
+    # Send LLM requests to this base URL instead of the provider's (e.g. `aicoder mock-server`; --base-url)
+    LLM_BASE_URL = os.getenv("AICODER_LLM_BASE_URL") or None
+
+    # Record every LLM request (tokens, latency, retries, validation outcome) for `aicoder stats`
+    LEDGER_ENABLED = True
+    LEDGER_PATH = CACHE_DIR / "ledger.sqlite"
+
+    # Profile fallback chains: with `hedge_after: p95` the next entry starts when a model has not answered
+    # within the p95 time to first token of its last HEDGE_SAMPLE_SIZE requests in the ledger
+    HEDGE_DEFAULT_DELAY = 20.0   # seconds, until HEDGE_MIN_SAMPLES requests to the model are recorded
+    HEDGE_MIN_DELAY = 2.0
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_SAMPLE_SIZE = 200
+
+    # Append tracing spans (OTLP/JSON lines) of every pipeline stage to this file (--trace-out)
+    TRACE_OUT = os.getenv("AICODER_TRACE_OUT") or None
+
+    # Stream completions and apply search/replace blocks or udiff hunks while they arrive (--stream)
+    LLM_STREAMING = False
+
+    # Shared HTTP transport (see aicoder/llm/transport.py)
+    HTTP_POOL_SIZE = 16  # keep-alive connections per API host
+    HTTP_PREWARM = True  # open the connection in the background while prompts are built
+    HTTP_PREWARM_TIMEOUT = 5  # seconds
+    HTTP_GZIP_REQUESTS = False  # gzip large request bodies (only for endpoints that accept it)
+    HTTP_GZIP_MIN_BYTES = 64 * 1024
+
+    # Persistent LLM response cache (disable per run with --no-cache)
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_PATH = CACHE_DIR / "llm-cache.sqlite"
+    LLM_CACHE_TTL = 30 * 24 * 3600  # seconds
+    LLM_CACHE_MAX_BYTES = 512 * 1024 * 1024  # compressed bodies
+    # Bump when prompt templates or response parsing change in a way that invalidates cached completions
+    PROMPT_TEMPLATE_VERSION = "1"
+
+    # Batch processing (add-comments with directories/globs)
+    DEFAULT_JOBS = 4
+    SUPPORTED_EXTENSIONS = ['.php', '.twig']
+    BATCH_EXCLUDE_DIRS = ['vendor', 'node_modules', '.git', 'var', 'cache']
+
+    # Large files are split on class/function (PHP) or block/macro (Twig) boundaries
+    CHUNK_THRESHOLD_LINES = 1500  # files longer than this are chunked
+    CHUNK_MAX_LINES = 600
+    CHUNK_CONCURRENCY = 4  # chunks of one file sent to the LLM in parallel
+
+    # Git-aware runs (add-comments --since/--staged): lines around changes outside of a function/method
+    # (or innermost Twig block) sent along; nearby regions closer than this are merged
+    GIT_CONTEXT_LINES = 3
+
+    # `aicoder plan` / token budgets: rough speed of a completion request
+    PLAN_REQUEST_LATENCY = 3.0  # seconds until the first token
+    PLAN_OUTPUT_TOKENS_PER_SECOND = 50
+
+    # Model router (profile `pool`): picks the candidate with the lowest expected time to a valid result
+    # from the latest ROUTER_WINDOW requests per model in the ledger; the PLAN_* speeds stand in for
+    # models with fewer than ROUTER_MIN_SAMPLES requests, so new candidates get tried
+    ROUTER_WINDOW = 200
+    ROUTER_MIN_SAMPLES = 5
+    ROUTER_REFRESH_SECONDS = 30.0
+    ROUTER_PRIOR_PASS_RATE = 0.9
+    ROUTER_SIZE_BUCKETS = ((300, "small"), (1500, "medium"))  # up to N lines; anything longer is "large"
+    # OpenRouter provider routing sent with every request (profile `provider`), e.g. {"sort": "latency"}
+    OPENROUTER_PROVIDER_PREFERENCES = None
+
+    # Profiles, model aliases and analyzer prompts compiled from config/*.yaml (see aicoder/config_snapshot.py);
+    # the snapshot is stored until one of the files changes, long-running processes re-check them periodically
+    CONFIG_SNAPSHOT_ENABLED = True
+    CONFIG_SNAPSHOT_PATH = CACHE_DIR / "config-snapshot.pickle"
+    CONFIG_RELOAD_CHECK_SECONDS = 2.0
+
+    # Incremental runs: per-repository manifest of documented files (ignore with --force)
+    MANIFEST_ENABLED = True
+    MANIFEST_FILENAME = ".aicoder/manifest.json"
+    MANIFEST_MAX_VALIDATION_FAILURES = 3
+    MANIFEST_SAVE_EVERY = 20  # entries between intermediate saves during a batch run
+
+    # Validation: keep long-lived `php ... --worker` comparator processes instead of one process per check
+    VALIDATION_WORKERS_ENABLED = True
+    VALIDATION_WORKERS = 2
+    VALIDATION_WORKER_TIMEOUT = 60  # seconds per round trip; a worker that takes longer is killed
+    # Decide comment-only changes with an in-process tokenizer; the comparator only runs when it can't tell
+    VALIDATION_FAST_PATH = True
+    # Remember verdicts per (original, candidate) and normalize originals while the LLM request runs
+    VALIDATION_CACHE_ENABLED = True
+    VALIDATION_CACHE_SIZE = 256
+
     # Legacy model setting - kept for backward compatibility
     # Will be used if no profile is specified and no model is provided via CLI
     # see https://aider.chat/docs/leaderboards/
@@ -0,0 +1,167 @@
+# ---- Config Snapshot ----
+# File: aicoder/config_snapshot.py
+#
+# Model aliases, profiles and analyzer prompts are compiled from the YAML files in
+# config/ into one validated snapshot. It is kept as a pickle in the cache directory
+# together with the files' mtimes and sizes, so later runs skip YAML parsing until a
+# file changes. Long-running processes re-check the files every
+# CONFIG_RELOAD_CHECK_SECONDS and pick up edits without a restart.
+
+import os
+import pickle
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import Config
+from .utils.logger import myLogger
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+ALIASES_FILE = "model-aliases.yaml"
+PROFILE_FILES = {"analyzer": "profiles/analyzer-profiles.yaml", "commenter": "profiles/commenter-profiles.yaml"}
+PROMPTS_FILE = "profiles/analyzer-prompts.yaml"
+
+# Bump when the compiled structure changes; older snapshots are then recompiled
+SNAPSHOT_FORMAT = 2
+
+# (path, mtime_ns, size) per source file; None for missing files
+SourceStamps = Tuple[Tuple[str, Optional[int], Optional[int]], ...]
+
+
+@dataclass
+class ConfigSnapshot:
+    """Compiled configuration; every mapping is ready for direct lookups"""
+    sources: SourceStamps = ()
+    model_aliases: Dict[str, str] = field(default_factory=dict)
+    # profile type ("commenter", "analyzer") -> profile name -> settings
+    profiles: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    analyzer_prompts: Dict[str, Any] = field(default_factory=dict)
+    # source files that could not be read or parsed; such a snapshot is not stored
+    errors: List[str] = field(default_factory=list)
+
+
+def _source_paths() -> Tuple[Path, ...]:
+    return (CONFIG_DIR / ALIASES_FILE, *(CONFIG_DIR / name for name in PROFILE_FILES.values()), CONFIG_DIR / PROMPTS_FILE)
+
+
+def source_stamps() -> SourceStamps:
+    """Modification time and size of every source file"""
+    stamps = []
+    for path in _source_paths():
+        try:
+            stat = path.stat()
+            stamps.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append((str(path), None, None))
+    return tuple(stamps)
+
+
+def _read_yaml(path: Path) -> Any:
+    import yaml
+
+    with open(path, 'r') as file:
+        return yaml.safe_load(file)
+
+
+def _compile_mapping(path: Path, key: Optional[str], description: str, errors: List[str]) -> Dict[str, Any]:
+    """The dictionary in a YAML file (below `key`), {} with a logged reason if it is missing or invalid"""
+    if not path.exists():
+        myLogger.warning(f"{description} file not found: {path}")
+        return {}
+    try:
+        data = _read_yaml(path)
+    except Exception as e:
+        myLogger.error(f"Error loading {description.lower()} from {path}: {e}")
+        errors.append(str(path))
+        return {}
+    if key is not None:
+        data = data.get(key) if isinstance(data, dict) else None
+    elif data is None:
+        return {}  # an empty file
+    if not isinstance(data, dict):
+        expected = f"'{key}' key with a dictionary" if key else "a dictionary"
+        myLogger.warning(f"Invalid format in {description.lower()} file: {path}. Expected {expected}.")
+        return {}
+    return data
+
+
+def compile_snapshot(sources: Optional[SourceStamps] = None) -> ConfigSnapshot:
+    """Parse and validate the YAML sources"""
+    sources = source_stamps() if sources is None else sources
+    errors: List[str] = []
+    profiles = {}
+    for profile_type, name in PROFILE_FILES.items():
+        profiles[profile_type] = _compile_mapping(CONFIG_DIR / name, "profiles", "Profile", errors)
+        myLogger.debug(f"Loaded {len(profiles[profile_type])} profiles from {name}")
+    return ConfigSnapshot(
+        sources=sources,
+        model_aliases={str(alias): str(model) for alias, model in
+                       _compile_mapping(CONFIG_DIR / ALIASES_FILE, None, "Model aliases", errors).items()},
+        profiles=profiles,
+        analyzer_prompts=_compile_mapping(CONFIG_DIR / PROMPTS_FILE, "prompts", "Analyzer prompts", errors),
+        errors=errors,
+    )
+
+
+def _read_snapshot(sources: SourceStamps) -> Optional[ConfigSnapshot]:
+    try:
+        with open(Config.CONFIG_SNAPSHOT_PATH, 'rb') as file:
+            version, snapshot = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        myLogger.debug(f"Ignoring unreadable config snapshot {Config.CONFIG_SNAPSHOT_PATH}: {e}")
+        return None
+    if version != SNAPSHOT_FORMAT or not isinstance(snapshot, ConfigSnapshot) or snapshot.sources != sources:
+        return None
+    return snapshot
+
+
+def _write_snapshot(snapshot: ConfigSnapshot) -> None:
+    path = Path(Config.CONFIG_SNAPSHOT_PATH)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written next to the target and renamed, so concurrent runs never read a partial file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump((SNAPSHOT_FORMAT, snapshot), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        myLogger.debug(f"Could not write the config snapshot {path}: {e}")
+
+
+def load_snapshot(sources: Optional[SourceStamps] = None) -> ConfigSnapshot:
+    """The stored snapshot if the sources are unchanged, otherwise a freshly compiled (and stored) one"""
+    sources = source_stamps() if sources is None else sources
+    if Config.CONFIG_SNAPSHOT_ENABLED:
+        snapshot = _read_snapshot(sources)
+        if snapshot is not None:
+            return snapshot
+    snapshot = compile_snapshot(sources)
+    # a file that failed to parse is compiled again (and reported) on every run until it is fixed
+    if Config.CONFIG_SNAPSHOT_ENABLED and not snapshot.errors:
+        _write_snapshot(snapshot)
+    return snapshot
+
+
+_snapshot: Optional[ConfigSnapshot] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_config_snapshot() -> ConfigSnapshot:
+    """Current configuration; the source files are re-checked at most every CONFIG_RELOAD_CHECK_SECONDS"""
+    global _snapshot, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _snapshot is None or now - _checked_at >= Config.CONFIG_RELOAD_CHECK_SECONDS:
+            sources = source_stamps()
+            if _snapshot is None or _snapshot.sources != sources:
+                if _snapshot is not None:
+                    myLogger.debug("Configuration files changed, reloading")
+                _snapshot = load_snapshot(sources)
+            _checked_at = now
+        return _snapshot
@@ -0,0 +1,284 @@
+# ---- Batch Processing ----
+# File: aicoder/core/batch.py
+
+import asyncio
+import glob
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..config import Config
+from ..llm.ledger import labels
+from ..strategies import create_strategy
+from ..utils.logger import myLogger
+from ..utils.threads import run_in_thread
+from ..utils.tracing import span
+from .chain import FallbackChain
+from .chunker import LineRange, changed_regions, split_on_regions
+from .planner import TokenBudget, plan_file
+from .router import ModelRouter, size_bucket
+from .manifest import OUTCOME_ERROR, OUTCOME_SUCCESS, OUTCOME_UNCHANGED, OUTCOME_VALIDATION_FAILED, AnyManifest
+from .processor import CodeValidationError, improve_file_documentation
+
+
+@dataclass
+class FileResult:
+    """Outcome of documenting a single file within a batch run"""
+    path: Path
+    success: bool
+    duration: float
+    error: Optional[str] = None
+    skip_reason: Optional[str] = None
+    exception: Optional[Exception] = field(default=None, repr=False)
+
+    @property
+    def skipped(self) -> bool:
+        return self.skip_reason is not None
+
+
+def _is_supported(path: Path) -> bool:
+    return path.suffix.lower() in Config.SUPPORTED_EXTENSIONS
+
+
+def _glob_root(pattern: str) -> Path:
+    """The leading directories of a glob pattern that contain no wildcards"""
+    parts = []
+    for part in Path(pattern).parts:
+        if any(ch in part for ch in '*?['):
+            break
+        parts.append(part)
+    return Path(*parts) if parts else Path('.')
+
+
+def _is_excluded(path: Path, root: Path) -> bool:
+    try:
+        parts = path.relative_to(root).parts
+    except ValueError:
+        parts = path.parts
+    return any(part in Config.BATCH_EXCLUDE_DIRS for part in parts[:-1])
+
+
+def collect_files(patterns: Iterable[str]) -> List[Path]:
+    """
+    Expand files, directories and glob patterns into a sorted, de-duplicated list of files.
+
+    Directories and glob patterns are expanded to supported extensions (see Config.SUPPORTED_EXTENSIONS),
+    skipping Config.BATCH_EXCLUDE_DIRS below them. Explicitly named files are always included.
+
+    Args:
+        patterns: File paths, directory paths or glob patterns (e.g. "src/**/*.php")
+
+    Returns:
+        List[Path]: Files to process, in a stable order
+    """
+    files: List[Path] = []
+    seen = set()
+
+    def add(path: Path) -> None:
+        resolved = path.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            files.append(path)
+
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_file():
+            add(path)
+        elif path.is_dir():
+            for candidate in sorted(path.rglob('*')):
+                if candidate.is_file() and _is_supported(candidate) and not _is_excluded(candidate, path):
+                    add(candidate)
+        else:
+            matches = sorted(glob.glob(str(pattern), recursive=True))
+            if not matches:
+                raise FileNotFoundError(f"No files match '{pattern}'")
+            for match in matches:
+                candidate = Path(match)
+                if candidate.is_file() and _is_supported(candidate) and not _is_excluded(candidate, _glob_root(pattern)):
+                    add(candidate)
+
+    return files
+
+
+def document_file(path: Path,
+                  model: str,
+                  strategy_name: str,
+                  profile: str = Config.DEFAULT_PROFILE,
+                  manifest: Optional[AnyManifest] = None,
+                  force: bool = False,
+                  rules: Optional[List[Dict[str, Any]]] = None,
+                  budget: Optional[TokenBudget] = None,
+                  chain: Optional[FallbackChain] = None,
+                  router: Optional[ModelRouter] = None,
+                  changed_lines: Optional[List[LineRange]] = None) -> FileResult:
+    """
+    Document a single file, consulting and updating the run manifest if one is given.
+
+    Args:
+        path: File to document
+        model: Model identifier or alias
+        strategy_name: Strategy name (wholefile, udiff, searchreplace)
+        profile: Profile name, recorded in the manifest
+        manifest: Optional manifest used to skip unchanged files and record outcomes
+        force: Process the file even if the manifest says it can be skipped
+        rules: Profile rules choosing model/strategy by file size and comment density
+        budget: Optional token budget; files that do not fit are skipped
+        chain: Optional fallback chain of the profile, tried when the planned model fails or is slow
+        router: Optional router picking the model from the profile's pool
+        changed_lines: Only document the declarations around these lines (--since/--staged)
+
+    Returns:
+        FileResult: Outcome of this file
+    """
+    start_time = time.time()
+    try:
+        original_content = path.read_text()
+    except OSError as e:
+        return FileResult(path, False, time.time() - start_time, str(e), exception=e)
+
+    if manifest and not force:
+        reason = manifest.skip_reason(path, original_content, profile, partial=changed_lines is not None)
+        if reason:
+            return FileResult(path, True, time.time() - start_time, skip_reason=reason)
+
+    regions = None
+    planned_content = original_content
+    if changed_lines is not None:
+        regions = changed_regions(original_content, path.suffix.lower(), changed_lines, Config.GIT_CONTEXT_LINES)
+        if not regions:
+            return FileResult(path, True, time.time() - start_time, skip_reason="no changed lines")
+        # budgets and rules apply to what is sent
+        planned_content = ''.join(chunk.text for chunk in split_on_regions(original_content, regions) if chunk.selected)
+
+    plan = plan_file(path, planned_content, model, strategy_name, rules, router)
+    model, strategy_name = plan.model, plan.strategy
+    if budget:
+        reason = budget.reserve(plan)
+        if reason:
+            return FileResult(path, True, time.time() - start_time, skip_reason=reason)
+    if plan.may_be_truncated:
+        myLogger.warning(
+            f"{path}: expected response of ~{plan.max_request_output_tokens:,} tokens exceeds the "
+            f"{plan.output_limit:,} token completion limit of {model}; consider the searchreplace or udiff strategy"
+        )
+
+    try:
+        with labels(profile=profile, strategy=strategy_name, file=str(path), size=size_bucket(plan.lines)):
+            written = improve_file_documentation(path, model, create_strategy(strategy_name), chain=chain, regions=regions)
+    except Exception as e:
+        if manifest:
+            outcome = OUTCOME_VALIDATION_FAILED if isinstance(e, CodeValidationError) else OUTCOME_ERROR
+            manifest.record(path, original_content, outcome, profile, model, strategy_name, error=str(e))
+        return FileResult(path, False, time.time() - start_time, str(e), exception=e)
+
+    if manifest and not written:
+        # nothing was documented, so the file must not count as "unchanged since documented"
+        manifest.record(path, original_content, OUTCOME_UNCHANGED, profile, model, strategy_name)
+    elif manifest:
+        manifest.record(path, original_content, OUTCOME_SUCCESS, profile, model, strategy_name,
+                        output_content=path.read_text(), partial=regions is not None)
+    return FileResult(path, True, time.time() - start_time)
+
+
+async def _process_one(path: Path,
+                       model: str,
+                       strategy_name: str,
+                       semaphore: asyncio.Semaphore,
+                       **kwargs) -> FileResult:
+    async with semaphore:
+        return await run_in_thread(document_file, path, model, strategy_name, **kwargs)
+
+
+async def run_batch(files: List[Path],
+                    model: str,
+                    strategy_name: str,
+                    jobs: int = Config.DEFAULT_JOBS,
+                    on_result: Optional[Callable[[FileResult], None]] = None,
+                    profile: str = Config.DEFAULT_PROFILE,
+                    manifest: Optional[AnyManifest] = None,
+                    force: bool = False,
+                    rules: Optional[List[Dict[str, Any]]] = None,
+                    budget: Optional[TokenBudget] = None,
+                    chain: Optional[FallbackChain] = None,
+                    router: Optional[ModelRouter] = None,
+                    changes: Optional[Dict[Path, List[LineRange]]] = None) -> List[FileResult]:
+    """
+    Document many files concurrently, with at most `jobs` files in flight at once.
+
+    Each file runs through document_file in a worker thread; results are
+    reported through `on_result` in completion order, not submission order.
+    With `changes` (resolved path -> changed lines), only the changed regions are documented.
+
+    Returns:
+        List[FileResult]: One result per file, in completion order
+    """
+    semaphore = asyncio.Semaphore(max(1, jobs))
+    tasks = [
+        asyncio.create_task(_process_one(path, model, strategy_name, semaphore,
+                                         profile=profile, manifest=manifest, force=force,
+                                         rules=rules, budget=budget, chain=chain, router=router,
+                                         changed_lines=None if changes is None else changes.get(path.resolve(), [])))
+        for path in files
+    ]
+
+    results = []
+    for next_done in asyncio.as_completed(tasks):
+        result = await next_done
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return results
+
+
+def report_result(result: FileResult) -> None:
+    """Print the outcome of a single file as soon as it finishes"""
+    if result.skipped:
+        myLogger.info(f"Skipped {result.path}: {result.skip_reason}")
+    elif result.success:
+        myLogger.success(f"[bold]{result.path}[/bold] documented in {result.duration:.1f}s")
+    else:
+        myLogger.error(f"[bold]{result.path}[/bold] failed after {result.duration:.1f}s: {result.error}")
+
+
+def print_summary(results: List[FileResult], elapsed: float) -> None:
+    """Print the final summary of a batch run"""
+    skipped = sum(1 for r in results if r.skipped)
+    succeeded = sum(1 for r in results if r.success) - skipped
+    failed = [r for r in results if not r.success]
+    files_per_min = len(results) / elapsed * 60 if elapsed > 0 else 0.0
+
+    myLogger.info(
+        f"\nProcessed {len(results):,} files in {elapsed:.1f}s ({files_per_min:.1f} files/min): "
+        f"{succeeded:,} succeeded, {skipped:,} skipped, {len(failed):,} failed"
+    )
+    for result in failed:
+        myLogger.error(f"{result.path}: {result.error}")
+
+
+def process_files(files: List[Path],
+                  model: str,
+                  strategy_name: str,
+                  jobs: int = Config.DEFAULT_JOBS,
+                  profile: str = Config.DEFAULT_PROFILE,
+                  manifest: Optional[AnyManifest] = None,
+                  force: bool = False,
+                  rules: Optional[List[Dict[str, Any]]] = None,
+                  budget: Optional[TokenBudget] = None,
+                  chain: Optional[FallbackChain] = None,
+                  router: Optional[ModelRouter] = None,
+                  changes: Optional[Dict[Path, List[LineRange]]] = None) -> List[FileResult]:
+    """Synchronous entry point for batch runs: processes all files and prints the summary"""
+    start_time = time.time()
+    try:
+        # tasks and worker threads inherit the context, so every file's spans belong to this trace
+        with span("batch.run", files=len(files), jobs=jobs, model=model, strategy=strategy_name):
+            results = asyncio.run(run_batch(files, model, strategy_name, jobs, on_result=report_result,
+                                            profile=profile, manifest=manifest, force=force,
+                                            rules=rules, budget=budget, chain=chain, router=router,
+                                            changes=changes))
+    finally:
+        if manifest:
+            manifest.save()
+    print_summary(results, time.time() - start_time)
+    return results
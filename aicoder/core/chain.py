@@ -0,0 +1,178 @@
+# ---- Fallback Chains and Hedged Requests ----
+# File: aicoder/core/chain.py
+#
+# A commenter profile can list further model/strategy pairs (`chain`) to try when
+# documenting a file with its own model fails. With `hedge_after` the next pair is
+# also started while the current one is still running, once it has produced no
+# response text for that long; the first result that validates wins and the
+# other requests are cancelled. Cancellation is best effort: the SDK clients and
+# HTTP sessions are shared, so a non-streamed request already waiting for its
+# response is not aborted. It keeps its rate limiter slot and connection until the
+# response arrives, which is then dropped without being applied or validated.
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from ..config import Config
+from ..llm.api_client import LLMClient, RequestCancelled, resolve_provider
+from ..llm.cache import get_response_cache
+from ..llm.ledger import get_ledger, percentile
+from ..utils.logger import myLogger
+from ..utils.tracing import current_span
+
+HEDGE_P95 = "p95"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ChainEntry:
+    """One model/strategy pair of a fallback chain"""
+    model: str
+    strategy: str
+
+
+def learned_hedge_delay(model: str) -> Optional[float]:
+    """
+    p95 time to first token (time to the whole response without streaming) of the
+    latest requests to `model` in the request ledger, None if too few are recorded
+    """
+    ledger = get_ledger()
+    if ledger is None:
+        return None
+    _, provider_name, model_name = resolve_provider(model)
+    column = "ttft" if Config.LLM_STREAMING else "latency"
+    values = ledger.recent_values(f"{provider_name}/{model_name}", column, Config.HEDGE_SAMPLE_SIZE)
+    if len(values) < Config.HEDGE_MIN_SAMPLES:
+        return None
+    return max(Config.HEDGE_MIN_DELAY, percentile(values, 0.95))
+
+
+class FallbackChain:
+    """
+    Alternatives tried, in order, after the model and strategy a file was planned with.
+
+    `hedge_after` is a number of seconds or "p95" (learned per model from the ledger);
+    without it the next entry only starts after the previous one failed.
+    """
+
+    def __init__(self, entries: List[ChainEntry], hedge_after: Union[float, str, None] = None):
+        self.entries = list(entries)
+        self.hedge_after = hedge_after
+        self._learned: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_profile(cls, profile_settings: Dict[str, Any]) -> Optional["FallbackChain"]:
+        """The chain of a resolved profile (see ProfileLoader.get_profile), None if it has none"""
+        entries = [ChainEntry(entry["model"], entry["strategy"]) for entry in profile_settings.get("chain") or []]
+        if not entries:
+            return None
+        return cls(entries, profile_settings.get("hedge_after"))
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds without response text from `model` before the next entry is started (None: never)"""
+        if self.hedge_after is None:
+            return None
+        if self.hedge_after != HEDGE_P95:
+            return float(self.hedge_after)
+        # learned once per run and model, so every file of a batch hedges the same way
+        with self._lock:
+            if model not in self._learned:
+                self._learned[model] = learned_hedge_delay(model)
+            learned = self._learned[model]
+        return learned if learned is not None else Config.HEDGE_DEFAULT_DELAY
+
+
+class _Attempt:
+    """One entry of the chain running in its own thread"""
+
+    def __init__(self, entry: ChainEntry, produce: Callable[[ChainEntry, LLMClient], T]):
+        self.entry = entry
+        self.client: Optional[LLMClient] = None
+        self.future: Future = Future()
+        self.started = time.monotonic()
+        try:
+            self.client = LLMClient(modelWithPrefix=entry.model, cache=get_response_cache())
+        except Exception as e:
+            # e.g. an unknown provider: this entry fails and the chain moves on to the next one
+            self.future.set_exception(e)
+            return
+        # daemon thread: a cancelled request that is still waiting for its response must not delay exit
+        threading.Thread(target=contextvars.copy_context().run, args=(self._run, produce),
+                         name=f"chain-{entry.model}", daemon=True).start()
+
+    def _run(self, produce: Callable[[ChainEntry, LLMClient], T]) -> None:
+        try:
+            result = produce(self.entry, self.client)
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+    @property
+    def responding(self) -> bool:
+        """Whether the first response text has arrived"""
+        return self.client is not None and self.client.firstToken.is_set()
+
+    def cancel(self, discard: Callable[[T], None]) -> None:
+        """
+        Cancel the requests (best effort, see above); a result that is still produced is passed to `discard`
+        """
+        if self.client is not None:
+            self.client.cancel()
+        self.future.add_done_callback(lambda future: future.exception() is None and discard(future.result()))
+
+
+def run_chain(entries: List[ChainEntry],
+              produce: Callable[[ChainEntry, LLMClient], T],
+              discard: Callable[[T], None],
+              hedge_delay: Callable[[str], Optional[float]] = lambda model: None) -> Tuple[ChainEntry, T]:
+    """
+    Run `produce` for the entries in order until one succeeds.
+
+    An entry starts when all running ones have failed, or as a hedge when the latest
+    one has not received any response text within `hedge_delay(model)` seconds. The
+    first successful result wins; the other attempts are cancelled and their results
+    passed to `discard`. If every entry fails, the last error is raised.
+
+    Returns:
+        Tuple[ChainEntry, T]: Winning entry and its result
+    """
+    pending = list(entries)
+    running: List[_Attempt] = []
+    last_error: Optional[BaseException] = None
+
+    while running or pending:
+        if not running:
+            running.append(_Attempt(pending.pop(0), produce))
+        latest = running[-1]
+
+        delay = hedge_delay(latest.entry.model) if pending else None
+        timeout = None
+        if delay is not None and not latest.responding:
+            timeout = max(0.0, latest.started + delay - time.monotonic())
+
+        done, _ = wait([attempt.future for attempt in running], timeout=timeout, return_when=FIRST_COMPLETED)
+        for attempt in [attempt for attempt in running if attempt.future in done]:
+            running.remove(attempt)
+            error = attempt.future.exception()
+            if error is None:
+                for loser in running:
+                    loser.cancel(discard)
+                return attempt.entry, attempt.future.result()
+            if not isinstance(error, RequestCancelled):
+                myLogger.warning(f"{attempt.entry.model} ({attempt.entry.strategy}) failed: {error}")
+            last_error = error
+
+        if not done and pending and not latest.responding:
+            myLogger.warning(f"No response from {latest.entry.model} after {delay:.1f}s, "
+                             f"hedging with {pending[0].model} ({pending[0].strategy})")
+            current_span().set(hedged=True)
+            running.append(_Attempt(pending.pop(0), produce))
+
+    raise last_error
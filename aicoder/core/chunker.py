@@ -0,0 +1,150 @@
+# ---- Structure-Aware Chunking ----
+# File: aicoder/core/chunker.py
+
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .structure import Symbol, find_symbols
+
+# (start, end) line range, 0-based and end exclusive
+LineRange = Tuple[int, int]
+
+
+@dataclass
+class Chunk:
+    """A contiguous range of whole lines of a file (0-based, end exclusive)"""
+    index: int
+    start_line: int
+    end_line: int
+    text: str
+    selected: bool = True  # False for the unchanged text between changed regions (see split_on_regions)
+
+
+def _split_points(code: str, file_extension: str, num_lines: int) -> List[int]:
+    """
+    Lines before which the file may be cut without splitting a declaration.
+
+    Cuts are placed at the start of the docblock of top-level symbols and class
+    members (PHP) / top-level and nested-once blocks and macros (Twig), and right
+    after such a symbol ends.
+    """
+    points = set()
+    for symbol in find_symbols(code, file_extension):
+        if symbol.depth > 1:
+            continue
+        points.add(symbol.doc_start)
+        points.add(symbol.end_line + 1)
+    return sorted(p for p in points if 0 < p < num_lines)
+
+
+def split_into_chunks(code: str, file_extension: str, max_lines: int) -> List[Chunk]:
+    """
+    Split a file into chunks of at most `max_lines` lines on class/function (PHP)
+    or block/macro (Twig) boundaries.
+
+    Joining the chunk texts in order reproduces `code` exactly. A single declaration
+    longer than `max_lines` becomes its own (oversized) chunk rather than being cut.
+
+    Args:
+        code: File content
+        file_extension: '.php' or '.twig'
+        max_lines: Preferred maximum number of lines per chunk
+
+    Returns:
+        List[Chunk]: Chunks in file order (a single chunk if the file is small or has no boundaries)
+    """
+    lines = code.splitlines(keepends=True)
+    if len(lines) <= max_lines:
+        return [Chunk(0, 0, len(lines), code)]
+
+    boundaries = _split_points(code, file_extension, len(lines)) + [len(lines)]
+
+    chunks: List[Chunk] = []
+    chunk_start = 0
+    previous = 0
+    for boundary in boundaries:
+        # close the current chunk before a segment that would make it too long
+        if boundary - chunk_start > max_lines and previous > chunk_start:
+            chunks.append(Chunk(len(chunks), chunk_start, previous, ''.join(lines[chunk_start:previous])))
+            chunk_start = previous
+        previous = boundary
+    chunks.append(Chunk(len(chunks), chunk_start, len(lines), ''.join(lines[chunk_start:])))
+
+    return chunks
+
+
+def _leaf_symbols(symbols: List[Symbol]) -> List[Symbol]:
+    """Symbols without nested declarations (functions, methods, macros, innermost blocks)"""
+    return [symbol for symbol in symbols
+            if not any(other is not symbol and symbol.start_line < other.start_line <= symbol.end_line
+                       for other in symbols)]
+
+
+def changed_regions(code: str, file_extension: str, changed_lines: List[LineRange], context_lines: int) -> List[LineRange]:
+    """
+    Regions of a file to document for the given changed lines (e.g. git diff hunks).
+
+    A change inside a function, method, macro or innermost block selects that whole
+    declaration including its docblock. Other changed lines (class bodies, top-level
+    code) are selected with `context_lines` lines around them, extended over the
+    docblock of any declaration and the whole of any function they touch. Regions
+    closer than `context_lines` are merged.
+
+    Returns:
+        List[LineRange]: Sorted, non-overlapping regions
+    """
+    num_lines = len(code.splitlines())
+    if not num_lines:
+        return []
+    symbols = find_symbols(code, file_extension)
+    leaves = _leaf_symbols(symbols)
+
+    regions = []
+    for start, end in changed_lines:
+        start, end = max(0, min(start, num_lines - 1)), max(1, min(end, num_lines))
+        line = start
+        while line < end:
+            leaf = next((s for s in leaves if s.doc_start <= line <= s.end_line), None)
+            if leaf:
+                regions.append((leaf.doc_start, leaf.end_line + 1))
+                line = leaf.end_line + 1
+                continue
+            region_start, region_end = max(0, line - context_lines), min(num_lines, line + 1 + context_lines)
+            # never cut a function/method in the context, nor a docblock from its declaration
+            overlapping = [s for s in leaves if s.doc_start < region_end and s.end_line >= region_start]
+            region_start = min([region_start] + [s.doc_start for s in symbols if region_start <= s.start_line < region_end]
+                               + [s.doc_start for s in overlapping])
+            region_end = max([region_end] + [s.end_line + 1 for s in overlapping])
+            regions.append((region_start, region_end))
+            line += 1
+
+    merged: List[LineRange] = []
+    for start, end in sorted(regions):
+        if merged and start <= merged[-1][1] + context_lines:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def split_on_regions(code: str, regions: List[LineRange]) -> List[Chunk]:
+    """
+    Split a file into chunks at the given sorted, non-overlapping regions.
+
+    The regions become selected chunks and the text between them unselected ones;
+    joining all chunk texts in order reproduces `code` exactly.
+    """
+    lines = code.splitlines(keepends=True)
+    chunks: List[Chunk] = []
+
+    def add(start: int, end: int, selected: bool) -> None:
+        if end > start:
+            chunks.append(Chunk(len(chunks), start, end, ''.join(lines[start:end]), selected))
+
+    position = 0
+    for start, end in regions:
+        add(position, start, False)
+        add(start, end, True)
+        position = end
+    add(position, len(lines), False)
+    return chunks
@@ -0,0 +1,78 @@
+# ---- Git Changes ----
+# File: aicoder/core/git_changes.py
+#
+# Changed lines per file for `add-comments --since <rev>` / `--staged`, read from
+# `git diff --unified=0`. Line numbers refer to the working tree, which is what
+# gets documented; chunker.changed_regions maps them to declarations.
+
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .chunker import LineRange
+
+_FILE_RE = re.compile(r'^\+\+\+ b/(.*)$')
+_HUNK_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+def _git(args: List[str], cwd: Path) -> str:
+    try:
+        result = subprocess.run(['git', '-c', 'core.quotePath=false', *args], cwd=cwd,
+                                capture_output=True, text=True)
+    except FileNotFoundError as e:
+        raise RuntimeError("git is required for --since/--staged but was not found") from e
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def parse_diff(diff: str) -> Dict[str, List[LineRange]]:
+    """
+    Changed line ranges of the new side of a `git diff --unified=0`, per path.
+
+    A pure deletion counts as a change of the line above it (0-based ranges, end exclusive).
+    """
+    changes: Dict[str, List[LineRange]] = {}
+    current: Optional[List[LineRange]] = None
+    for line in diff.splitlines():
+        match = _FILE_RE.match(line)
+        if match:
+            current = changes.setdefault(match.group(1), [])
+            continue
+        if line.startswith('+++ '):
+            current = None  # deleted file
+            continue
+        match = _HUNK_RE.match(line)
+        if match and current is not None:
+            start = int(match.group(1))
+            count = 1 if match.group(2) is None else int(match.group(2))
+            if count:
+                current.append((start - 1, start - 1 + count))
+            else:
+                # nothing added: `start` is the line after which lines were removed
+                current.append((max(0, start - 1), max(1, start)))
+    return changes
+
+
+def collect_changes(since: Optional[str] = None, staged: bool = False, cwd: Optional[Path] = None) -> Dict[Path, List[LineRange]]:
+    """
+    Changed line ranges per file (resolved paths) of the repository containing `cwd`.
+
+    Args:
+        since: Revision to compare the working tree with (e.g. "origin/main")
+        staged: Only files with staged changes; their lines are compared with HEAD
+        cwd: Directory inside the repository (default: current directory)
+
+    Returns:
+        Dict[Path, List[LineRange]]: Added or modified files and their changed lines
+    """
+    cwd = cwd or Path.cwd()
+    root = Path(_git(['rev-parse', '--show-toplevel'], cwd).strip())
+    diff_args = ['diff', '--no-color', '--no-ext-diff', '--unified=0', '--diff-filter=AMR']
+    # the working tree side is what gets documented, so staged files are diffed including unstaged edits
+    changes = parse_diff(_git([*diff_args, 'HEAD' if staged else since, '--'], root))
+    if staged:
+        staged_paths = set(_git(['diff', '--cached', '--name-only', '--diff-filter=AMR'], root).splitlines())
+        changes = {path: ranges for path, ranges in changes.items() if path in staged_paths}
+    return {(root / path).resolve(): ranges for path, ranges in changes.items() if ranges}
@@ -0,0 +1,209 @@
+# ---- Incremental Run Manifest ----
+# File: aicoder/core/manifest.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+from ..config import Config
+from ..utils.logger import myLogger
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_VALIDATION_FAILED = "validation_failed"
+OUTCOME_ERROR = "error"
+# the run finished without changing the file (e.g. an unusable response); processed again next time
+OUTCOME_UNCHANGED = "unchanged"
+
+
+def content_hash(content: str) -> str:
+    """sha256 of file content, as stored in the manifest"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def repository_root(start: Path) -> Optional[Path]:
+    """Return the nearest directory containing `.git`, or None outside of a repository"""
+    start = start.resolve()
+    for directory in [start, *start.parents]:
+        if (directory / '.git').exists():
+            return directory
+    return None
+
+
+def find_repository_root(start: Path) -> Path:
+    """Return the nearest directory containing `.git`, or `start` itself if there is none"""
+    return repository_root(start) or start.resolve()
+
+
+class RunManifest:
+    """
+    Per-repository record of what was documented, so repeated runs only touch changed files.
+
+    For every file the manifest stores the content hash before and after processing,
+    the profile, model and strategy used and the outcome. A file is skipped when:
+    - its current content is exactly what the last successful run wrote, or
+    - it failed validation Config.MANIFEST_MAX_VALIDATION_FAILURES times in a row under
+      the same profile and its content has not changed since (negative cache)
+    """
+
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+        self.path = self.root / Config.MANIFEST_FILENAME
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+                self.entries = data.get("files", {})
+                myLogger.debug(f"Loaded manifest with {len(self.entries):,} entries from {self.path}")
+            except (OSError, ValueError) as e:
+                myLogger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    @classmethod
+    def for_directory(cls, directory: Path) -> 'RunManifest':
+        return cls(find_repository_root(directory))
+
+    def _key(self, path: Path) -> str:
+        resolved = path.resolve()
+        try:
+            return resolved.relative_to(self.root).as_posix()
+        except ValueError:
+            return str(resolved)
+
+    def skip_reason(self, path: Path, content: str, profile: str, partial: bool = False) -> Optional[str]:
+        """
+        Return why `path` can be skipped this run, or None if it needs processing.
+
+        A file documented only partially (--since/--staged) is skipped by later partial
+        runs only; a full run still documents the rest of it.
+        """
+        with self._lock:
+            entry = self.entries.get(self._key(path))
+        if not entry:
+            return None
+
+        current_hash = content_hash(content)
+        if (entry["outcome"] == OUTCOME_SUCCESS and entry.get("output_hash") == current_hash
+                and (partial or not entry.get("partial"))):
+            return f"unchanged since documented with profile '{entry['profile']}'"
+
+        if (entry["outcome"] == OUTCOME_VALIDATION_FAILED
+                and entry["profile"] == profile
+                and entry["input_hash"] == current_hash
+                and entry["failures"] >= Config.MANIFEST_MAX_VALIDATION_FAILURES):
+            return f"failed validation {entry['failures']} times with profile '{profile}' and has not changed since"
+
+        return None
+
+    def record(self,
+               path: Path,
+               input_content: str,
+               outcome: str,
+               profile: str,
+               model: str,
+               strategy: str,
+               output_content: Optional[str] = None,
+               error: Optional[str] = None,
+               partial: bool = False) -> None:
+        """Store the outcome of processing `path`; consecutive validation failures are counted"""
+        key = self._key(path)
+        input_hash = content_hash(input_content)
+
+        with self._lock:
+            previous = self.entries.get(key, {})
+            failures = 0
+            if outcome == OUTCOME_VALIDATION_FAILED:
+                same_attempt = (previous.get("outcome") == OUTCOME_VALIDATION_FAILED
+                                and previous.get("profile") == profile
+                                and previous.get("input_hash") == input_hash)
+                failures = previous.get("failures", 0) + 1 if same_attempt else 1
+
+            self.entries[key] = {
+                "input_hash": input_hash,
+                "output_hash": content_hash(output_content) if output_content is not None else None,
+                "profile": profile,
+                "model": model,
+                "strategy": strategy,
+                "outcome": outcome,
+                "failures": failures,
+                "error": error,
+                "partial": partial,
+                "updated_at": time.time(),
+            }
+            self._unsaved += 1
+            should_save = self._unsaved >= Config.MANIFEST_SAVE_EVERY
+
+        if should_save:
+            self.save()
+
+    def save(self) -> None:
+        """Write the manifest atomically (temp file + rename)"""
+        with self._lock:
+            data = json.dumps({"version": 1, "files": self.entries}, indent=1, sort_keys=True)
+            self._unsaved = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(data)
+        os.replace(tmp_path, self.path)
+
+
+class RunManifests:
+    """
+    The manifests of the repositories a run's files belong to.
+
+    Each file is looked up in and recorded to the manifest at the root of its own
+    repository, wherever the command runs from. Files outside of any repository share
+    one manifest in their common directory. Same interface as RunManifest.
+    """
+
+    def __init__(self, files: Iterable[Path]):
+        self._roots: Dict[Path, Path] = {}
+        self._manifests: Dict[Path, RunManifest] = {}
+        self._lock = threading.Lock()
+        outside = []
+        for path in files:
+            directory = path.resolve().parent
+            if directory not in self._roots:
+                root = repository_root(directory)
+                if root is None:
+                    outside.append(directory)
+                self._roots[directory] = root
+        if outside:
+            common = Path(os.path.commonpath(outside))
+            for directory in outside:
+                self._roots[directory] = common
+
+    def for_path(self, path: Path) -> RunManifest:
+        """The manifest `path` is recorded in"""
+        directory = path.resolve().parent
+        with self._lock:
+            root = self._roots.get(directory)
+            if root is None:
+                root = self._roots[directory] = find_repository_root(directory)
+            manifest = self._manifests.get(root)
+            if manifest is None:
+                manifest = self._manifests[root] = RunManifest(root)
+                myLogger.debug(f"Using run manifest {manifest.path}")
+        return manifest
+
+    def skip_reason(self, path: Path, content: str, profile: str, partial: bool = False) -> Optional[str]:
+        return self.for_path(path).skip_reason(path, content, profile, partial=partial)
+
+    def record(self, path: Path, *args: Any, **kwargs: Any) -> None:
+        self.for_path(path).record(path, *args, **kwargs)
+
+    def save(self) -> None:
+        with self._lock:
+            manifests = list(self._manifests.values())
+        for manifest in manifests:
+            manifest.save()
+
+
+# what document_file and the batch functions accept
+AnyManifest = Union[RunManifest, RunManifests]
@@ -0,0 +1,189 @@
+# ---- Run Planning and Token Budgets ----
+# File: aicoder/core/planner.py
+#
+# Offline estimates of what documenting a file will cost (tokens, time) and
+# per-file model/strategy selection from profile `rules`.
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import Config
+from ..llm.api_client import resolve_provider
+from ..llm.tokens import estimate_output_tokens, estimate_tokens
+from ..strategies import create_strategy
+from .chunker import split_into_chunks
+from .processor import _build_prompts
+from .router import ModelRouter
+
+RULE_CONDITIONS = ('min_lines', 'max_lines', 'min_comment_density', 'max_comment_density', 'min_tokens', 'max_tokens')
+RULE_SETTINGS = ('model', 'strategy')
+
+
+@dataclass
+class FilePlan:
+    """Predicted cost of documenting one file"""
+    path: Path
+    lines: int
+    comment_density: float
+    model: str
+    strategy: str
+    requests: int           # LLM requests (chunks) for this file
+    input_tokens: int
+    output_tokens: int
+    seconds: float
+    max_request_output_tokens: int
+    output_limit: Optional[int] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def may_be_truncated(self) -> bool:
+        """True if a single response is expected to exceed the provider's completion limit"""
+        return self.output_limit is not None and self.max_request_output_tokens > self.output_limit
+
+
+def comment_density(code: str, file_extension: str) -> float:
+    """Share of non-blank lines that are comments (PHP //, #, /* */ lines; Twig {# #} lines)"""
+    in_block = False
+    comments = non_blank = 0
+    block_start, block_end = ('{#', '#}') if file_extension == '.twig' else ('/*', '*/')
+
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        non_blank += 1
+        if in_block:
+            comments += 1
+            in_block = block_end not in stripped
+        elif stripped.startswith(block_start):
+            comments += 1
+            in_block = block_end not in stripped[len(block_start):]
+        elif file_extension != '.twig' and stripped.startswith(('//', '#')) and not stripped.startswith('#['):
+            comments += 1
+
+    return comments / non_blank if non_blank else 0.0
+
+
+def _rule_matches(rule: Dict[str, Any], lines: int, density: float, tokens: int) -> bool:
+    values = {'lines': lines, 'comment_density': density, 'tokens': tokens}
+    for condition in RULE_CONDITIONS:
+        if condition not in rule:
+            continue
+        bound, name = condition.split('_', 1)
+        if bound == 'min' and values[name] < rule[condition]:
+            return False
+        if bound == 'max' and values[name] > rule[condition]:
+            return False
+    return True
+
+
+def select_model_and_strategy(model: str,
+                              strategy: str,
+                              rules: Optional[List[Dict[str, Any]]],
+                              lines: int,
+                              density: float,
+                              tokens: int) -> Tuple[str, str]:
+    """
+    Apply profile rules to one file: for model and strategy, the first matching rule that sets it wins.
+
+    Example rules (conditions are inclusive, missing conditions always match):
+
+        rules:
+          - max_lines: 400
+            strategy: wholefile
+          - min_lines: 400
+            strategy: searchreplace
+          - min_lines: 3000
+            max_comment_density: 0.05
+            model: sonnet45
+    """
+    chosen: Dict[str, str] = {}
+    for rule in rules or []:
+        if _rule_matches(rule, lines, density, tokens):
+            for setting in RULE_SETTINGS:
+                if setting in rule and setting not in chosen:
+                    chosen[setting] = rule[setting]
+    return chosen.get('model', model), chosen.get('strategy', strategy)
+
+
+def pin_rules(rules: Optional[List[Dict[str, Any]]], model_pinned: bool, strategy_pinned: bool) -> List[Dict[str, Any]]:
+    """Drop rule settings overridden on the command line (--model / --strategy)"""
+    pinned = {'model'} if model_pinned else set()
+    if strategy_pinned:
+        pinned.add('strategy')
+    return [{k: v for k, v in rule.items() if k not in pinned} for rule in rules or []]
+
+
+def plan_file(path: Path,
+              content: str,
+              model: str,
+              strategy: str,
+              rules: Optional[List[Dict[str, Any]]] = None,
+              router: Optional[ModelRouter] = None) -> FilePlan:
+    """
+    Predict model, strategy, tokens and duration for documenting `path` (nothing is sent).
+
+    Large files are planned per chunk, the way improve_file_documentation will send them.
+    With a `router`, files whose model no rule sets get the router's pick from the profile's pool.
+    """
+    file_extension = path.suffix.lower()
+    lines = content.count('\n') + 1
+    density = comment_density(content, file_extension)
+    profile_model = model
+    model, strategy = select_model_and_strategy(model, strategy, rules, lines, density, estimate_tokens(content))
+
+    chunk_texts = [content]
+    if lines > Config.CHUNK_THRESHOLD_LINES:
+        chunk_texts = [chunk.text for chunk in split_into_chunks(content, file_extension, Config.CHUNK_MAX_LINES)]
+
+    strategy_obj = create_strategy(strategy)
+    input_tokens = 0
+    output_per_request = []
+    for text in chunk_texts:
+        system_prompt, user_prompt = _build_prompts(text, file_extension, strategy_obj, is_fragment=len(chunk_texts) > 1)
+        input_tokens += estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        output_per_request.append(estimate_output_tokens(estimate_tokens(text), strategy, density))
+
+    # chunks are sent CHUNK_CONCURRENCY at a time
+    waves = -(-len(chunk_texts) // Config.CHUNK_CONCURRENCY)
+    slowest = max(output_per_request)
+    if router is not None and model == profile_model:
+        model, expected = router.choose(strategy, lines, slowest)
+        seconds = waves * expected
+    else:
+        seconds = waves * (Config.PLAN_REQUEST_LATENCY + slowest / Config.PLAN_OUTPUT_TOKENS_PER_SECOND)
+
+    provider_class, _, _ = resolve_provider(model)
+    return FilePlan(path, lines, density, model, strategy, len(chunk_texts), input_tokens,
+                    sum(output_per_request), seconds, slowest, getattr(provider_class, 'max_tokens', None))
+
+
+class TokenBudget:
+    """
+    Limits on estimated tokens for a run (prompt + expected completion).
+
+    Budgets are checked before a file is sent; files over the per-file limit or
+    arriving after the total is used up are skipped.
+    """
+
+    def __init__(self, max_total: Optional[int] = None, max_per_file: Optional[int] = None):
+        self.max_total = max_total
+        self.max_per_file = max_per_file
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, plan: FilePlan) -> Optional[str]:
+        """Book the file's estimated tokens, or return why it does not fit"""
+        tokens = plan.total_tokens
+        if self.max_per_file is not None and tokens > self.max_per_file:
+            return f"estimated {tokens:,} tokens exceed --max-tokens-per-file {self.max_per_file:,}"
+        with self._lock:
+            if self.max_total is not None and self.spent + tokens > self.max_total:
+                return f"token budget exhausted ({self.spent:,} of {self.max_total:,} estimated tokens used)"
+            self.spent += tokens
+        return None
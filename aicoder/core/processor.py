@@ -1,15 +1,101 @@
 # ---- Core Processing Logic ----
 # File: aicoder/core/processor.py
 
+import contextvars
 import shutil
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional
 
-from ..llm.api_client import LLMClient
+from ..config import Config
+from ..llm.api_client import LLMClient, RequestCancelled
+from ..llm.cache import get_response_cache
+from ..llm.helpers import MyHelpers
+from ..llm.ledger import labels
 from ..llm.prompts import DocumentationPrompts, TwigDocumentationPrompts
-from ..strategies import UDiffStrategy, ChangeStrategy
+from ..strategies import STRATEGIES, UDiffStrategy, ChangeStrategy, create_strategy
 from ..utils.logger import myLogger
+from ..utils.tracing import current_span, span
+from ..validation.fast_compare import EQUAL, UNKNOWN, fast_compare
+from ..validation.verdict_cache import cancel_prefetch, get_normalized, get_verdict, prefetch_normalized, put_verdict
+from ..validation.worker_pool import COMPARE_SCRIPTS, ValidationWorkerError, get_worker_pool
+from .chain import ChainEntry, FallbackChain, run_chain
+from .chunker import Chunk, LineRange, split_into_chunks, split_on_regions
+
+
+class CodeValidationError(RuntimeError):
+    """Raised when the LLM output changes code, not just comments"""
+    pass
+
+
+def _run_comparator(compare_script: Path, pathOriginalFile: Path, pathModifiedCodeTempFile: Path) -> bool:
+    """
+    Compare two files: cached verdicts and the in-process fast path first, then the
+    persistent worker pool, falling back to a one-shot `php` process
+    """
+    originalCode = pathOriginalFile.read_text()
+    modifiedCode = pathModifiedCodeTempFile.read_text()
+
+    with span("validate", file_type=pathOriginalFile.suffix.lower(), bytes=len(modifiedCode)) as traced:
+        if Config.VALIDATION_CACHE_ENABLED:
+            cached = get_verdict(originalCode, modifiedCode)
+            if cached is not None:
+                myLogger.debug(f"Validation verdict from cache: {cached}")
+                traced.set(method="cache", equal=cached)
+                cancel_prefetch(originalCode)
+                return cached
+
+        is_equal = _compare_uncached(compare_script, pathOriginalFile, pathModifiedCodeTempFile, originalCode, modifiedCode)
+        traced.set(equal=is_equal)
+    if Config.VALIDATION_CACHE_ENABLED:
+        put_verdict(originalCode, modifiedCode, is_equal)
+    return is_equal
+
+
+def _compare_uncached(compare_script: Path,
+                      pathOriginalFile: Path,
+                      pathModifiedCodeTempFile: Path,
+                      originalCode: str,
+                      modifiedCode: str) -> bool:
+    file_extension = pathOriginalFile.suffix.lower()
+    if Config.VALIDATION_FAST_PATH:
+        verdict = fast_compare(originalCode, modifiedCode, file_extension)
+        if verdict != UNKNOWN:
+            myLogger.debug(f"Fast comparison: {verdict}")
+            current_span().set(method="fast")
+            # decided without a worker: the prefetched normalization is not needed
+            cancel_prefetch(originalCode)
+            return verdict == EQUAL
+
+    pool = get_worker_pool(file_extension)
+    if pool is not None:
+        try:
+            # the original was normalized while the LLM request ran: only the candidate is parsed now
+            normalizedOriginal = get_normalized(originalCode) if Config.VALIDATION_CACHE_ENABLED else None
+            current_span().set(method="worker")
+            with span("validate.worker", prefetched=normalizedOriginal is not None):
+                if normalizedOriginal is not None:
+                    return pool.compare_normalized(normalizedOriginal, modifiedCode)
+                return pool.compare(pathOriginalFile, pathModifiedCodeTempFile)
+        except ValidationWorkerError as e:
+            myLogger.warning(f"Validation worker unavailable, falling back to one-shot comparison: {e}")
+
+    cmd = ['php', str(compare_script), str(pathOriginalFile), str(pathModifiedCodeTempFile)]
+    myLogger.debug(f"Running command: {' '.join(cmd)}")
+    current_span().set(method="subprocess")
+    with span("validate.subprocess", script=compare_script.name):
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True
+        )
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Error running comparison script: {result.stderr}")
+
+    return result.stdout.strip() == 'true'
 
 
 def _validate_code(pathOriginalFile: Path, pathModifiedCodeTempFile: Path) -> bool:
@@ -20,51 +106,23 @@ def _validate_code(pathOriginalFile: Path, pathModifiedCodeTempFile: Path) -> bo
         
         if file_extension == '.php':
             # Get path to PHP comparison script
-            compare_script = Path(__file__).parent.parent.parent / 'compare-php-files' / 'compare-php-files.php'
+            compare_script = COMPARE_SCRIPTS['.php']
             
             if not compare_script.exists():
                 raise RuntimeError(f"PHP comparison script not found at {compare_script}")
             
             myLogger.info("Validating PHP code changes...")
-                
-            # Run PHP comparison
-            cmd = ['php', str(compare_script), str(pathOriginalFile), str(pathModifiedCodeTempFile)]
-            myLogger.debug(f"Running command: {' '.join(cmd)}")
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                myLogger.error(f"Error running PHP comparison script: {result.stderr}")
-                return False
-                
-            is_valid = result.stdout.strip() == 'true'
+            is_valid = _run_comparator(compare_script, pathOriginalFile, pathModifiedCodeTempFile)
             
         elif file_extension in ['.twig', '.html.twig']:
             # Get path to Twig comparison script
-            compare_script = Path(__file__).parent.parent.parent / 'compare-twig-files' / 'compare-twig-files.php'
+            compare_script = COMPARE_SCRIPTS['.twig']
             
             if not compare_script.exists():
                 raise RuntimeError(f"Twig comparison script not found at {compare_script}")
             
             myLogger.info("Validating Twig code changes...")
-                
-            # Run Twig comparison
-            cmd = ['php', str(compare_script), str(pathOriginalFile), str(pathModifiedCodeTempFile)]
-            myLogger.debug(f"Running command: {' '.join(cmd)}")
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                myLogger.error(f"Error running Twig comparison script: {result.stderr}")
-                return False
-                
-            is_valid = result.stdout.strip() == 'true'
+            is_valid = _run_comparator(compare_script, pathOriginalFile, pathModifiedCodeTempFile)
             
         else:
             myLogger.warning(f"Unsupported file type: {file_extension}. Skipping validation.")
@@ -94,85 +152,270 @@ def _validate_code(pathOriginalFile: Path, pathModifiedCodeTempFile: Path) -> bo
         myLogger.error(f"Validation error: {str(e)}")
         return False
 
-def improve_file_documentation(pathOrigFile: Path,
-                               model: str,
-                               strategy: ChangeStrategy) -> None:
-    """Process file through documentation pipeline, detecting file type and using appropriate prompts"""
-    originalCode = pathOrigFile.read_text()
-
-    try:
-        start_time = time.time()
-        
-        # ---- Log initial information ----
-        num_rows = originalCode.count('\n') + 1
-        myLogger.info(f"⏳ Analyzing [magenta]{pathOrigFile.name}[/magenta]: {len(originalCode):,} characters / {num_rows:,} lines...")
-        
-        # ---- Determine file type and select appropriate prompt provider ----
-        file_extension = pathOrigFile.suffix.lower()
-        
+def _build_prompts(code: str, file_extension: str, strategy: ChangeStrategy, is_fragment: bool = False) -> tuple[str, str]:
+    """Select the prompt provider for the file type and build (system prompt, user prompt)"""
+    with span("prompt.build", file_type=file_extension, bytes=len(code), fragment=is_fragment):
         if file_extension == '.php':
-            systemPrompt, userPrompt = DocumentationPrompts.get_full_prompt(originalCode, strategy)
+            return DocumentationPrompts.get_full_prompt(code, strategy, is_fragment)
         elif file_extension in ['.twig', '.html.twig']:
-            systemPrompt, userPrompt = TwigDocumentationPrompts.get_full_prompt(originalCode, strategy)
+            return TwigDocumentationPrompts.get_full_prompt(code, strategy, is_fragment)
         else:
             raise RuntimeError(f"Unsupported file type: {file_extension}")
-        
-        # ---- send prompt to LLM ----
-        llmResponseRaw = LLMClient(modelWithPrefix=model).sendRequest(systemPrompt, userPrompt)
+
+
+def _request_and_apply(llmClient: LLMClient,
+                       prompts: tuple[str, str],
+                       strategy: ChangeStrategy,
+                       pathOrigFile: Path) -> tuple[str, Path|None]:
+    """
+    Send the prompts and apply the response with the strategy.
+
+    With Config.LLM_STREAMING the response is streamed into the strategy, so
+    blocks/hunks are applied while the rest is still being generated.
+
+    Returns:
+        tuple: (raw LLM response, temp file with the modified code or None)
+    """
+    options = {"responseFormat": strategy.response_format} if strategy.response_format else {}
+    strategyName = type(strategy).__name__
+    if Config.LLM_STREAMING:
+        # the LLM request is consumed by the strategy, so its spans are children of this one
+        with span("strategy.apply", strategy=strategyName, streaming=True):
+            return strategy.process_llm_stream(llmClient.streamRequest(*prompts, **options), pathOrigFile)
+
+    llmResponseRaw = llmClient.sendRequest(*prompts, **options)
+    with span("strategy.apply", strategy=strategyName, streaming=False, response_bytes=len(llmResponseRaw)):
+        return llmResponseRaw, strategy.process_llm_response(llmResponseRaw, pathOrigFile)
+
+
+def _document_chunk(chunk: Chunk,
+                    pathOrigFile: Path,
+                    llmClient: LLMClient,
+                    strategy: ChangeStrategy) -> tuple[str, tuple[str, str]]:
+    """
+    Document one chunk of a large file.
+
+    The chunk is written to its own temp file so the strategy can apply the response
+    exactly as it would for a whole file.
+
+    Returns:
+        tuple: (documented chunk text, (system prompt, user prompt) used for the request)
+    """
+    with span("chunk.document", index=chunk.index, lines=chunk.end_line - chunk.start_line):
+        prompts = _build_prompts(chunk.text, pathOrigFile.suffix.lower(), strategy, is_fragment=True)
+        myLogger.info(f"Sending chunk {chunk.index + 1} (lines {chunk.start_line + 1}-{chunk.end_line}) to LLM...")
+
+        pathChunkFile = MyHelpers.writeTempCodeFile(chunk.text, pathOrigFile.suffix)
+        try:
+            _, pathModifiedChunkFile = _request_and_apply(llmClient, prompts, strategy, pathChunkFile)
+            if pathModifiedChunkFile is None:
+                return chunk.text, prompts
+            modifiedChunk = pathModifiedChunkFile.read_text()
+            pathModifiedChunkFile.unlink()
+        finally:
+            pathChunkFile.unlink(missing_ok=True)
+
+        # chunks are joined as-is, so each one must keep its original trailing newlines
+        trailingNewlines = chunk.text[len(chunk.text.rstrip('\n')):]
+        return modifiedChunk.rstrip('\n') + trailingNewlines, prompts
+
+
+def _produce_documented_code(pathOrigFile: Path,
+                             originalCode: str,
+                             llmClient: LLMClient,
+                             strategy: ChangeStrategy,
+                             start_time: float,
+                             regions: Optional[List[LineRange]] = None) -> Path|None:
+    """
+    Request the documented code (per chunk for large files) and validate it.
+
+    With `regions` (see chunker.changed_regions) only those parts of the file are sent;
+    the rest is kept as it is.
+
+    Returns:
+        Path|None: Temp file with the validated code, None if the response changed nothing
+
+    Raises:
+        CodeValidationError: If the documented code does not compare equal to the original
+    """
+    file_extension = pathOrigFile.suffix.lower()
+    num_rows = originalCode.count('\n') + 1
+
+    # ---- Only the changed regions are sent (--since/--staged) ----
+    chunks = []
+    if regions is not None:
+        chunks = split_on_regions(originalCode, regions)
+
+    # ---- Large files are split on class/function (or block/macro) boundaries ----
+    if len(chunks) <= 1 and num_rows > Config.CHUNK_THRESHOLD_LINES:
+        chunks = split_into_chunks(originalCode, file_extension, Config.CHUNK_MAX_LINES)
+
+    if len(chunks) > 1:
+        selected = [chunk for chunk in chunks if chunk.selected]
+        current_span().set(chunks=len(selected))
+        if regions is not None:
+            myLogger.info(f"Sending {len(selected)} changed regions of {pathOrigFile.name}...")
+        else:
+            myLogger.info(f"Splitting {pathOrigFile.name} into {len(chunks)} chunks...")
+        with ThreadPoolExecutor(max_workers=Config.CHUNK_CONCURRENCY) as executor:
+            # each chunk runs in a copy of this context, so its spans nest under this file
+            futures = {
+                chunk.index: executor.submit(contextvars.copy_context().run, _document_chunk, chunk, pathOrigFile, llmClient, strategy)
+                for chunk in selected
+            }
+            results = {index: future.result() for index, future in futures.items()}
+        myLogger.success(f"LLM requests for {len(selected)} chunks completed in {time.time() - start_time:.1f}s")
+
+        usedPrompts = [prompts for _, prompts in results.values()]
+        pathModifiedCodeTempFile = MyHelpers.writeTempCodeFile(
+            ''.join(results[chunk.index][0] if chunk.selected else chunk.text for chunk in chunks), pathOrigFile.suffix
+        )
+    else:
+        # ---- Determine file type and select appropriate prompt provider ----
+        systemPrompt, userPrompt = _build_prompts(originalCode, file_extension, strategy)
+        usedPrompts = [(systemPrompt, userPrompt)]
+
+        # ---- send prompt to LLM and apply changes using strategy (wholefile, udiff or searchreplace) ----
+        llmResponseRaw, pathModifiedCodeTempFile = _request_and_apply(
+            llmClient, (systemPrompt, userPrompt), strategy, pathOrigFile
+        )
         myLogger.success(f"LLM request completed in {time.time() - start_time:.1f}s")
-        myLogger.debug(f"[blue]Raw Response from LLM {model}[/blue]\n")
+        myLogger.debug(f"[blue]Raw Response from LLM {llmClient.modelWithPrefix}[/blue]\n")
         myLogger.debug(f"{llmResponseRaw}", highlight=False)
 
-        # Apply changes using strategy (wholefile or udiff)
-        pathModifiedCodeTempFile = strategy.process_llm_response(llmResponseRaw, pathOrigFile)
         if pathModifiedCodeTempFile is None:
-            myLogger.warning("No changes were made to the file")
-            return
+            return None
+
+    myLogger.success(f"Temp file {pathModifiedCodeTempFile} was created.")
+
+    if llmClient.cancelled.is_set():
+        # the losing side of a hedged request: its response arrived anyway, but is not used
+        pathModifiedCodeTempFile.unlink(missing_ok=True)
+        raise RequestCancelled(f"Discarding the response of cancelled request to {llmClient.modelWithPrefix}")
+
+    # Validate the changes
+    is_valid = _validate_code(pathOrigFile, pathModifiedCodeTempFile)
+    llmClient.recordValidation(is_valid)
+    if not is_valid:
+        # don't serve the same broken completion(s) again on the next run
+        for systemPrompt, userPrompt in usedPrompts:
+            llmClient.discardCachedResponse(systemPrompt, userPrompt)
+        raise CodeValidationError(
+            f"Failed to process {pathOrigFile.name}: Code validation failed. "
+            "The changes would alter the code functionality."
+        )
+    return pathModifiedCodeTempFile
+
+
+def _produce_with_chain(pathOrigFile: Path,
+                        originalCode: str,
+                        model: str,
+                        strategy: ChangeStrategy,
+                        chain: FallbackChain,
+                        start_time: float,
+                        regions: Optional[List[LineRange]] = None) -> Path|None:
+    """Produce the documented code with the file's model/strategy or, failing that, the chain's entries"""
+    strategyName = next((name for name, cls in STRATEGIES.items() if type(strategy) is cls), type(strategy).__name__)
+    primary = ChainEntry(model, strategyName)
+    entries = [primary] + [entry for entry in chain.entries if entry != primary]
+
+    def produce(entry: ChainEntry, llmClient: LLMClient) -> Path|None:
+        with labels(strategy=entry.strategy), span("chain.attempt", model=entry.model, strategy=entry.strategy):
+            llmClient.prewarm()
+            entryStrategy = strategy if entry == primary else create_strategy(entry.strategy)
+            return _produce_documented_code(pathOrigFile, originalCode, llmClient, entryStrategy, start_time, regions)
 
-        myLogger.success(f"Temp file {pathModifiedCodeTempFile} was created.")
+    def discard(pathModifiedCodeTempFile: Path|None) -> None:
+        if pathModifiedCodeTempFile is not None:
+            pathModifiedCodeTempFile.unlink(missing_ok=True)
+
+    winner, pathModifiedCodeTempFile = run_chain(entries, produce, discard, chain.hedge_delay)
+    if winner != primary:
+        myLogger.info(f"{pathOrigFile.name} documented by fallback {winner.model} ({winner.strategy})")
+        current_span().set(model=winner.model, strategy=winner.strategy)
+    return pathModifiedCodeTempFile
+
+
+def improve_file_documentation(pathOrigFile: Path,
+                               model: str,
+                               strategy: ChangeStrategy,
+                               chain: Optional[FallbackChain] = None,
+                               regions: Optional[List[LineRange]] = None) -> bool:
+    """
+    Process file through documentation pipeline, detecting file type and using appropriate prompts
+
+    Returns True if the file was rewritten, False if the response changed nothing
+    (e.g. unparseable docblock JSON, no applicable udiff hunks or blocks).
+
+    With a fallback `chain`, further model/strategy pairs are tried (or hedged) when
+    the file's own model fails or is slow to respond. With `regions` only those line
+    ranges are documented (git-aware runs) and merged back into the file.
+    """
+    with span("file.document", file=str(pathOrigFile), model=model, strategy=type(strategy).__name__) as traced:
+        originalCode = pathOrigFile.read_text()
+        traced.set(bytes=len(originalCode))
+
+        try:
+            start_time = time.time()
         
-        # Validate the changes
-        is_valid = _validate_code(pathOrigFile, pathModifiedCodeTempFile)
-        if not is_valid:
-            raise RuntimeError(
-                f"Failed to process {pathOrigFile.name}: Code validation failed. "
-                "The changes would alter the code functionality."
-            )
+            # ---- Log initial information ----
+            num_rows = originalCode.count('\n') + 1
+            myLogger.info(f"⏳ Analyzing [magenta]{pathOrigFile.name}[/magenta]: {len(originalCode):,} characters / {num_rows:,} lines...")
+        
+            file_extension = pathOrigFile.suffix.lower()
+            # normalize the original for validation while the LLM request is in flight
+            prefetch_normalized(originalCode, file_extension)
 
-        if pathModifiedCodeTempFile and pathModifiedCodeTempFile.exists():
-            # Handle diff output format
-            if strategy == UDiffStrategy():
-                diff_result = subprocess.run(
-                    ['diff', '-u', '--color=always', str(pathOrigFile), str(pathModifiedCodeTempFile)],
-                    capture_output=True,
-                    text=True
-                )
-            else:
-                # Show standard diff of changes
-                diff_result = subprocess.run(
-                    ['diff', '-u', '--color=always', str(pathOrigFile), str(pathModifiedCodeTempFile)],
-                    capture_output=True,
-                    text=True
-                )
-            if diff_result.stdout or diff_result.stderr:
-                myLogger.success("Applied changes:")
-                print(diff_result.stdout or diff_result.stderr)
-                # same permissions as original file
-                shutil.copystat(pathOrigFile, pathModifiedCodeTempFile)
-                # Copy the validated temporary file to the target location
-                shutil.copy2(pathModifiedCodeTempFile, pathOrigFile)
+            if chain is None:
+                llmClient = LLMClient(modelWithPrefix=model, cache=get_response_cache())
+                llmClient.prewarm()
+                pathModifiedCodeTempFile = _produce_documented_code(pathOrigFile, originalCode, llmClient, strategy,
+                                                                    start_time, regions)
             else:
+                pathModifiedCodeTempFile = _produce_with_chain(pathOrigFile, originalCode, model, strategy, chain,
+                                                               start_time, regions)
+
+            if pathModifiedCodeTempFile is None:
                 myLogger.warning("No changes were made to the file")
+                return False
+
+            if pathModifiedCodeTempFile and pathModifiedCodeTempFile.exists():
+                # Handle diff output format
+                if strategy == UDiffStrategy():
+                    diff_result = subprocess.run(
+                        ['diff', '-u', '--color=always', str(pathOrigFile), str(pathModifiedCodeTempFile)],
+                        capture_output=True,
+                        text=True
+                    )
+                else:
+                    # Show standard diff of changes
+                    diff_result = subprocess.run(
+                        ['diff', '-u', '--color=always', str(pathOrigFile), str(pathModifiedCodeTempFile)],
+                        capture_output=True,
+                        text=True
+                    )
+                if diff_result.stdout or diff_result.stderr:
+                    myLogger.success("Applied changes:")
+                    print(diff_result.stdout or diff_result.stderr)
+                    with span("file.write", bytes=pathModifiedCodeTempFile.stat().st_size):
+                        # same permissions as original file
+                        shutil.copystat(pathOrigFile, pathModifiedCodeTempFile)
+                        # Copy the validated temporary file to the target location
+                        shutil.copy2(pathModifiedCodeTempFile, pathOrigFile)
+                    written = True
+                else:
+                    myLogger.warning("No changes were made to the file")
+                    written = False
             
-            pathModifiedCodeTempFile.unlink()  # Clean up temp file after successful copy
-        else:
-            raise RuntimeError("Temporary file not found after validation")
+                pathModifiedCodeTempFile.unlink()  # Clean up temp file after successful copy
+            else:
+                raise RuntimeError("Temporary file not found after validation")
         
-        return None
-    except Exception as e:
-        if "Code chunk too large" in str(e):
-            raise RuntimeError(
-                f"Failed to process {pathOrigFile.name}: File too large even after chunking. "
-                "Consider splitting the file into smaller modules."
-            ) from e
-        raise
+            return written
+        except Exception as e:
+            if "Code chunk too large" in str(e):
+                raise RuntimeError(
+                    f"Failed to process {pathOrigFile.name}: File too large even after chunking. "
+                    "Consider splitting the file into smaller modules."
+                ) from e
+            raise
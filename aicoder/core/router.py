@@ -0,0 +1,136 @@
+# ---- Model Router ----
+# File: aicoder/core/router.py
+#
+# Picks a model per file from a profile's `pool` of candidates. Rolling statistics
+# per model come from the request ledger, which every request of the current run
+# writes to as well: time to first token, tokens/sec, the share of attempts that
+# hit a 429 or failed, and the validation pass rate per strategy and file size.
+# The candidate with the lowest expected time to a valid result wins.
+
+import sqlite3
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import Config
+from ..llm.api_client import resolve_provider
+from ..llm.ledger import OUTCOME_ERROR, OUTCOME_SUCCESS, VALIDATION_PASSED, get_ledger
+from ..utils.logger import myLogger
+
+# weight of ROUTER_PRIOR_PASS_RATE in the pass rate, in validated files
+_PRIOR_WEIGHT = 2.0
+_MIN_SUCCESS_PROBABILITY = 0.05
+
+
+def size_bucket(lines: int) -> str:
+    """File size class used to keep validation pass rates apart (see Config.ROUTER_SIZE_BUCKETS)"""
+    for max_lines, name in Config.ROUTER_SIZE_BUCKETS:
+        if lines <= max_lines:
+            return name
+    return "large"
+
+
+@dataclass
+class ModelStats:
+    """Rolling statistics of one model"""
+    requests: int = 0
+    ttft: Optional[float] = None              # median seconds to the first token (0 if only non-streamed)
+    tokens_per_sec: Optional[float] = None    # median generation speed
+    failure_rate: float = 0.0                 # attempts that got a 429 or failed
+    # (strategy, size bucket) -> (validated, passed)
+    validations: Dict[Tuple[str, str], Tuple[int, int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_rows(cls, rows: List[dict]) -> "ModelStats":
+        stats = cls(requests=len(rows))
+        succeeded = [row for row in rows if row["outcome"] == OUTCOME_SUCCESS and row["latency"]]
+        ttfts = [row["ttft"] for row in succeeded if row["ttft"] is not None]
+        # without streaming there is no time to first token: the whole latency counts as generation
+        stats.ttft = statistics.median(ttfts) if ttfts else (0.0 if succeeded else None)
+        speeds = [row["completion_tokens"] / (row["latency"] - (row["ttft"] or 0.0))
+                  for row in succeeded if row["completion_tokens"] and row["latency"] > (row["ttft"] or 0.0)]
+        stats.tokens_per_sec = statistics.median(speeds) if speeds else None
+
+        attempts = sum(1 + row["retries"] for row in rows)
+        failures = sum(row["retries"] + (row["outcome"] == OUTCOME_ERROR) for row in rows)
+        stats.failure_rate = failures / attempts if attempts else 0.0
+
+        for row in rows:
+            if row["validation"]:
+                key = (row["strategy"] or "", row["size_bucket"] or "")
+                validated, passed = stats.validations.get(key, (0, 0))
+                stats.validations[key] = (validated + 1, passed + (row["validation"] == VALIDATION_PASSED))
+        return stats
+
+    def pass_rate(self, strategy: str, bucket: str) -> float:
+        """
+        Validation pass rate for the strategy and size bucket, falling back to all sizes of
+        the strategy, then to all of the model's files; smoothed towards ROUTER_PRIOR_PASS_RATE
+        """
+        for matches in (lambda key: key == (strategy, bucket),
+                        lambda key: key[0] == strategy,
+                        lambda key: True):
+            counts = [counts for key, counts in self.validations.items() if matches(key)]
+            if counts:
+                validated = sum(v for v, _ in counts)
+                passed = sum(p for _, p in counts)
+                return (passed + Config.ROUTER_PRIOR_PASS_RATE * _PRIOR_WEIGHT) / (validated + _PRIOR_WEIGHT)
+        return Config.ROUTER_PRIOR_PASS_RATE
+
+
+class ModelRouter:
+    """Chooses a model from `pool` per file; statistics are re-read every ROUTER_REFRESH_SECONDS"""
+
+    def __init__(self, pool: List[str]):
+        self.pool = list(pool)
+        self._stats: Dict[str, ModelStats] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_profile(cls, profile_settings: Dict[str, Any]) -> Optional["ModelRouter"]:
+        """The router for a resolved profile's `pool` (see ProfileLoader.get_profile), None without one"""
+        pool = profile_settings.get("pool") or []
+        return cls(pool) if pool else None
+
+    @staticmethod
+    def _ledger_model(model: str) -> str:
+        # the ledger records provider/model without alias or default provider
+        _, provider_name, model_name = resolve_provider(model)
+        return f"{provider_name}/{model_name}"
+
+    def stats(self, model: str) -> ModelStats:
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > Config.ROUTER_REFRESH_SECONDS:
+                self._stats = self._load()
+                self._loaded_at = time.monotonic()
+            return self._stats.get(model) or ModelStats()
+
+    def _load(self) -> Dict[str, ModelStats]:
+        ledger = get_ledger()
+        if ledger is None:
+            return {}
+        try:
+            return {model: ModelStats.from_rows(ledger.recent(self._ledger_model(model), Config.ROUTER_WINDOW))
+                    for model in self.pool}
+        except sqlite3.Error as e:
+            myLogger.debug(f"Model router could not read the request ledger: {e}")
+            return {}
+
+    def expected_seconds(self, model: str, strategy: str, lines: int, output_tokens: int) -> float:
+        """Expected time until a response for the file validates, counting retries and failed attempts"""
+        stats = self.stats(model)
+        known = stats.requests >= Config.ROUTER_MIN_SAMPLES
+        ttft = stats.ttft if known and stats.ttft is not None else Config.PLAN_REQUEST_LATENCY
+        speed = stats.tokens_per_sec if known and stats.tokens_per_sec else Config.PLAN_OUTPUT_TOKENS_PER_SECOND
+        success = (1.0 - stats.failure_rate) * stats.pass_rate(strategy, size_bucket(lines))
+        return (ttft + output_tokens / speed) / max(_MIN_SUCCESS_PROBABILITY, success)
+
+    def choose(self, strategy: str, lines: int, output_tokens: int) -> Tuple[str, float]:
+        """The pool model with the lowest expected time to a valid result, and that time"""
+        expected = {model: self.expected_seconds(model, strategy, lines, output_tokens) for model in self.pool}
+        model = min(self.pool, key=expected.__getitem__)
+        myLogger.debug("Router: " + ", ".join(f"{m} {s:.1f}s" for m, s in expected.items()) + f" -> {model}")
+        return model, expected[model]
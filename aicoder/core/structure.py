@@ -0,0 +1,253 @@
+# ---- Code Structure Scanning ----
+# File: aicoder/core/structure.py
+#
+# Lightweight, line-oriented scanners that find classes/functions in PHP and
+# blocks/macros in Twig. They are not full parsers: they only need to be good
+# enough to pick safe split points and to locate symbols by name.
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class Symbol:
+    """A declaration found in a source file (line numbers are 0-based, end inclusive)"""
+    kind: str           # class, interface, trait, enum, function, method / block, macro
+    name: str
+    start_line: int     # line of the declaration itself
+    end_line: int       # last line of the body (closing brace / end tag)
+    depth: int          # nesting depth of the declaration (0 = top level)
+    doc_start: int      # first line of the comment/attribute lines directly above the declaration
+    parent: Optional[str] = None
+
+
+_PHP_CLASS_RE = re.compile(
+    r'^\s*(?:(?:abstract|final|readonly)\s+)*(class|interface|trait|enum)\s+([A-Za-z_]\w*)', re.IGNORECASE)
+_PHP_FUNCTION_RE = re.compile(
+    r'^\s*(?:(?:public|protected|private|static|abstract|final)\s+)*function\s+&?\s*([A-Za-z_]\w*)\s*\(',
+    re.IGNORECASE)
+_PHP_HEREDOC_RE = re.compile(r'<<<\s*([\'"]?)([A-Za-z_]\w*)\1')
+
+
+def _scan_php_lines(code: str) -> List[dict]:
+    """
+    Walk the source once and report, per line, the brace depth at line start, whether
+    the line starts inside a comment/string (so declarations there are ignored) and the
+    brace/semicolon events on that line as (event, depth) pairs.
+    """
+    lines = code.splitlines(keepends=True)
+    info = []
+    depth = 0
+    state = 'html'  # html, code, sq, dq, block_comment, heredoc
+    heredoc_label = None
+
+    for line in lines:
+        events = []
+        info.append({'depth': depth, 'state': state, 'events': events})
+        i = 0
+        n = len(line)
+        while i < n:
+            ch = line[i]
+            if state == 'html':
+                if line.startswith('<?php', i):
+                    state = 'code'
+                    i += 5
+                    continue
+                if line.startswith('<?=', i):
+                    state = 'code'
+                    i += 3
+                    continue
+                i += 1
+            elif state == 'code':
+                if line.startswith('?>', i):
+                    state = 'html'
+                    i += 2
+                elif ch == '/' and line.startswith('//', i) or (ch == '#' and not line.startswith('#[', i)):
+                    # line comment: ends at newline or closing tag
+                    close_tag = line.find('?>', i)
+                    if close_tag == -1:
+                        break
+                    i = close_tag
+                elif line.startswith('/*', i):
+                    state = 'block_comment'
+                    i += 2
+                elif ch == "'":
+                    state = 'sq'
+                    i += 1
+                elif ch == '"':
+                    state = 'dq'
+                    i += 1
+                elif line.startswith('<<<', i):
+                    match = _PHP_HEREDOC_RE.match(line, i)
+                    if match:
+                        state = 'heredoc'
+                        heredoc_label = match.group(2)
+                        break
+                    i += 3
+                elif ch == '{':
+                    depth += 1
+                    events.append(('open', depth))
+                    i += 1
+                elif ch == '}':
+                    depth -= 1
+                    events.append(('close', depth))
+                    i += 1
+                elif ch == ';':
+                    events.append(('semicolon', depth))
+                    i += 1
+                else:
+                    i += 1
+            elif state == 'block_comment':
+                end = line.find('*/', i)
+                if end == -1:
+                    break
+                state = 'code'
+                i = end + 2
+            elif state in ('sq', 'dq'):
+                quote = "'" if state == 'sq' else '"'
+                if ch == '\\':
+                    i += 2
+                elif ch == quote:
+                    state = 'code'
+                    i += 1
+                else:
+                    i += 1
+            elif state == 'heredoc':
+                if re.match(r'\s*' + re.escape(heredoc_label) + r'\b', line):
+                    state = 'code'
+                    i = line.index(heredoc_label) + len(heredoc_label)
+                else:
+                    break
+    return info
+
+
+def _doc_start(lines: List[str], start_line: int, is_comment_line) -> int:
+    """Extend a declaration upwards over directly preceding comment/attribute lines"""
+    doc_start = start_line
+    in_block = False
+    for index in range(start_line - 1, -1, -1):
+        stripped = lines[index].strip()
+        if in_block:
+            doc_start = index
+            if stripped.startswith('/*'):
+                in_block = False
+            continue
+        if stripped.endswith('*/') and not stripped.startswith('/*'):
+            in_block = True
+            doc_start = index
+        elif is_comment_line(stripped):
+            doc_start = index
+        else:
+            break
+    return doc_start
+
+
+def _is_php_comment_line(stripped: str) -> bool:
+    return (stripped.startswith(('//', '/*', '*', '#[')) or
+            (stripped.startswith('#') and not stripped.startswith('#['))) and stripped != ''
+
+
+def find_php_symbols(code: str) -> List[Symbol]:
+    """Find classes, interfaces, traits, enums, functions and methods in PHP source"""
+    lines = code.splitlines(keepends=True)
+    info = _scan_php_lines(code)
+    symbols: List[Symbol] = []
+    open_symbols: List[Symbol] = []
+    body_opened = {}
+
+    for index, line in enumerate(lines):
+        line_info = info[index]
+        if line_info['state'] == 'code':
+            kind = name = None
+            match = _PHP_CLASS_RE.match(line)
+            if match:
+                kind, name = match.group(1).lower(), match.group(2)
+            else:
+                match = _PHP_FUNCTION_RE.match(line)
+                if match:
+                    name = match.group(1)
+                    in_class = any(s.kind in ('class', 'interface', 'trait', 'enum') for s in open_symbols)
+                    kind = 'method' if in_class else 'function'
+            if kind:
+                parent = open_symbols[-1].name if open_symbols else None
+                doc_start = _doc_start(lines, index, _is_php_comment_line)
+                symbol = Symbol(kind, name, index, index, line_info['depth'], doc_start, parent)
+                symbols.append(symbol)
+                open_symbols.append(symbol)
+                body_opened[id(symbol)] = False
+
+        # close symbols whose body ended on this line; bodiless declarations end at their ';'
+        for event, event_depth in line_info['events']:
+            if not open_symbols:
+                break
+            current = open_symbols[-1]
+            opened = body_opened[id(current)]
+            if event == 'open' and event_depth == current.depth + 1:
+                body_opened[id(current)] = True
+            elif (event == 'close' and event_depth == current.depth and opened) or \
+                    (event == 'semicolon' and event_depth == current.depth and not opened):
+                current.end_line = index
+                open_symbols.pop()
+
+    for symbol in open_symbols:
+        symbol.end_line = len(lines) - 1
+    return symbols
+
+
+_TWIG_TAG_RE = re.compile(r'\{%-?\s*(block|endblock|macro|endmacro)\b\s*([A-Za-z_]\w*)?(.*?)-?%\}', re.DOTALL)
+
+
+def _is_twig_comment_line(stripped: str) -> bool:
+    return stripped.startswith('{#') or (stripped.endswith('#}') and stripped != '')
+
+
+def find_twig_symbols(code: str) -> List[Symbol]:
+    """Find blocks and macros in Twig source"""
+    lines = code.splitlines(keepends=True)
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line))
+
+    def line_of(offset: int) -> int:
+        lo, hi = 0, len(lines) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if line_starts[mid] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    # Remove comments first so tags mentioned inside {# ... #} are ignored (keep offsets intact)
+    masked = re.sub(r'\{#.*?#\}', lambda m: re.sub(r'[^\n]', ' ', m.group(0)), code, flags=re.DOTALL)
+
+    symbols: List[Symbol] = []
+    stack: List[Symbol] = []
+    for match in _TWIG_TAG_RE.finditer(masked):
+        tag, name, rest = match.group(1), match.group(2), match.group(3).strip()
+        line = line_of(match.start())
+        if tag in ('block', 'macro') and name:
+            symbol = Symbol(tag, name, line, line, len(stack), _doc_start(lines, line, _is_twig_comment_line),
+                            stack[-1].name if stack else None)
+            symbols.append(symbol)
+            # `{% block title "Text" %}` is a complete block without an end tag
+            if tag == 'block' and rest:
+                symbol.end_line = line_of(match.end() - 1)
+            else:
+                stack.append(symbol)
+        elif tag in ('endblock', 'endmacro') and stack:
+            stack.pop().end_line = line_of(match.end() - 1)
+
+    for symbol in stack:
+        symbol.end_line = len(lines) - 1
+    return symbols
+
+
+def find_symbols(code: str, file_extension: str) -> List[Symbol]:
+    """Find symbols for a file type ('.php' or '.twig'); other types have none"""
+    if file_extension == '.php':
+        return find_php_symbols(code)
+    if file_extension == '.twig':
+        return find_twig_symbols(code)
+    return []
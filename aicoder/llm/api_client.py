@@ -1,66 +1,354 @@
+import asyncio
+import contextvars
 import json
+import sqlite3
+import sys
+import threading
 import time
-import yaml
-from pathlib import Path
-from typing import Optional, Dict
+from contextlib import contextmanager
+from typing import Any, Optional, Dict, Generator, Iterator, List, Mapping, Tuple
 
 # ---- Add necessary imports ----
-from openai import RateLimitError as OpenAiRateLimitError
 from requests.exceptions import HTTPError as RequestsHTTPError
+from .cache import ResponseCache
+from .ledger import OUTCOME_CANCELLED, OUTCOME_ERROR, OUTCOME_SUCCESS, current_labels, get_ledger
 from .providers import OpenAIApiAdapter, OpenRouterApiAdapter
+from .rate_limiter import get_rate_limiter
+from .tokens import estimate_messages_tokens, estimate_request_tokens, estimate_tokens
 from ..utils.logger import myLogger
+from ..utils.threads import run_in_thread
+from ..utils.tracing import current_span, record, span
 from ..config import Config  # Import the Config class
+from ..profiles import get_profile_loader
 
-# Cache for model aliases
-_model_aliases_cache: Optional[Dict[str, str]] = None
+# Additional provider adapters by model prefix ("<prefix>/<model>"), e.g. the benchmarks' fake provider
+PROVIDERS: Dict[str, type] = {}
 
+# Token usage reported by the provider for the request running in this context (see LLMClient._ledgerEntry)
+_usageSlot: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("aicoder_usage_slot", default=None)
 
-def _resolve_model_alias(model_with_prefix: str) -> str:
-    """Resolve model aliases from YAML configuration."""
-    global _model_aliases_cache
+def _retryableErrors() -> tuple:
+    """Exception types that may be rate limit errors; openai's only once the SDK has been imported"""
+    # the SDK takes about half a second to import, so it is only loaded by the providers that use it
+    openai = sys.modules.get("openai")
+    return (RequestsHTTPError, openai.RateLimitError) if openai is not None else (RequestsHTTPError,)
+
+
+# Steps of LLMClient._retryLoop, performed by its sync and async drivers
+_SLEEP, _ACQUIRE, _COMPLETE = "sleep", "acquire", "complete"
+
+
+class RequestCancelled(RuntimeError):
+    """Raised by the requests of a cancelled client, e.g. the losing side of a hedged request"""
+    pass
 
-    if _model_aliases_cache is None:
-        aliases_path = Path(__file__).parent.parent.parent / "config" / "model-aliases.yaml"
-        if aliases_path.exists():
-            with open(aliases_path, 'r') as f:
-                _model_aliases_cache = yaml.safe_load(f) or {}
-        else:
-            _model_aliases_cache = {}
 
-    return _model_aliases_cache.get(model_with_prefix, model_with_prefix)
+def resolve_provider(model_with_prefix: str) -> Tuple[type, str, str]:
+    """
+    Resolve an alias and pick the provider from the model prefix.
+
+    Returns:
+        Tuple[type, str, str]: Provider adapter class, provider name and model name without prefix
+    """
+    model = get_profile_loader().resolve_model_alias(model_with_prefix)
+
+    # Determine provider based on model prefix
+    if model.startswith("openai/"):
+        return OpenAIApiAdapter, "openai", model.replace("openai/", "", 1)
+    if model.startswith("openrouter/"):
+        return OpenRouterApiAdapter, "openrouter", model.replace("openrouter/", "", 1)
+    prefix, separator, name = model.partition("/")
+    if separator and prefix in PROVIDERS:
+        return PROVIDERS[prefix], prefix, name
+    # Default to openrouter if no prefix
+    return OpenRouterApiAdapter, "openrouter", model
 
 
 class LLMClient:
     """Client for interacting with LLM providers."""
 
-    def __init__(self, modelWithPrefix: str):
-        """Initialize the LLM client with a specific model."""
+    def __init__(self, modelWithPrefix: str, cache: Optional[ResponseCache] = None):
+        """
+        Initialize the LLM client with a specific model.
+
+        Args:
+            modelWithPrefix: Model identifier or alias, e.g. "openrouter/qwen/qwen-max"
+            cache: Optional response cache; completions are reused for identical requests
+        """
         self.modelWithPrefix = modelWithPrefix
-        self.model = _resolve_model_alias(modelWithPrefix)
-
-        # Determine provider based on model prefix
-        if self.model.startswith("openai/"):
-            self.provider = OpenAIApiAdapter()
-            self.provider_name = "openai"
-            self.model = self.model.replace("openai/", "", 1)
-        elif self.model.startswith("openrouter/"):
-            self.provider = OpenRouterApiAdapter()
-            self.provider_name = "openrouter"
-            self.model = self.model.replace("openrouter/", "", 1)
-        else:
-            # Default to openrouter if no prefix
-            self.provider = OpenRouterApiAdapter()
-            self.provider_name = "openrouter"
+        self.cache = cache
+        providerClass, self.provider_name, self.model = resolve_provider(modelWithPrefix)
+        # Config.LLM_BASE_URL sends requests elsewhere, e.g. to the local mock server
+        self.baseUrl = Config.LLM_BASE_URL
+        self.provider = providerClass(base_url=self.baseUrl) if self.baseUrl else providerClass()
+
+        # Shared by all clients of this provider/model; learns the quota from response headers
+        self.rateLimiter = get_rate_limiter(f"{self.provider_name}/{self.model}", modelWithPrefix,
+                                            provider=self.provider_name, api_key=self._apiKey())
+        if self.rateLimiter is not None:
+            self.provider.add_response_listener(self.rateLimiter.update_from_headers)
+        # ledger rows of the requests made by this client, updated with the validation outcome
+        self.ledgerIds: List[int] = []
+        self.provider.add_usage_listener(self._onUsage)
+        # set when the first response text arrives, and by cancel(); used to hedge slow requests
+        self.firstToken = threading.Event()
+        self.cancelled = threading.Event()
 
-    def sendRequest(self, systemPrompt: str, userPrompt: str, verbose: bool = True) -> str:
-        """Send PHP code to LLM and return documented version, with retry logic."""
+    def _apiKey(self) -> Optional[str]:
+        try:
+            api_key = self.provider.get_api_credentials(None)[0]
+        except Exception:
+            return None
+        return api_key if isinstance(api_key, str) else None
+
+    def prewarm(self) -> None:
+        """Start connecting to the provider in the background; errors surface on the real request."""
+        try:
+            self.provider.prewarm()
+        except Exception as e:
+            myLogger.debug(f"Skipping connection pre-warm for {self.provider_name}: {e}")
+
+    def cancel(self) -> None:
+        """
+        Abort this client's requests: streams stop at the next piece and no further attempt is made.
+
+        Best effort: a non-streamed request already in flight is not interrupted (the HTTP
+        sessions are shared); its caller should check `cancelled` once it returns.
+        """
+        self.cancelled.set()
+
+    def _checkCancelled(self) -> None:
+        if self.cancelled.is_set():
+            raise RequestCancelled(f"Request to {self.provider_name}/{self.model} was cancelled")
+
+    def sendRequest(self, systemPrompt: str, userPrompt: str, verbose: bool = True,
+                    responseFormat: Optional[dict] = None) -> str:
+        """Send PHP code to LLM and return documented version, with retry logic.
+
+        `responseFormat` (e.g. {"type": "json_object"}) is passed on to providers that support it.
+        """
         myLogger.debug(f"LLM Prompt:\n{userPrompt}", highlight=False)
 
-        messages = [
-            {"role": "system", "content": systemPrompt},
-            {"role": "user", "content": userPrompt}
-        ]
+        with span("llm.request", **self._spanAttributes(systemPrompt, userPrompt), cached=self.cache is not None) as traced:
+            if self.cache is None:
+                content = self._sendWithRetries(systemPrompt, userPrompt, verbose, responseFormat)
+            else:
+                requested = []
+                content = self.cache.get_or_compute(
+                    self._cacheKey(systemPrompt, userPrompt),
+                    f"{self.provider_name}/{self.model}",
+                    lambda: requested.append(True) or self._sendWithRetries(systemPrompt, userPrompt, verbose, responseFormat)
+                )
+                if not requested:
+                    self._recordCacheHit(systemPrompt, userPrompt, content)
+            self.firstToken.set()
+            traced.set(response_bytes=len(content), completion_tokens=estimate_tokens(content))
+            return content
+
+    @staticmethod
+    def _onUsage(usage: Mapping) -> None:
+        slot = _usageSlot.get()
+        if slot is not None and isinstance(usage, Mapping):
+            slot.update(usage)
+
+    @contextmanager
+    def _ledgerEntry(self, messages: list, streaming: bool = False):
+        """
+        Record the request made inside the block in the ledger, also when it fails.
+
+        The block fills in `attempts`, `content` (text, or the list of streamed pieces) and
+        (streaming) `ttft`; token counts come from the provider's usage report, or are estimated.
+        """
+        entry = {"started": time.time(), "attempts": 0, "content": None, "ttft": None, "usage": {}}
+        token = _usageSlot.set(entry["usage"])
+        error = None
+        try:
+            yield entry
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # a generator must not reset context variables across yields; its slot is replaced by the next request
+            if not streaming:
+                _usageSlot.reset(token)
+            if not isinstance(error, GeneratorExit):
+                self._recordRequest(messages, entry, streaming, error)
+
+    def _recordRequest(self, messages: list, entry: dict, streaming: bool = False,
+                       error: Optional[BaseException] = None, cacheHit: bool = False) -> None:
+        ledger = get_ledger()
+        if ledger is None:
+            return
+        usage = entry["usage"]
+        content = entry["content"] or ""
+        if isinstance(content, list):
+            content = ''.join(content)
+        promptTokens, completionTokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        estimated = promptTokens is None or completionTokens is None
+        labels = current_labels()
+        try:
+            self.ledgerIds.append(ledger.record(
+                started_at=entry["started"],
+                model=f"{self.provider_name}/{self.model}",
+                profile=labels.get("profile"),
+                strategy=labels.get("strategy"),
+                file=labels.get("file"),
+                size_bucket=labels.get("size"),
+                prompt_tokens=estimate_messages_tokens(messages) if promptTokens is None else promptTokens,
+                completion_tokens=estimate_tokens(content) if completionTokens is None else completionTokens,
+                cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+                tokens_estimated=estimated,
+                latency=time.time() - entry["started"],
+                ttft=entry["ttft"],
+                retries=max(0, entry["attempts"] - 1),
+                streaming=streaming,
+                cache_hit=cacheHit,
+                outcome=self._outcome(error),
+                error=f"{type(error).__name__}: {error}"[:500] if error is not None else None,
+            ))
+        except sqlite3.Error as e:
+            myLogger.debug(f"Could not record request in the ledger: {e}")
+
+    @staticmethod
+    def _outcome(error: Optional[BaseException]) -> str:
+        if error is None:
+            return OUTCOME_SUCCESS
+        return OUTCOME_CANCELLED if isinstance(error, RequestCancelled) else OUTCOME_ERROR
+
+    def _recordCacheHit(self, systemPrompt: str, userPrompt: str, content: str) -> None:
+        entry = {"started": time.time(), "attempts": 0, "content": content, "ttft": None, "usage": {}}
+        self._recordRequest(self._messages(systemPrompt, userPrompt), entry, cacheHit=True)
+
+    def recordValidation(self, passed: bool) -> None:
+        """Store the validation outcome of the file with the requests this client made for it"""
+        ledger = get_ledger()
+        if ledger is None or not self.ledgerIds:
+            return
+        try:
+            ledger.set_validation(self.ledgerIds, passed)
+        except sqlite3.Error as e:
+            myLogger.debug(f"Could not record the validation outcome in the ledger: {e}")
+
+    def discardCachedResponse(self, systemPrompt: str, userPrompt: str) -> None:
+        """Forget the cached completion for a request, e.g. because it failed validation."""
+        if self.cache is not None:
+            self.cache.discard(self._cacheKey(systemPrompt, userPrompt))
+
+    def _spanAttributes(self, systemPrompt: str, userPrompt: str) -> dict:
+        return {
+            "model": f"{self.provider_name}/{self.model}",
+            "prompt_bytes": len(systemPrompt) + len(userPrompt),
+            "prompt_tokens": estimate_tokens(systemPrompt) + estimate_tokens(userPrompt),
+        }
+
+    def _cacheKey(self, systemPrompt: str, userPrompt: str) -> str:
+        # completions from another endpoint (mock server) must not mix with the provider's
+        endpoint = f"@{self.baseUrl}" if self.baseUrl else ""
+        return ResponseCache.make_key(
+            f"{self.provider_name}/{self.model}{endpoint}", systemPrompt, userPrompt, Config.DEFAULT_TEMPERATURE
+        )
+
+    def streamRequest(self, systemPrompt: str, userPrompt: str, verbose: bool = True,
+                      responseFormat: Optional[dict] = None) -> Iterator[str]:
+        """
+        Send a request and yield the completion text as it is generated.
+
+        Rate limit errors are retried only until the first piece of text has arrived;
+        a cached completion is yielded as a single piece.
+        """
+        myLogger.debug(f"LLM Prompt (streaming):\n{userPrompt}", highlight=False)
+
+        # spans are recorded, not entered: a span entered here would leak into the consumer at each yield
+        requestStart = time.time_ns()
+        attributes = self._spanAttributes(systemPrompt, userPrompt)
+        if self.cache is not None:
+            cached = self.cache.get(self._cacheKey(systemPrompt, userPrompt))
+            if cached is not None:
+                myLogger.debug(f"LLM cache hit for {self.provider_name}/{self.model}")
+                record("llm.request", requestStart, cached=True, streaming=True, **attributes)
+                self._recordCacheHit(systemPrompt, userPrompt, cached)
+                self.firstToken.set()
+                yield cached
+                return
+
+        messages = self._messages(systemPrompt, userPrompt)
+        parts = []
+        last_exception = None
+
+        with self._ledgerEntry(messages, streaming=True) as entry:
+            entry["content"] = parts
+            for attempt in range(Config.LLM_RETRY_COUNT + 1):  # +1 to include the initial attempt
+                if attempt > 0:
+                    self._sleepBeforeRetry(attempt)
+
+                self._checkCancelled()
+                entry["attempts"] = attempt + 1
+                queueStart = time.time_ns()
+                self._acquireSlot(messages)
+                attemptStart = time.time_ns()
+                record("llm.queue_wait", queueStart, attemptStart, attempt=attempt)
+                firstPiece = None
+                outcome = None
+                abandoned = False
+                try:
+                    for piece in self.provider.stream_completion(self.model, messages, verbose,
+                                                                  **self._formatKwargs(responseFormat)):
+                        self._checkCancelled()
+                        if firstPiece is None:
+                            firstPiece = time.time_ns()
+                            entry["ttft"] = (firstPiece - attemptStart) / 1e9
+                            self.firstToken.set()
+                            record("llm.ttft", attemptStart, firstPiece, attempt=attempt, **attributes)
+                        parts.append(piece)
+                        yield piece
+                    if firstPiece is not None:
+                        content = ''.join(parts)
+                        record("llm.generation", firstPiece, attempt=attempt, response_bytes=len(content),
+                               completion_tokens=estimate_tokens(content))
+                    break
+
+                except _retryableErrors() as e:
+                    last_exception = outcome = e
+                    if parts or not self._isRateLimitError(e):
+                        # can't retry once output has been handed out
+                        raise
+                    continue
+
+                except RequestCancelled as e:
+                    outcome = e
+                    raise
+
+                except GeneratorExit:
+                    # the consumer stopped reading; that says nothing about the provider
+                    abandoned = True
+                    raise
 
+                except Exception as e:
+                    outcome = e
+                    raise self._nonRetryableError(e, userPrompt) from e
+
+                finally:
+                    self._releaseSlot(outcome, report=not abandoned)
+                    if outcome is not None:
+                        record("llm.attempt_failed", attemptStart, attempt=attempt, error=f"{type(outcome).__name__}: {outcome}")
+            else:
+                raise self._retriesExhaustedError(last_exception) from last_exception
+
+            record("llm.request", requestStart, cached=False, streaming=True, attempts=attempt + 1, **attributes)
+        if self.cache is not None:
+            self.cache.store(self._cacheKey(systemPrompt, userPrompt), f"{self.provider_name}/{self.model}", ''.join(parts))
+
+    @staticmethod
+    def _isRateLimitError(e: Exception) -> bool:
+        # For requests, we need to check the status code explicitly;
+        # for openai's RateLimitError, the type itself is enough.
+        if isinstance(e, RequestsHTTPError):
+            return e.response is not None and e.response.status_code == 429
+        return isinstance(e, _retryableErrors()[1:])
+
+    @staticmethod
+    def _retryDelay(attempt: int) -> float:
+        """Delay before retry `attempt` (1-based); it grows linearly from min to max delay."""
         # Calculate the linear step for the delay increase
         # Avoid division by zero if retry count is 1
         if Config.LLM_RETRY_COUNT > 1:
@@ -68,47 +356,221 @@ class LLMClient:
         else:
             delay_step = 0
 
+        sleep_duration = Config.LLM_RETRY_MIN_DELAY + (attempt - 1) * delay_step
+        sleep_duration = min(sleep_duration, Config.LLM_RETRY_MAX_DELAY)  # Cap the delay
+
+        myLogger.warning(
+            f"Rate limit exceeded. Retrying in {sleep_duration:.1f} seconds... "
+            f"(Attempt {attempt}/{Config.LLM_RETRY_COUNT})"
+        )
+        return sleep_duration
+
+    def _sleepBeforeRetry(self, attempt: int) -> None:
+        delay = self._backoffBeforeRetry(attempt)
+        if delay:
+            with span("llm.retry_sleep", attempt=attempt, seconds=delay):
+                time.sleep(delay)
+
+    def _backoffBeforeRetry(self, attempt: int) -> float:
+        """
+        Seconds to wait before retry `attempt`: 0 if the rate limiter already holds requests
+        back for a provider-requested pause, else the linear delay (shared with other processes).
+        """
+        if self._providerPause(attempt):
+            return 0.0
+        delay = self._retryDelay(attempt)
+        if self.rateLimiter is not None:
+            self.rateLimiter.share_backoff(delay)
+        return delay
+
+    def _providerPause(self, attempt: int) -> float:
+        """
+        Remaining pause the provider asked for (Retry-After / exhausted quota headers).
+
+        When there is one, the rate limiter makes every request wait for it, so the
+        linear back-off is skipped.
+        """
+        pause = self.rateLimiter.blocked_for() if self.rateLimiter is not None else 0.0
+        if pause > 0:
+            myLogger.warning(
+                f"Rate limit exceeded. Provider asked to wait {pause:.1f} seconds... "
+                f"(Attempt {attempt}/{Config.LLM_RETRY_COUNT})"
+            )
+        return pause
+
+    def _acquireSlot(self, messages: list) -> None:
+        if self.rateLimiter is not None:
+            self.rateLimiter.acquire(estimate_request_tokens(messages))
+
+    async def _aacquireSlot(self, messages: list) -> None:
+        if self.rateLimiter is not None:
+            await self.rateLimiter.aacquire(estimate_request_tokens(messages))
+
+    def _releaseSlot(self, outcome: Optional[Exception] = None, report: bool = True) -> None:
+        """Give back the concurrency slot and, if `report`, feed the outcome into the adaptive limit."""
+        if self.rateLimiter is None:
+            return
+        if report and outcome is None:
+            self.rateLimiter.on_success()
+        elif report and self._isRateLimitError(outcome):
+            self.rateLimiter.on_rate_limited()
+        self.rateLimiter.release()
+
+    def _errorDetails(self, userPrompt: str) -> str:
+        return (
+            f"\nAPI Error Details:\n"
+            f"- Model: {self.model}\n"
+            f"- Provider: {self.provider_name}\n"
+            f"- Prompt Length: {len(userPrompt):,} chars\n"
+        )
+
+    @staticmethod
+    def _formatKwargs(responseFormat: Optional[dict]) -> dict:
+        # only passed when set, so providers without `response_format` support keep working
+        return {"response_format": responseFormat} if responseFormat else {}
+
+    @staticmethod
+    def _messages(systemPrompt: str, userPrompt: str) -> list:
+        return [
+            {"role": "system", "content": systemPrompt},
+            {"role": "user", "content": userPrompt}
+        ]
+
+    def _nonRetryableError(self, e: Exception, userPrompt: str) -> RuntimeError:
+        return RuntimeError(f"LLM API failed with a non-retryable error: {str(e)}\n{self._errorDetails(userPrompt)}")
+
+    @staticmethod
+    def _retriesExhaustedError(last_exception: Exception) -> RuntimeError:
+        return RuntimeError(
+            f"LLM API request failed after {Config.LLM_RETRY_COUNT} retries. "
+            f"Last error: {str(last_exception)}"
+        )
+
+    def _retryLoop(self, systemPrompt: str, userPrompt: str, verbose: bool,
+                   responseFormat: Optional[dict] = None) -> Generator[tuple, Any, str]:
+        """
+        The retry loop of sendRequest and asendRequest, written once.
+
+        It yields the steps that block, (_SLEEP, seconds), (_ACQUIRE, messages) and
+        (_COMPLETE, (messages, verbose, kwargs)); _sendWithRetries performs them blocking,
+        _asendWithRetries awaiting. The completion (or the step's exception) is sent back
+        in, and the loop returns the content.
+        """
+        messages = self._messages(systemPrompt, userPrompt)
         last_exception = None
 
-        for attempt in range(Config.LLM_RETRY_COUNT + 1):  # +1 to include the initial attempt
-            if attempt > 0:
-                # This is a retry attempt
-                sleep_duration = Config.LLM_RETRY_MIN_DELAY + (attempt - 1) * delay_step
-                sleep_duration = min(sleep_duration, Config.LLM_RETRY_MAX_DELAY)  # Cap the delay
+        with self._ledgerEntry(messages) as entry:
+            for attempt in range(Config.LLM_RETRY_COUNT + 1):  # +1 to include the initial attempt
+                if attempt > 0:
+                    # This is a retry attempt
+                    delay = self._backoffBeforeRetry(attempt)
+                    if delay:
+                        with span("llm.retry_sleep", attempt=attempt, seconds=delay):
+                            yield _SLEEP, delay
 
-                myLogger.warning(
-                    f"Rate limit exceeded. Retrying in {sleep_duration:.1f} seconds... "
-                    f"(Attempt {attempt}/{Config.LLM_RETRY_COUNT})"
-                )
-                time.sleep(sleep_duration)
+                self._checkCancelled()
+                with span("llm.queue_wait", attempt=attempt):
+                    yield _ACQUIRE, messages
+                current_span().set(cached=False, attempts=attempt + 1)
+                entry["attempts"] = attempt + 1
+                outcome = None
+                finished = False
+                try:
+                    # without streaming, time to first token and generation are one span
+                    with span("llm.completion", attempt=attempt):
+                        content = yield _COMPLETE, (messages, verbose, self._formatKwargs(responseFormat))
+                    entry["content"] = content
+                    finished = True
+                    return content
 
-            try:
-                content = self.provider.create_completion(self.model, messages, verbose)
-                return content
-
-            except (OpenAiRateLimitError, RequestsHTTPError) as e:
-                last_exception = e
-                # For requests, we need to check the status code explicitly
-                if isinstance(e, RequestsHTTPError):
-                    if e.response.status_code != 429:
+                except _retryableErrors() as e:
+                    last_exception = outcome = e
+                    if not self._isRateLimitError(e):
                         # Not a rate limit error, re-raise immediately
                         raise e
-                # For OpenAiRateLimitError, the type itself is enough.
-                # Continue to the next attempt in the loop.
-                continue
-
-            except Exception as e:
-                # Handle other unexpected errors
-                debug_info = (
-                    f"\nAPI Error Details:\n"
-                    f"- Model: {self.model}\n"
-                    f"- Provider: {self.provider_name}\n"
-                    f"- Prompt Length: {len(userPrompt):,} chars\n"
-                )
-                raise RuntimeError(f"LLM API failed with a non-retryable error: {str(e)}\n{debug_info}") from e
+                    # Continue to the next attempt in the loop.
+                    continue
 
-        # If the loop completes without returning, all retries have failed
-        raise RuntimeError(
-            f"LLM API request failed after {Config.LLM_RETRY_COUNT} retries. "
-            f"Last error: {str(last_exception)}"
-        ) from last_exception
+                except Exception as e:
+                    # Handle other unexpected errors
+                    outcome = e
+                    raise self._nonRetryableError(e, userPrompt) from e
+
+                finally:
+                    # an interrupted request (e.g. a cancelled task) says nothing about the provider
+                    self._releaseSlot(outcome, report=finished or outcome is not None)
+
+            # If the loop completes without returning, all retries have failed
+            raise self._retriesExhaustedError(last_exception) from last_exception
+
+    def _sendWithRetries(self, systemPrompt: str, userPrompt: str, verbose: bool,
+                         responseFormat: Optional[dict] = None) -> str:
+        """Send the request to the provider, retrying on rate limit errors."""
+        steps = self._retryLoop(systemPrompt, userPrompt, verbose, responseFormat)
+        result, error = None, None
+        while True:
+            try:
+                step, argument = steps.send(result) if error is None else steps.throw(error)
+            except StopIteration as done:
+                return done.value
+            result, error = None, None
+            try:
+                if step == _SLEEP:
+                    time.sleep(argument)
+                elif step == _ACQUIRE:
+                    self._acquireSlot(argument)
+                else:
+                    messages, verbose, kwargs = argument
+                    result = self.provider.create_completion(self.model, messages, verbose, **kwargs)
+            except BaseException as e:
+                error = e
+
+    async def asendRequest(self, systemPrompt: str, userPrompt: str, verbose: bool = True,
+                           responseFormat: Optional[dict] = None) -> str:
+        """
+        Async variant of sendRequest: back-off between retries awaits instead of blocking,
+        so one event loop can keep many requests in flight.
+
+        Traced and cached like sendRequest, except that concurrent identical async requests
+        are not merged into a single flight (waiting for another flight would block the
+        event loop); each of them checks the cache before sending.
+        """
+        myLogger.debug(f"LLM Prompt (async):\n{userPrompt}", highlight=False)
+
+        with span("llm.request", **self._spanAttributes(systemPrompt, userPrompt), cached=self.cache is not None) as traced:
+            content = None
+            if self.cache is not None:
+                key = self._cacheKey(systemPrompt, userPrompt)
+                content = await run_in_thread(self.cache.get, key)
+                if content is not None:
+                    myLogger.debug(f"LLM cache hit for {self.provider_name}/{self.model}")
+                    self._recordCacheHit(systemPrompt, userPrompt, content)
+            if content is None:
+                content = await self._asendWithRetries(systemPrompt, userPrompt, verbose, responseFormat)
+                if self.cache is not None:
+                    await run_in_thread(self.cache.store, key, f"{self.provider_name}/{self.model}", content)
+            self.firstToken.set()
+            traced.set(response_bytes=len(content), completion_tokens=estimate_tokens(content))
+            return content
+
+    async def _asendWithRetries(self, systemPrompt: str, userPrompt: str, verbose: bool,
+                                responseFormat: Optional[dict] = None) -> str:
+        """Async counterpart of _sendWithRetries: the same loop, with back-off and requests awaited."""
+        steps = self._retryLoop(systemPrompt, userPrompt, verbose, responseFormat)
+        result, error = None, None
+        while True:
+            try:
+                step, argument = steps.send(result) if error is None else steps.throw(error)
+            except StopIteration as done:
+                return done.value
+            result, error = None, None
+            try:
+                if step == _SLEEP:
+                    await asyncio.sleep(argument)
+                elif step == _ACQUIRE:
+                    await self._aacquireSlot(argument)
+                else:
+                    messages, verbose, kwargs = argument
+                    result = await self.provider.acreate_completion(self.model, messages, verbose, **kwargs)
+            except BaseException as e:
+                error = e
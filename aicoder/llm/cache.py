@@ -0,0 +1,222 @@
+# ---- LLM Response Cache ----
+# File: aicoder/llm/cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from ..config import Config
+from ..utils.logger import myLogger
+
+
+class _Flight:
+    """An in-flight computation that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of LLM completions.
+
+    Entries live in a SQLite database (WAL mode) with zlib-compressed bodies, expire
+    after `ttl` seconds and are evicted least-recently-used once the stored bodies
+    exceed `max_bytes`. Concurrent requests for the same key are collapsed into a
+    single computation (single-flight).
+    """
+
+    def __init__(self,
+                 path: Optional[Path] = None,
+                 ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.path = Path(path or Config.LLM_CACHE_PATH)
+        self.ttl = Config.LLM_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = Config.LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._local = threading.local()
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model: str,
+                 system_prompt: str,
+                 user_prompt: str,
+                 temperature: float,
+                 template_version: Optional[str] = None) -> str:
+        """Build the content address of a request from everything that determines its completion"""
+        template_version = template_version or Config.PROMPT_TEMPLATE_VERSION
+        payload = json.dumps([model, system_prompt, user_prompt, temperature, template_version])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion for `key`, or None if missing, expired or unreadable"""
+        try:
+            return self._get(key)
+        except sqlite3.Error as e:
+            # a locked or damaged cache must not fail the request; it is sent as on a miss
+            myLogger.warning(f"Could not read from the LLM cache: {e}")
+            return None
+
+    def _get(self, key: str) -> Optional[str]:
+        conn = self._connection()
+        row = conn.execute("SELECT body, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        body, created_at = row
+        now = time.time()
+        if self.ttl and now - created_at > self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            return None
+
+        conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return zlib.decompress(body).decode('utf-8')
+
+    def put(self, key: str, model: str, content: str) -> None:
+        """Store a completion and evict old entries if the cache grew past its limits"""
+        body = zlib.compress(content.encode('utf-8'))
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, body, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, body, len(body), now, now)
+        )
+        conn.commit()
+        self.evict()
+
+    def store(self, key: str, model: str, content: str) -> None:
+        """Like put(), but a database error is only logged: the completion has been paid for either way"""
+        try:
+            self.put(key, model, content)
+        except sqlite3.Error as e:
+            myLogger.warning(f"Could not store completion in the LLM cache: {e}")
+
+    def discard(self, key: str) -> None:
+        """Remove an entry, e.g. a completion that later failed validation"""
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+        except sqlite3.Error as e:
+            myLogger.warning(f"Could not remove a completion from the LLM cache: {e}")
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under max_bytes. Returns rows removed."""
+        conn = self._connection()
+        removed = 0
+        if self.ttl:
+            removed += conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            excess = total - self.max_bytes
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+                if excess <= 0:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                excess -= size
+                removed += 1
+
+        conn.commit()
+        if removed:
+            myLogger.debug(f"LLM cache: evicted {removed} entries")
+        return removed
+
+    def get_or_compute(self, key: str, model: str, compute: Callable[[], str]) -> str:
+        """
+        Return the cached completion for `key`, computing and storing it on a miss.
+
+        If another thread is already computing the same key, wait for its result
+        instead of issuing a second request. Failures are not cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            myLogger.debug(f"LLM cache hit for {model} ({key[:12]})")
+            return cached
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        if not is_leader:
+            myLogger.debug(f"LLM cache: waiting for in-flight request {key[:12]}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            # a previous leader may have stored the result between our lookup and claiming the key
+            cached = self.get(key)
+            if cached is not None:
+                myLogger.debug(f"LLM cache hit for {model} ({key[:12]})")
+                flight.result = cached
+                return cached
+            flight.result = compute()
+            self.store(key, model, flight.result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None if caching is disabled"""
+    global _response_cache
+
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            try:
+                _response_cache = ResponseCache()
+            except (sqlite3.Error, OSError) as e:
+                myLogger.warning(f"LLM cache disabled, could not open {Config.LLM_CACHE_PATH}: {e}")
+                Config.LLM_CACHE_ENABLED = False
+                return None
+        return _response_cache
@@ -89,6 +89,26 @@ class MyHelpers:
 
         return Path(code_path)
 
+    @staticmethod
+    def writeUniqueTempFile(basename: str, content: str, suffix: str) -> Path:
+        """
+        Write content to a new temporary file that no other attempt or job can share
+
+        Unlike writeTempFileV2, concurrent writers with the same `basename` (e.g. hedged
+        requests for one file) get separate files, so discarding one never removes another.
+
+        Args:
+            basename: Prefix of the temporary file name (e.g. a hash of content of original file)
+            content: The content to write to the temporary file
+            suffix: The suffix to use for the temporary file (e.g., '-patched.php')
+        """
+        fd, code_path = tempfile.mkstemp(prefix=f"{basename}-", suffix=suffix, dir="/tmp")
+        with os.fdopen(fd, 'w') as f:
+            myLogger.info(f"💾 writing file {code_path}")
+            f.write(content)
+
+        return Path(code_path)
+
     @classmethod
     def copyToTempfile(cls, pathOrigFile: Path) -> Path:
         # detect suffix
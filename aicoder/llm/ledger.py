@@ -0,0 +1,236 @@
+# ---- Request Ledger ----
+# File: aicoder/llm/ledger.py
+#
+# Persistent record of every LLM request: token counts (as reported by the
+# provider, estimated otherwise), latency, retries, model, profile, strategy and the
+# validation outcome of the file it was made for. `aicoder stats` summarizes it.
+
+import contextvars
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from ..config import Config
+from ..utils.logger import myLogger
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_ERROR = "error"
+OUTCOME_CANCELLED = "cancelled"   # given up by the client, e.g. the slower side of a hedged request
+
+VALIDATION_PASSED = "passed"
+VALIDATION_FAILED = "failed"
+
+_COLUMNS = ("started_at", "model", "profile", "strategy", "file", "size_bucket", "prompt_tokens", "completion_tokens",
+            "cached_tokens", "tokens_estimated", "latency", "ttft", "retries", "streaming", "cache_hit",
+            "outcome", "error")
+
+# profile/strategy/file/size of the requests made in this context (set per file by the batch runner)
+_labels: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("aicoder_ledger_labels", default={})
+
+
+@contextmanager
+def labels(**values):
+    """Attach profile/strategy/file/size labels to the requests recorded inside the block"""
+    token = _labels.set({**_labels.get(), **values})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels() -> Dict[str, str]:
+    return _labels.get()
+
+
+class RequestLedger:
+    """SQLite table of LLM requests (WAL mode, one connection per thread)"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or Config.LEDGER_PATH)
+        self._local = threading.local()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                model TEXT NOT NULL,
+                profile TEXT,
+                strategy TEXT,
+                file TEXT,
+                size_bucket TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                cached_tokens INTEGER,
+                tokens_estimated INTEGER NOT NULL DEFAULT 0,
+                latency REAL,
+                ttft REAL,
+                retries INTEGER NOT NULL DEFAULT 0,
+                streaming INTEGER NOT NULL DEFAULT 0,
+                cache_hit INTEGER NOT NULL DEFAULT 0,
+                outcome TEXT NOT NULL,
+                error TEXT,
+                validation TEXT
+            )
+        """)
+        # ledgers written before the file size was recorded
+        if "size_bucket" not in {row[1] for row in conn.execute("PRAGMA table_info(requests)")}:
+            conn.execute("ALTER TABLE requests ADD COLUMN size_bucket TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_started_at ON requests (started_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_model ON requests (model, started_at)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, **values) -> int:
+        """Insert one request (keys from _COLUMNS); returns its id"""
+        conn = self._connection()
+        cursor = conn.execute(
+            f"INSERT INTO requests ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            [values.get(column) if column not in ("tokens_estimated", "retries", "streaming", "cache_hit")
+             else int(values.get(column) or 0) for column in _COLUMNS]
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+    def set_validation(self, ids: Iterable[int], passed: bool) -> None:
+        """Record the validation outcome of the file the requests `ids` were made for"""
+        ids = list(ids)
+        if not ids:
+            return
+        conn = self._connection()
+        conn.execute(
+            f"UPDATE requests SET validation = ? WHERE id IN ({', '.join('?' * len(ids))})",
+            [VALIDATION_PASSED if passed else VALIDATION_FAILED, *ids]
+        )
+        conn.commit()
+
+    def rows(self, since: Optional[float] = None) -> List[dict]:
+        """All requests started at or after `since` (epoch seconds), oldest first"""
+        conn = self._connection()
+        conn.row_factory = sqlite3.Row
+        try:
+            query = "SELECT * FROM requests WHERE started_at >= ? ORDER BY started_at"
+            return [dict(row) for row in conn.execute(query, (since or 0,))]
+        finally:
+            conn.row_factory = None
+
+    def recent(self, model: str, limit: int) -> List[dict]:
+        """The latest `limit` requests to `model` that reached the API (no cache hits, not cancelled), newest first"""
+        conn = self._connection()
+        conn.row_factory = sqlite3.Row
+        try:
+            query = ("SELECT * FROM requests WHERE model = ? AND cache_hit = 0 AND outcome != ? "
+                     "ORDER BY started_at DESC LIMIT ?")
+            return [dict(row) for row in conn.execute(query, (model, OUTCOME_CANCELLED, limit))]
+        finally:
+            conn.row_factory = None
+
+    def recent_values(self, model: str, column: str, limit: int) -> List[float]:
+        """`column` (latency or ttft) of the latest `limit` successful API requests to `model`"""
+        if column not in ("latency", "ttft"):
+            raise ValueError(f"Unsupported ledger column: {column}")
+        query = (f"SELECT {column} FROM requests WHERE model = ? AND outcome = ? AND cache_hit = 0 "
+                 f"AND {column} IS NOT NULL ORDER BY started_at DESC LIMIT ?")
+        return [value for value, in self._connection().execute(query, (model, OUTCOME_SUCCESS, limit))]
+
+
+_ledger: Optional[RequestLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Optional[RequestLedger]:
+    """Return the process-wide request ledger, or None if it is disabled"""
+    global _ledger
+
+    if not Config.LEDGER_ENABLED:
+        return None
+    with _ledger_lock:
+        if _ledger is None:
+            try:
+                _ledger = RequestLedger()
+            except (sqlite3.Error, OSError) as e:
+                myLogger.warning(f"Request ledger disabled, could not open {Config.LEDGER_PATH}: {e}")
+                Config.LEDGER_ENABLED = False
+                return None
+        return _ledger
+
+
+# ---- reporting ----
+
+def percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of `values` (fraction 0..1), None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * fraction // 1))  # ceil
+    return ordered[int(rank) - 1]
+
+
+def summarize(rows: List[dict], group_by: Sequence[str] = ("model", "profile")) -> List[dict]:
+    """
+    Statistics per group of requests.
+
+    Latency and token figures only count requests that reached the API (no cache
+    hits); the pass rate counts every request whose file was validated.
+    """
+    groups: Dict[tuple, List[dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row.get(column) or "-" for column in group_by), []).append(row)
+
+    summaries = []
+    for key, members in sorted(groups.items()):
+        api = [row for row in members if not row["cache_hit"] and row["outcome"] == OUTCOME_SUCCESS]
+        latencies = [row["latency"] for row in api if row["latency"] is not None]
+        ttfts = [row["ttft"] for row in api if row["ttft"] is not None]
+        generated = sum(row["completion_tokens"] or 0 for row in api)
+        validated = [row for row in members if row["validation"]]
+        start = min(row["started_at"] for row in members)
+        end = max(row["started_at"] + (row["latency"] or 0) for row in members)
+
+        summaries.append({
+            **dict(zip(group_by, key)),
+            "requests": len(members),
+            "cache_hits": sum(1 for row in members if row["cache_hit"]),
+            "errors": sum(1 for row in members if row["outcome"] == OUTCOME_ERROR),
+            "cancelled": sum(1 for row in members if row["outcome"] == OUTCOME_CANCELLED),
+            "retries": sum(row["retries"] for row in members),
+            "requests_per_min": len(members) / (end - start) * 60 if end > start else None,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "ttft_p50": percentile(ttfts, 0.50),
+            "prompt_tokens": sum(row["prompt_tokens"] or 0 for row in api),
+            "completion_tokens": generated,
+            "cached_tokens": sum(row["cached_tokens"] or 0 for row in api),
+            "tokens_per_sec": generated / sum(latencies) if latencies and sum(latencies) > 0 else None,
+            "pass_rate": (sum(1 for row in validated if row["validation"] == VALIDATION_PASSED) / len(validated)
+                          if validated else None),
+        })
+    return summaries
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds for a look-back like "30m", "12h" or "7d" (None = everything)"""
+    if not value:
+        return None
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    number, unit = value[:-1], value[-1:].lower()
+    if unit not in units:
+        number, unit = value, "s"
+    try:
+        return time.time() - float(number) * units[unit]
+    except ValueError:
+        raise ValueError(f"Invalid duration '{value}', expected e.g. 30m, 12h or 7d") from None
@@ -0,0 +1,302 @@
+# ---- Local Mock LLM Server ----
+# File: aicoder/llm/mock_server.py
+#
+# OpenAI/OpenRouter-compatible `/chat/completions` endpoint for load and failure
+# testing without network access or API costs. Point aicoder at it with
+# `aicoder --base-url http://127.0.0.1:8765/v1 ...` (or AICODER_LLM_BASE_URL).
+# Latency, generation speed, 429 bursts, 5xx errors, truncated responses and
+# scripted responses are configurable through MockServerSettings.
+
+import gzip
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import yaml
+
+from .tokens import estimate_messages_tokens, estimate_tokens
+from ..utils.logger import myLogger
+
+# code markers of the documentation prompts -> code fence language of the default response
+_CODE_MARKERS = {"\n\nPHP_CODE:\n": "php", "\n\nTWIG_CODE:\n": "twig"}
+
+
+@dataclass
+class MockServerSettings:
+    """Behaviour of the mock server (times in seconds, rates as probabilities 0..1)"""
+    latency: float = 0.2  # time to first token
+    latency_jitter: float = 0.0
+    latency_distribution: str = "fixed"  # fixed, uniform, normal, exponential
+    tokens_per_second: float = 0.0  # generation speed, 0 = instant
+    stream_chunk_tokens: int = 4  # tokens per streamed delta
+    rate_limit_rpm: int = 0  # return 429 above this many requests per minute (0 = unlimited)
+    rate_limit_every: int = 0  # after every N answered requests ...
+    rate_limit_burst: int = 0  # ... answer this many requests with 429
+    retry_after: float = 1.0  # Retry-After of 429 responses
+    server_error_rate: float = 0.0
+    server_error_status: int = 503
+    truncate_rate: float = 0.0  # answers cut in half with finish_reason=length
+    responses: List[Union[str, dict]] = field(default_factory=list)  # scripted, used in order before the default
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_file(cls, path: Path) -> "MockServerSettings":
+        """Load settings from a YAML or JSON file with the field names as keys"""
+        data = yaml.safe_load(Path(path).read_text()) or {}
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown mock server settings: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """HTTP server answering chat completion requests according to MockServerSettings"""
+
+    daemon_threads = True
+
+    def __init__(self, settings: MockServerSettings, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _RequestHandler)
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.script = iter(settings.responses)
+        self.request_count = 0
+        self._answered = 0
+        self._burst_left = 0
+        self._recent = deque()  # request times within the last minute (rate_limit_rpm)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        """Serve on a background thread (tests); the CLI uses serve_forever()"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    # ---- decisions per request (under the lock, so concurrent requests see a consistent script) ----
+
+    def next_action(self) -> dict:
+        """What to answer: {"status", "headers", "content"/"body", "finish_reason"}"""
+        settings = self.settings
+        with self._lock:
+            self.request_count += 1
+            now = time.monotonic()
+
+            scripted = next(self.script, None)
+            if scripted is not None:
+                return _scripted_action(scripted)
+
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            if settings.rate_limit_rpm and len(self._recent) >= settings.rate_limit_rpm:
+                reset = 60 - (now - self._recent[0])
+                return self._rate_limited(max(reset, settings.retry_after), remaining=0)
+            if self._burst_left:
+                self._burst_left -= 1
+                return self._rate_limited(settings.retry_after)
+            if settings.server_error_rate and self.random.random() < settings.server_error_rate:
+                return {"status": settings.server_error_status,
+                        "body": {"error": {"message": "Mock server error", "code": settings.server_error_status}}}
+
+            self._recent.append(now)
+            self._answered += 1
+            if settings.rate_limit_every and self._answered % settings.rate_limit_every == 0:
+                self._burst_left = settings.rate_limit_burst
+            truncated = bool(settings.truncate_rate) and self.random.random() < settings.truncate_rate
+            action = {"status": 200, "finish_reason": "length" if truncated else "stop", "headers": {}}
+            if settings.rate_limit_rpm:
+                action["headers"] = self._quota_headers(len(self._recent), now)
+            return action
+
+    def _rate_limited(self, retry_after: float, remaining: Optional[int] = None) -> dict:
+        headers = {"Retry-After": f"{retry_after:.3f}".rstrip("0").rstrip(".")}
+        if remaining is not None:
+            headers.update({"x-ratelimit-limit-requests": str(self.settings.rate_limit_rpm),
+                            "x-ratelimit-remaining-requests": str(remaining),
+                            "x-ratelimit-reset-requests": f"{retry_after:.3f}s"})
+        return {"status": 429, "headers": headers,
+                "body": {"error": {"message": "Rate limit exceeded (mock server)", "code": 429}}}
+
+    def _quota_headers(self, used: int, now: float) -> dict:
+        return {"x-ratelimit-limit-requests": str(self.settings.rate_limit_rpm),
+                "x-ratelimit-remaining-requests": str(max(0, self.settings.rate_limit_rpm - used)),
+                "x-ratelimit-reset-requests": f"{60 - (now - self._recent[0]):.3f}s"}
+
+    def latency(self) -> float:
+        settings = self.settings
+        with self._lock:
+            if settings.latency_distribution == "uniform":
+                value = self.random.uniform(settings.latency - settings.latency_jitter,
+                                            settings.latency + settings.latency_jitter)
+            elif settings.latency_distribution == "normal":
+                value = self.random.gauss(settings.latency, settings.latency_jitter)
+            elif settings.latency_distribution == "exponential":
+                value = self.random.expovariate(1 / settings.latency) if settings.latency > 0 else 0.0
+            else:
+                value = settings.latency
+        return max(0.0, value)
+
+
+def _scripted_action(item: Union[str, dict]) -> dict:
+    """A scripted response: plain content, or a dict with content/status/headers/body/finish_reason"""
+    if isinstance(item, str):
+        return {"status": 200, "content": item, "finish_reason": "stop", "headers": {}}
+    action = {"status": 200, "finish_reason": "stop", "headers": {}}
+    action.update(item)
+    return action
+
+
+def default_content(request: dict) -> str:
+    """Echo the code of a documentation prompt unchanged (a no-op wholefile answer), `{}` in JSON mode"""
+    if (request.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({"entries": []})
+    user_prompt = next((m.get("content") or "" for m in reversed(request.get("messages", []))
+                        if m.get("role") == "user"), "")
+    for marker, language in _CODE_MARKERS.items():
+        _, found, code = user_prompt.rpartition(marker)
+        if found:
+            return f"```{language}\n{code}```"
+    return "OK"
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: MockLLMServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        myLogger.debug(f"mock server: {format % args}")
+
+    def do_HEAD(self):
+        # connection pre-warming
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "code": 404}})
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "Invalid JSON body", "code": 400}})
+
+        action = self.server.next_action()
+        time.sleep(self.server.latency())
+        if action["status"] != 200:
+            return self._send_json(action["status"], action.get("body", {}), action.get("headers"))
+        if "body" in action:
+            return self._send_json(200, action["body"], action.get("headers"))
+
+        content = action.get("content")
+        if content is None:
+            content = default_content(request)
+        if action["finish_reason"] == "length":
+            content = content[:len(content) // 2]
+
+        completion = _Completion(request, content, action["finish_reason"], self.server.settings)
+        if request.get("stream"):
+            self._send_stream(completion, action.get("headers"))
+        else:
+            completion.sleep_generation()
+            self._send_json(200, completion.response(), action.get("headers"))
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, completion: "_Completion", headers: Optional[dict] = None):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.close_connection = True
+        # OpenRouter sends comments while the model is queued
+        self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+        for event in completion.stream_events():
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class _Completion:
+    """Response payloads for one request, in the shape of the OpenAI chat completions API"""
+
+    def __init__(self, request: dict, content: str, finish_reason: str, settings: MockServerSettings):
+        self.id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        self.created = int(time.time())
+        self.model = request.get("model", "mock")
+        self.content = content
+        self.finish_reason = finish_reason
+        self.settings = settings
+        self.prompt_tokens = estimate_messages_tokens(request.get("messages", []))
+        self.completion_tokens = estimate_tokens(content)
+
+    def _seconds_for(self, tokens: int) -> float:
+        return tokens / self.settings.tokens_per_second if self.settings.tokens_per_second > 0 else 0.0
+
+    def sleep_generation(self) -> None:
+        time.sleep(self._seconds_for(self.completion_tokens))
+
+    def _usage(self) -> dict:
+        return {"prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens}
+
+    def response(self) -> dict:
+        return {
+            "id": self.id, "object": "chat.completion", "created": self.created, "model": self.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.content},
+                         "finish_reason": self.finish_reason}],
+            "usage": self._usage(),
+        }
+
+    def _chunk(self, delta: dict, finish_reason: Optional[str] = None) -> dict:
+        return {"id": self.id, "object": "chat.completion.chunk", "created": self.created, "model": self.model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    def stream_events(self) -> Iterator[dict]:
+        yield self._chunk({"role": "assistant", "content": ""})
+        size = max(1, self.settings.stream_chunk_tokens) * 4  # ~4 characters per token
+        for start in range(0, len(self.content), size):
+            piece = self.content[start:start + size]
+            time.sleep(self._seconds_for(estimate_tokens(piece)))
+            yield self._chunk({"content": piece})
+        final = self._chunk({}, self.finish_reason)
+        final["usage"] = self._usage()
+        yield final
+
+
+def serve(settings: MockServerSettings, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """Run the mock server in the foreground until interrupted"""
+    server = MockLLMServer(settings, host, port)
+    myLogger.success(f"Mock LLM server listening on {server.base_url}")
+    myLogger.info(f"Use it with: aicoder --base-url {server.base_url} add-comments ...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        myLogger.info(f"Mock LLM server stopped after {server.request_count:,} requests")
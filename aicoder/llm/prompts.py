@@ -9,8 +9,12 @@ class DocumentationPrompts:
 
     SYSTEM_PROMPT = "You are a senior PHP developer. You are tasked to improve the quality of a legacy php codebase by adding or improving comments (docblocks and section comments)."
 
+    FRAGMENT_RULES = dedent("""
+        - PHP_CODE is an excerpt of a larger file. It may start or end inside a class: do NOT add `<?php`, namespaces, class declarations or closing braces that are not in the excerpt.
+        """)
+
     @classmethod
-    def get_full_prompt(cls, php_code: str, strategy: ChangeStrategy) -> tuple[str, str]:
+    def get_full_prompt(cls, php_code: str, strategy: ChangeStrategy, is_fragment: bool = False) -> tuple[str, str]:
         """Return complete prompt with all original rules and formatting"""
         user_prompt = dedent(f"""
             Improve the PHP_CODE by adding or improving comments (docblocks and section comments). Apply the following rules:
@@ -28,6 +32,9 @@ class DocumentationPrompts:
             - do NOT add comments to getters and setters"
             """)
 
+        if is_fragment:
+            user_prompt += cls.FRAGMENT_RULES
+
         # Add strategy-specific prompt additions
         user_prompt += strategy.get_prompt_additions()
         
@@ -41,8 +48,12 @@ class TwigDocumentationPrompts:
 
     SYSTEM_PROMPT = "You are a senior web developer specializing in Twig templates. You are tasked to improve the quality of legacy Twig templates by adding or improving comments and documentation."
 
+    FRAGMENT_RULES = dedent("""
+        - TWIG_CODE is an excerpt of a larger template. It may start or end inside a block: do NOT add `{% extends %}`, block tags or end tags that are not in the excerpt.
+        """)
+
     @classmethod
-    def get_full_prompt(cls, twig_code: str, strategy: ChangeStrategy) -> tuple[str, str]:
+    def get_full_prompt(cls, twig_code: str, strategy: ChangeStrategy, is_fragment: bool = False) -> tuple[str, str]:
         """Return complete prompt with all original rules and formatting"""
         user_prompt = dedent("""
             Improve the TWIG_CODE by adding or improving comments and documentation. Apply the following rules:
@@ -63,6 +74,9 @@ class TwigDocumentationPrompts:
             - For short inline comments, use: {{ variable }} {# explanation #}
             """)
         
+        if is_fragment:
+            user_prompt += cls.FRAGMENT_RULES
+
         # Add strategy-specific prompt additions
         user_prompt += strategy.get_prompt_additions()
         
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Callable, Iterator, Mapping, Optional
+
+from ...utils.threads import run_in_thread
 
 
 class LLMProvider(ABC):
@@ -11,6 +13,56 @@ class LLMProvider(ABC):
         pass
 
     @abstractmethod
-    def create_completion(self, model: str, messages: list, verbose: bool = False) -> str:
-        """Create a completion using the provider's API"""
+    def create_completion(self, model: str, messages: list, verbose: bool = False,
+                          response_format: Optional[dict] = None) -> str:
+        """Create a completion using the provider's API (`response_format` e.g. {"type": "json_object"})"""
+        pass
+
+    async def acreate_completion(self, model: str, messages: list, verbose: bool = False,
+                                 response_format: Optional[dict] = None) -> str:
+        """
+        Create a completion without blocking the event loop.
+
+        Providers without a native async client run `create_completion` in a worker thread.
+        """
+        return await run_in_thread(self.create_completion, model, messages, verbose,
+                                   **self._format_options(response_format))
+
+    def add_response_listener(self, listener: Callable[[Mapping], None]) -> None:
+        """Register a callback that receives the headers of every API response (e.g. rate limit headers)"""
+        self.__dict__.setdefault('_response_listeners', []).append(listener)
+
+    def _notify_response(self, headers: Optional[Mapping]) -> None:
+        for listener in self.__dict__.get('_response_listeners', []):
+            listener(headers)
+
+    def add_usage_listener(self, listener: Callable[[Mapping], None]) -> None:
+        """Register a callback that receives the `usage` object of every completion (token counts)"""
+        self.__dict__.setdefault('_usage_listeners', []).append(listener)
+
+    def _notify_usage(self, usage) -> None:
+        """Pass a usage dict or SDK usage object to the listeners (ignored if the response had none)"""
+        if not usage:
+            return
+        if hasattr(usage, 'model_dump'):
+            usage = usage.model_dump()
+        for listener in self.__dict__.get('_usage_listeners', []):
+            listener(usage)
+
+    @staticmethod
+    def _format_options(response_format: Optional[dict]) -> dict:
+        """Keyword arguments for `response_format`, empty when not requested"""
+        return {"response_format": response_format} if response_format else {}
+
+    def prewarm(self) -> None:
+        """Open a connection to the API in the background; providers without pooling do nothing"""
         pass
+
+    def stream_completion(self, model: str, messages: list, verbose: bool = False,
+                          response_format: Optional[dict] = None) -> Iterator[str]:
+        """
+        Create a completion and yield its text incrementally.
+
+        Providers without streaming support yield the whole completion at once.
+        """
+        yield self.create_completion(model, messages, verbose, **self._format_options(response_format))
@@ -1,13 +1,15 @@
 import os
-from openai import OpenAI, APIError
-from typing import Optional
+from typing import Iterator, Optional
 from .base import LLMProvider
+from ..transport import get_async_openai_client, get_openai_client, prewarm
 from ...config import Config
 
 
 class OpenAIApiAdapter(LLMProvider):
+    # completion limit sent with each request (also used to warn about truncated output)
+    max_tokens = 8000
+
     def __init__(self, base_url: Optional[str] = None):
-        self.max_tokens = 8000
         self.client = None
         self.base_url = base_url
 
@@ -35,24 +37,87 @@ class OpenAIApiAdapter(LLMProvider):
         api_key = api_key or os.getenv(config["env_key"])
         key_hint = config["env_key"]
         key_prefix = "sk-"
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url=self.base_url if self.base_url else "https://api.openai.com/v1"
-        )
         return api_key, key_hint, key_prefix, self.base_url or "https://api.openai.com/v1"
 
+    def _get_client(self):
+        """Shared SDK client for this base URL and key, created on first use"""
+        if self.client is None:
+            api_key, _, _, base_url = self.get_api_credentials(None)
+            self.client = get_openai_client(base_url, api_key)
+        return self.client
+
+    def prewarm(self) -> None:
+        api_key, _, _, base_url = self.get_api_credentials(None)
+        prewarm(base_url, api_key, openai_client=True)
+
     def build_request(self, model: str, messages: list):
         # Return empty dicts since we'll use the client directly
         return {}, {}
 
-    def create_completion(self, model: str, messages: list, verbose: bool = False):
+    def _api_error(self, e: Exception) -> Exception:
+        """Report the error response's headers; rate limit errors stay retryable, others are wrapped"""
+        from openai import APIStatusError, RateLimitError
+        if isinstance(e, APIStatusError):
+            self._notify_response(e.response.headers)
+        if isinstance(e, RateLimitError):
+            # Re-raise unchanged so the LLMClient's retry logic can catch it.
+            return e
+        return RuntimeError(f"OpenAI API error: {str(e)}")
+
+    def create_completion(self, model: str, messages: list, verbose: bool = False,
+                          response_format: Optional[dict] = None):
+        from openai import APIError
+        try:
+            raw_response = self._get_client().chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                temperature=Config.DEFAULT_TEMPERATURE,
+                max_tokens=self.max_tokens,
+                **self._format_options(response_format)
+            )
+            self._notify_response(raw_response.headers)
+            response = raw_response.parse()
+            self._notify_usage(response.usage)
+            return response.choices[0].message.content
+        except APIError as e:
+            raise self._api_error(e)
+
+    async def acreate_completion(self, model: str, messages: list, verbose: bool = False,
+                                 response_format: Optional[dict] = None) -> str:
+        api_key, _, _, base_url = self.get_api_credentials(None)
+        from openai import APIError
         try:
-            response = self.client.chat.completions.create(
+            raw_response = await get_async_openai_client(base_url, api_key).chat.completions.with_raw_response.create(
                 model=model,
                 messages=messages,
                 temperature=Config.DEFAULT_TEMPERATURE,
-                max_tokens=self.max_tokens
+                max_tokens=self.max_tokens,
+                **self._format_options(response_format)
             )
+            self._notify_response(raw_response.headers)
+            response = raw_response.parse()
+            self._notify_usage(response.usage)
             return response.choices[0].message.content
         except APIError as e:
-            raise RuntimeError(f"OpenAI API error: {str(e)}")
+            raise self._api_error(e)
+
+    def stream_completion(self, model: str, messages: list, verbose: bool = False,
+                          response_format: Optional[dict] = None) -> Iterator[str]:
+        from openai import APIError
+        try:
+            raw_response = self._get_client().chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                temperature=Config.DEFAULT_TEMPERATURE,
+                max_tokens=self.max_tokens,
+                stream=True,
+                **self._format_options(response_format)
+            )
+            self._notify_response(raw_response.headers)
+            for chunk in raw_response.parse():
+                # servers that send usage on streams put it on the last chunk
+                self._notify_usage(getattr(chunk, 'usage', None))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except APIError as e:
+            raise self._api_error(e)
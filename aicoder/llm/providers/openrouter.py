@@ -1,14 +1,20 @@
+import json
 import os
 import requests
 from .base import LLMProvider
-from typing import Optional
+from typing import Iterator, Optional
+
+from ..transport import encode_json_body, get_async_openai_client, get_session, prewarm
 
 from ...config import Config
+from ...utils.logger import myLogger
 
 
 class OpenRouterApiAdapter(LLMProvider):
+    # nominal completion limit (not sent; OpenRouter applies the model's own limit)
+    max_tokens = 1000000
+
     def __init__(self, base_url: Optional[str] = None):
-        self.max_tokens = 1000000
         self.base_url = base_url or "https://openrouter.ai/api/v1"
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
@@ -23,7 +29,22 @@ class OpenRouterApiAdapter(LLMProvider):
         key_prefix = "sk-"
         return api_key_to_use, key_hint, key_prefix, self.base_url
 
-    def build_request(self, model: str, messages: list):
+    def prewarm(self) -> None:
+        prewarm(self.base_url)
+
+    def _post(self, data: dict, headers: dict, stream: bool = False):
+        """POST to the chat completions endpoint over the shared keep-alive session"""
+        body, body_headers = encode_json_body(data)
+        headers.update(body_headers)
+        return get_session(self.base_url).post(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            data=body,
+            timeout=30,
+            stream=stream
+        )
+
+    def build_request(self, model: str, messages: list, response_format: Optional[dict] = None):
         headers = {
             "Content-Type": "application/json",
             "Referer": "https://yourdomain.com",
@@ -35,14 +56,20 @@ class OpenRouterApiAdapter(LLMProvider):
             "messages": messages,
             "temperature": Config.DEFAULT_TEMPERATURE,
         }
+        if response_format:
+            data["response_format"] = response_format
+        if Config.OPENROUTER_PROVIDER_PREFERENCES:
+            # provider routing, e.g. {"sort": "latency"} or {"sort": "throughput", "allow_fallbacks": true}
+            data["provider"] = Config.OPENROUTER_PROVIDER_PREFERENCES
 
         return data, headers
 
-    def create_completion(self, model: str, messages: list, verbose: bool = False) -> str:
+    def create_completion(self, model: str, messages: list, verbose: bool = False,
+                          response_format: Optional[dict] = None) -> str:
         if not self.api_key:
             raise ValueError("OpenRouter API key is required. Set OPENROUTER_API_KEY environment variable.")
         
-        data, headers = self.build_request(model, messages)
+        data, headers = self.build_request(model, messages, response_format)
         headers.update({
             "Authorization": f"Bearer {self.api_key}"
         })
@@ -51,17 +78,14 @@ class OpenRouterApiAdapter(LLMProvider):
             print(f"Making request to OpenRouter API with model: {model}")
 
         try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
+            response = self._post(data, headers)
+            self._notify_response(response.headers)
             response.raise_for_status()
             
             response_json = response.json()
             if 'choices' not in response_json:
                 raise RuntimeError(f"OpenRouter API error: 'choices' key missing in response. Full response: {response_json}")
+            self._notify_usage(response_json.get('usage'))
             return response_json['choices'][0]['message']['content']
 
         except requests.exceptions.HTTPError:
@@ -73,3 +97,79 @@ class OpenRouterApiAdapter(LLMProvider):
         except Exception as e:
             # Wrap other unexpected errors (e.g., JSON parsing).
             raise RuntimeError(f"OpenRouter API error during response processing: {str(e)}") from e
+
+    async def acreate_completion(self, model: str, messages: list, verbose: bool = False,
+                                 response_format: Optional[dict] = None) -> str:
+        """Create a completion over the OpenAI-compatible endpoint with the SDK's async client"""
+        if not self.api_key:
+            raise ValueError("OpenRouter API key is required. Set OPENROUTER_API_KEY environment variable.")
+
+        data, headers = self.build_request(model, messages, response_format)
+        del headers["Content-Type"]
+        if "provider" in data:
+            # not a parameter of the SDK's create(); sent as an extra body field
+            data["extra_body"] = {"provider": data.pop("provider")}
+        client = get_async_openai_client(self.base_url, self.api_key, default_headers=headers)
+
+        if verbose:
+            myLogger.debug(f"Making async request to OpenRouter API with model: {model}")
+
+        from openai import APIError, APIStatusError, RateLimitError
+        try:
+            raw_response = await client.chat.completions.with_raw_response.create(**data)
+            self._notify_response(raw_response.headers)
+            response = raw_response.parse()
+        except APIError as e:
+            if isinstance(e, APIStatusError):
+                self._notify_response(e.response.headers)
+            if isinstance(e, RateLimitError):
+                # Re-raise so the LLMClient's retry logic can catch it.
+                raise
+            raise RuntimeError(f"OpenRouter API error: {str(e)}") from e
+
+        if not response.choices:
+            raise RuntimeError(f"OpenRouter API error: 'choices' key missing in response. Full response: {response}")
+        self._notify_usage(response.usage)
+        return response.choices[0].message.content
+
+    def stream_completion(self, model: str, messages: list, verbose: bool = False,
+                          response_format: Optional[dict] = None) -> Iterator[str]:
+        """Create a completion with server-sent events and yield the content deltas"""
+        if not self.api_key:
+            raise ValueError("OpenRouter API key is required. Set OPENROUTER_API_KEY environment variable.")
+
+        data, headers = self.build_request(model, messages, response_format)
+        data["stream"] = True
+        headers.update({
+            "Authorization": f"Bearer {self.api_key}"
+        })
+
+        if verbose:
+            myLogger.debug(f"Making streaming request to OpenRouter API with model: {model}")
+
+        try:
+            with self._post(data, headers, stream=True) as response:
+                self._notify_response(response.headers)
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    # SSE comments (": OPENROUTER PROCESSING") and blank keep-alive lines carry no data
+                    if not line or not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    event = json.loads(payload)
+                    if "error" in event:
+                        raise RuntimeError(f"OpenRouter API error during streaming: {event['error']}")
+                    # the final event carries the token usage
+                    self._notify_usage(event.get("usage"))
+                    choices = event.get("choices") or []
+                    content = choices[0].get("delta", {}).get("content") if choices else None
+                    if content:
+                        yield content
+
+        except requests.exceptions.HTTPError:
+            # Re-raise HTTPError to allow the LLMClient's retry logic to catch it.
+            raise
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"OpenRouter API streaming request failed with a network error: {str(e)}") from e
@@ -0,0 +1,298 @@
+# ---- Client-Side Rate Limiting ----
+# File: aicoder/llm/rate_limiter.py
+#
+# Proactive limits per provider and model: token buckets for requests/min and
+# tokens/min, seeded from the provider's rate limit headers, plus a concurrency
+# limit that adapts with additive-increase/multiplicative-decrease on 429s.
+
+import asyncio
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from ..config import Config
+from ..utils.logger import myLogger
+from .shared_quota import SharedQuota, get_shared_quota
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` tokens per minute.
+
+    Reservations may drive the bucket negative; the caller then waits until the
+    debt is refilled, which keeps concurrent callers in first-come order.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.per_minute = float(per_minute)
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` tokens and return the seconds to wait before using them"""
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens * 60.0 / self.per_minute
+
+    def set_rate(self, per_minute: float) -> None:
+        self._refill(time.monotonic())
+        self.per_minute = float(per_minute)
+        self.capacity = float(per_minute)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def set_remaining(self, remaining: float, now: float) -> None:
+        """Sync with the server's view of the remaining quota"""
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+
+def parse_duration(value) -> Optional[float]:
+    """
+    Parse a rate limit reset/retry value into seconds.
+
+    Accepts plain seconds ("1.5"), OpenAI-style durations ("6m0s", "20ms"),
+    millisecond epoch timestamps (OpenRouter's X-RateLimit-Reset) and HTTP dates (Retry-After).
+    """
+    if not isinstance(value, (str, int, float)):
+        return None
+    text = str(value).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        number = None
+
+    if number is not None:
+        if number > 1e12:  # epoch milliseconds
+            return max(0.0, number / 1000.0 - time.time())
+        if number > 1e9:  # epoch seconds
+            return max(0.0, number - time.time())
+        return max(0.0, number)
+
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', text)
+    if parts and ''.join(n + u for n, u in parts) == text:
+        factors = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+        return sum(float(n) * factors[u] for n, u in parts)
+
+    try:
+        return max(0.0, parsedate_to_datetime(text).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _header(headers: Mapping, *names: str):
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            value = headers.get(name.lower())
+        if isinstance(value, (str, int, float)):
+            return value
+    return None
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Request/token budgets and adaptive concurrency for one provider and model"""
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_concurrency: Optional[int] = None, shared: Optional[SharedQuota] = None):
+        self.name = name
+        # when set, bucket levels and back-offs live in a file shared with other processes
+        self.shared = shared
+        self._cond = threading.Condition()
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        # explicitly configured budgets are not overridden by response headers
+        self._configured_rpm = bool(rpm)
+        self._configured_tpm = bool(tpm)
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+        self.concurrency = float(self.max_concurrency)
+        self._in_flight = 0
+        self._blocked_until = 0.0
+
+    # ---- acquiring a slot ----
+
+    def _try_enter(self) -> bool:
+        if self._in_flight >= max(Config.LLM_MIN_CONCURRENCY, int(self.concurrency)):
+            return False
+        self._in_flight += 1
+        return True
+
+    def _reserve(self, tokens: int) -> float:
+        now = time.monotonic()
+        delay = max(0.0, self._blocked_until - now)
+        if self.shared:
+            budgets = {}
+            if self.requests:
+                budgets["requests"] = (self.requests.per_minute, 1)
+            if self.tokens and tokens:
+                budgets["tokens"] = (self.tokens.per_minute, tokens)
+            return max(delay, self.shared.reserve(self.name, budgets))
+        if self.requests:
+            delay = max(delay, self.requests.reserve(1, now))
+        if self.tokens and tokens:
+            delay = max(delay, self.tokens.reserve(tokens, now))
+        return delay
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request of about `tokens` tokens may be sent"""
+        with self._cond:
+            while not self._try_enter():
+                self._cond.wait(0.5)
+            delay = self._reserve(tokens)
+        if delay > 0:
+            myLogger.debug(f"Rate limiter {self.name}: waiting {delay:.1f}s")
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Async variant of acquire"""
+        while True:
+            with self._cond:
+                if self._try_enter():
+                    delay = self._reserve(tokens)
+                    break
+            await asyncio.sleep(0.05)
+        if delay > 0:
+            myLogger.debug(f"Rate limiter {self.name}: waiting {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def blocked_for(self) -> float:
+        """Seconds until the provider-requested pause (Retry-After / exhausted quota) ends"""
+        with self._cond:
+            blocked = max(0.0, self._blocked_until - time.monotonic())
+        if self.shared:
+            blocked = max(blocked, self.shared.blocked_for())
+        return blocked
+
+    def share_backoff(self, seconds: float) -> None:
+        """Let other processes using the same API key back off together with this one"""
+        if self.shared:
+            self.shared.block(seconds)
+
+    # ---- feedback ----
+
+    def on_success(self) -> None:
+        """Additive increase: about one more concurrent request per window of successes"""
+        with self._cond:
+            self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+            self._cond.notify_all()
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease, and pause everyone for `retry_after` seconds if known"""
+        with self._cond:
+            self.concurrency = max(float(Config.LLM_MIN_CONCURRENCY), self.concurrency / 2)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        if retry_after:
+            self.share_backoff(retry_after)
+        myLogger.debug(f"Rate limiter {self.name}: concurrency reduced to {int(self.concurrency)}")
+
+    def update_from_headers(self, headers: Optional[Mapping]) -> Optional[float]:
+        """
+        Seed the budgets from rate limit response headers.
+
+        Understands OpenAI's `x-ratelimit-{limit,remaining,reset}-{requests,tokens}`,
+        OpenRouter's `X-RateLimit-{Limit,Remaining,Reset}` and `Retry-After`.
+
+        Returns:
+            Optional[float]: Seconds from Retry-After, if present
+        """
+        if not headers:
+            return None
+        now = time.monotonic()
+        remaining_by_bucket = {}
+        pause = 0.0
+        with self._cond:
+            limit = _number(_header(headers, 'x-ratelimit-limit-requests', 'X-RateLimit-Limit'))
+            remaining = _number(_header(headers, 'x-ratelimit-remaining-requests', 'X-RateLimit-Remaining'))
+            reset = parse_duration(_header(headers, 'x-ratelimit-reset-requests', 'X-RateLimit-Reset'))
+            if limit and not self._configured_rpm:
+                if self.requests is None:
+                    self.requests = TokenBucket(limit)
+                elif self.requests.per_minute != limit:
+                    self.requests.set_rate(limit)
+            if remaining is not None and self.requests:
+                self.requests.set_remaining(remaining, now)
+                remaining_by_bucket["requests"] = remaining
+            if remaining == 0 and reset:
+                pause = reset
+
+            limit = _number(_header(headers, 'x-ratelimit-limit-tokens'))
+            remaining = _number(_header(headers, 'x-ratelimit-remaining-tokens'))
+            if limit and not self._configured_tpm:
+                if self.tokens is None:
+                    self.tokens = TokenBucket(limit)
+                elif self.tokens.per_minute != limit:
+                    self.tokens.set_rate(limit)
+            if remaining is not None and self.tokens:
+                self.tokens.set_remaining(remaining, now)
+                remaining_by_bucket["tokens"] = remaining
+
+            retry_after = parse_duration(_header(headers, 'Retry-After'))
+            pause = max(pause, retry_after or 0.0)
+            if pause:
+                self._blocked_until = max(self._blocked_until, now + pause)
+
+        if self.shared:
+            for name, remaining in remaining_by_bucket.items():
+                self.shared.set_remaining(self.name, name, remaining)
+            if pause:
+                self.shared.block(pause)
+        return retry_after
+
+
+_lock = threading.Lock()
+_limiters: Dict[str, RateLimiter] = {}
+_settings: Dict[str, dict] = {}
+
+
+def configure_rate_limit(model_with_prefix: str, settings: Optional[dict]) -> None:
+    """
+    Register rate limit settings (e.g. a profile's `rate_limit` section) for a model.
+
+    Args:
+        model_with_prefix: Model as passed to LLMClient, e.g. "openrouter/qwen/qwen-max"
+        settings: Dict with optional `rpm`, `tpm` and `max_concurrency`
+    """
+    if settings:
+        _settings[model_with_prefix] = dict(settings)
+
+
+def get_rate_limiter(key: str, model_with_prefix: Optional[str] = None, provider: Optional[str] = None,
+                     api_key: Optional[str] = None) -> Optional[RateLimiter]:
+    """
+    Return the process-wide limiter for a provider/model key, or None if rate limiting is disabled.
+
+    Settings registered for `model_with_prefix` apply when the limiter is first created. With
+    `provider` and `api_key` the budgets are shared with other processes using the same key.
+    """
+    if not Config.LLM_RATE_LIMIT_ENABLED:
+        return None
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            settings = _settings.get(model_with_prefix or key, {})
+            shared = get_shared_quota(provider, api_key) if provider else None
+            limiter = RateLimiter(key, rpm=settings.get("rpm"), tpm=settings.get("tpm"),
+                                  max_concurrency=settings.get("max_concurrency"), shared=shared)
+            _limiters[key] = limiter
+        return limiter
@@ -0,0 +1,111 @@
+# ---- Cross-Process Quota ----
+# File: aicoder/llm/shared_quota.py
+#
+# Several aicoder processes on one host (e.g. parallel CI jobs) using the same
+# API key draw from one request/token budget and share 429 back-offs. The state
+# lives in a small JSON file per provider and API key, guarded by an flock.
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, quotas stay per process
+    fcntl = None
+
+from ..config import Config
+from ..utils.logger import myLogger
+
+
+class SharedQuota:
+    """
+    Token buckets and back-off state shared by all processes using one provider/API key.
+
+    Buckets are namespaced (per model), the back-off applies to the whole key.
+    Wall-clock time is used because monotonic clocks are not comparable across processes.
+    """
+
+    def __init__(self, provider: str, api_key: str, directory: Optional[Path] = None):
+        key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        directory = Path(directory or Config.LLM_SHARED_QUOTA_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"{provider}-{key_hash}.json"
+        self._lock_path = directory / f"{provider}-{key_hash}.lock"
+
+    def _update(self, change):
+        """Run `change(state, now)` on the state under an exclusive lock and persist it"""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    state = json.loads(self.path.read_text())
+                except (OSError, ValueError):
+                    state = {}
+                result = change(state, time.time())
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps(state))
+                os.replace(tmp_path, self.path)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def reserve(self, namespace: str, budgets: Dict[str, Tuple[float, float]]) -> float:
+        """
+        Take from the shared buckets and return the seconds to wait.
+
+        Args:
+            namespace: Bucket owner, e.g. "openrouter/qwen/qwen-max"
+            budgets: {bucket name: (per-minute rate, amount to take)}, e.g. {"requests": (20, 1)}
+        """
+        def change(state, now):
+            buckets = state.setdefault("buckets", {}).setdefault(namespace, {})
+            delay = max(0.0, state.get("blocked_until", 0.0) - now)
+            for name, (per_minute, amount) in budgets.items():
+                bucket = buckets.get(name) or {"tokens": per_minute, "updated": now}
+                tokens = min(per_minute, bucket["tokens"] + (now - bucket["updated"]) * per_minute / 60.0)
+                tokens -= min(amount, per_minute)
+                buckets[name] = {"tokens": tokens, "updated": now}
+                if tokens < 0:
+                    delay = max(delay, -tokens * 60.0 / per_minute)
+            return delay
+
+        return self._update(change)
+
+    def set_remaining(self, namespace: str, name: str, remaining: float) -> None:
+        """Sync a shared bucket with the provider's view of the remaining quota"""
+        def change(state, now):
+            buckets = state.setdefault("buckets", {}).setdefault(namespace, {})
+            bucket = buckets.get(name)
+            if bucket is None or bucket["tokens"] > remaining:
+                buckets[name] = {"tokens": float(remaining), "updated": now}
+
+        self._update(change)
+
+    def block(self, seconds: float) -> None:
+        """Make every process using this key wait `seconds` before its next request"""
+        def change(state, now):
+            state["blocked_until"] = max(state.get("blocked_until", 0.0), now + seconds)
+
+        self._update(change)
+
+    def blocked_for(self) -> float:
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return 0.0
+        return max(0.0, state.get("blocked_until", 0.0) - time.time())
+
+
+def get_shared_quota(provider: str, api_key: Optional[str]) -> Optional[SharedQuota]:
+    """Shared quota for a provider/API key, or None if disabled or unsupported on this platform"""
+    if not Config.LLM_SHARED_QUOTA_ENABLED or fcntl is None or not api_key:
+        return None
+    try:
+        return SharedQuota(provider, api_key)
+    except OSError as e:
+        myLogger.warning(f"Shared rate limit state unavailable, limiting per process only: {e}")
+        return None
@@ -0,0 +1,60 @@
+# ---- Token Estimation ----
+# File: aicoder/llm/tokens.py
+#
+# Cheap token estimates for budgeting requests. Tokenizers differ per model, so
+# these are deliberately rough (about 4 characters per token for English/code).
+
+from typing import List
+
+CHARS_PER_TOKEN = 4
+# Per-message framing added by chat APIs (role markers etc.)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_messages_tokens(messages: List[dict]) -> int:
+    """Estimate the prompt tokens of a list of chat messages"""
+    return sum(estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def estimate_request_tokens(messages: List[dict]) -> int:
+    """
+    Estimate prompt plus completion tokens of a request.
+
+    Documentation requests echo most of the code back (whole file, diff or
+    search/replace blocks), so the completion is assumed to be as long as the user prompt.
+    """
+    user_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages if m.get("role") == "user")
+    return estimate_messages_tokens(messages) + user_tokens
+
+
+# Documentation added to code without comments, relative to the code size
+DOC_GROWTH = 0.35
+# Diff-style responses repeat anchor lines around each insertion
+SEARCHREPLACE_OUTPUT_FACTOR = 1.5
+UDIFF_OUTPUT_FACTOR = 1.3
+# JSON docblock entries carry only the comments plus keys and escaping
+DOCBLOCK_OUTPUT_FACTOR = 1.2
+
+
+def estimate_output_tokens(code_tokens: int, strategy: str, comment_density: float = 0.0) -> int:
+    """
+    Estimate the completion tokens for documenting code of `code_tokens` tokens.
+
+    Args:
+        code_tokens: Estimated tokens of the code sent
+        strategy: wholefile, udiff, searchreplace, docblock (other strategies are treated like wholefile)
+        comment_density: Share of lines that already are comments; well documented code gets fewer additions
+    """
+    added = code_tokens * max(0.05, DOC_GROWTH - comment_density)
+    if strategy == "searchreplace":
+        return int(added * SEARCHREPLACE_OUTPUT_FACTOR)
+    if strategy == "udiff":
+        return int(added * UDIFF_OUTPUT_FACTOR)
+    if strategy == "docblock":
+        return int(added * DOCBLOCK_OUTPUT_FACTOR)
+    return int(code_tokens + added)
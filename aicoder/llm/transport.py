@@ -0,0 +1,139 @@
+# ---- Shared HTTP Transport ----
+# File: aicoder/llm/transport.py
+#
+# Process-wide connection pools for the LLM providers. Adapters are cheap and
+# created per LLMClient; the sessions/clients behind them are shared so batch
+# runs reuse keep-alive connections instead of doing a TCP+TLS handshake per request.
+
+import asyncio
+import contextvars
+import gzip
+import importlib.util
+import json
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config import Config
+from ..utils.logger import myLogger
+from ..utils.tracing import span
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_openai_clients: Dict[Tuple[str, str], object] = {}
+_openai_http_clients: Dict[Tuple[str, str], object] = {}
+_prewarmed: set = set()
+# async clients hold connections bound to one event loop, so they are kept per loop
+_async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (used by the OpenAI SDK's httpx client)"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_session(base_url: str) -> requests.Session:
+    """
+    Return the pooled keep-alive session for an API base URL.
+
+    Retries are left to LLMClient, so the adapter does not retry on its own.
+    """
+    with _lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[base_url] = session
+        return session
+
+
+def get_openai_client(base_url: str, api_key: Optional[str]):
+    """Return the shared OpenAI SDK client for a base URL and API key (HTTP/2 if `h2` is installed)"""
+    from openai import DefaultHttpxClient, OpenAI
+
+    key = (base_url, api_key or "")
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            http_client = DefaultHttpxClient(http2=http2_available())
+            # retries are LLMClient's job; SDK retries would multiply its attempts and hide 429s from the limiter
+            client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+            _openai_http_clients[key] = http_client
+            _openai_clients[key] = client
+        return client
+
+
+def get_async_openai_client(base_url: str, api_key: Optional[str], default_headers: Optional[Dict[str, str]] = None):
+    """
+    Return the shared AsyncOpenAI client for the running event loop, base URL and API key.
+
+    The SDK's own retries are disabled; LLMClient decides when to retry.
+    """
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    loop = asyncio.get_running_loop()
+    key = (base_url, api_key or "")
+    with _lock:
+        clients = _async_openai_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                default_headers=default_headers,
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(http2=http2_available())
+            )
+            clients[key] = client
+        return client
+
+
+def encode_json_body(data: dict) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize a request body, gzip-compressing it when enabled and large enough.
+
+    Returns:
+        Tuple[bytes, Dict[str, str]]: Body and the headers describing it
+    """
+    body = json.dumps(data).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if Config.HTTP_GZIP_REQUESTS and len(body) >= Config.HTTP_GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def _warm_up(base_url: str, request) -> None:
+    try:
+        with span("http.connect", base_url=base_url):
+            request(base_url, timeout=Config.HTTP_PREWARM_TIMEOUT)
+        myLogger.debug(f"Connection to {base_url} pre-warmed")
+    except Exception as e:  # the real request reports connection problems
+        myLogger.debug(f"Pre-warming {base_url} failed: {e}")
+
+
+def prewarm(base_url: str, api_key: Optional[str] = None, openai_client: bool = False) -> None:
+    """
+    Open a pooled connection to `base_url` in the background (once per process), so the
+    TCP+TLS handshake overlaps with prompt building instead of delaying the first request.
+    """
+    if not Config.HTTP_PREWARM:
+        return
+    key = (base_url, api_key or "", openai_client)
+    with _lock:
+        if key in _prewarmed:
+            return
+        _prewarmed.add(key)
+
+    if openai_client:
+        get_openai_client(base_url, api_key)
+        request = _openai_http_clients[(base_url, api_key or "")].head
+    else:
+        request = get_session(base_url).head
+    # run in a copy of the caller's context so the connect span joins its trace
+    threading.Thread(target=contextvars.copy_context().run, args=(_warm_up, base_url, request), daemon=True).start()
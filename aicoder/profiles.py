@@ -1,11 +1,9 @@
 # profiles.py
-import os
 from enum import Enum
 
-import yaml
-from pathlib import Path
 from typing import Dict, Any, Optional, List
 
+from .config_snapshot import ConfigSnapshot, get_config_snapshot
 from .utils.logger import myLogger
 
 
@@ -16,65 +14,24 @@ class ProfileType(Enum):
 
 class ProfileLoader:
     """
-    Handles loading and validating profiles from YAML configuration.
+    Resolves and validates profiles from the compiled configuration (see config_snapshot.py).
 
     Profiles define preset combinations of model and strategy settings
     that can be selected via the CLI.
     """
 
-    PROFILES_DIR_PATH = Path(__file__).parent.parent / "config" / "profiles/"
-    ALIASES_PATH = Path(__file__).parent.parent / "config" / "model-aliases.yaml"
-    VALID_STRATEGIES = ["wholefile", "udiff", "searchreplace"]
+    VALID_STRATEGIES = ["wholefile", "udiff", "searchreplace", "docblock"]
 
-    def __init__(self):
+    def __init__(self, snapshot: Optional[ConfigSnapshot] = None):
         """Initialize the profile loader."""
-        self.profiles = {}
-        self.model_aliases = self._load_model_aliases() # Load aliases first
-        self._load_profiles(ProfileType.ANALYZER, 'analyzer-profiles.yaml')
-        self._load_profiles(ProfileType.COMMENTER, 'commenter-profiles.yaml')
-
-
-    def _load_model_aliases(self) -> Dict[str, str]:
-        """Load model aliases from the YAML configuration file."""
-        if not self.ALIASES_PATH.exists():
-            myLogger.warning(f"Model aliases file not found: {self.ALIASES_PATH}")
-            return {}
-        try:
-            with open(self.ALIASES_PATH, 'r') as file:
-                data = yaml.safe_load(file)
-                if not isinstance(data, dict):
-                    myLogger.error(f"Invalid format in model aliases file: {self.ALIASES_PATH}. Expected a dictionary.")
-                    return {}
-                return data if data else {}
-        except Exception as e:
-            myLogger.error(f"Error loading model aliases from {self.ALIASES_PATH}: {e}")
-            return {}
-
-    def _load_profiles(self, profile_type: ProfileType, filename: str) -> None:
-        """
-        Load profiles from the YAML configuration file.
-        """
-        file_path = self.PROFILES_DIR_PATH / filename
-        if not file_path.exists():
-            myLogger.warning(f"Profile file not found: {file_path}")
-            self.profiles[profile_type] = {}
-            return
-
-        try:
-            with open(file_path, 'r') as file:
-                data = yaml.safe_load(file)
-                if not data or 'profiles' not in data or not isinstance(data['profiles'], dict):
-                    myLogger.warning(f"Invalid profiles file format in {filename}. Expected 'profiles' key with a dictionary.")
-                    self.profiles[profile_type] = {}
-                    return
-
-                self.profiles[profile_type] = data['profiles']
-                myLogger.debug(f"Loaded {len(data['profiles'])} profiles from {filename}")
-
-        except Exception as e:
-            myLogger.error(f"Error loading profiles from {filename}: {e}")
-            self.profiles[profile_type] = {}
+        self.snapshot = snapshot or get_config_snapshot()
+        self.model_aliases = self.snapshot.model_aliases
+        self.profiles = {profile_type: self.snapshot.profiles.get(profile_type.value, {}) for profile_type in ProfileType}
+        self.analyzer_prompts = self.snapshot.analyzer_prompts
 
+    def resolve_model_alias(self, model: str) -> str:
+        """The full model identifier for an alias from model-aliases.yaml; anything else is returned as is"""
+        return self.model_aliases.get(model, model)
 
     def get_profile(self, profile_type: ProfileType, name: str) -> Optional[Dict[str, Any]]:
         """
@@ -96,10 +53,25 @@ class ProfileLoader:
         # Make a copy to avoid modifying the original loaded dict
         resolved_profile = profile_data.copy()
 
+        # Resolve the aliases of a model pool (see core/router.py); its first model is the default
+        pool = resolved_profile.get("pool")
+        if pool is not None:
+            if not isinstance(pool, list) or not all(isinstance(m, str) for m in pool):
+                myLogger.warning(f"Ignoring 'pool' in profile '{name}': expected a list of models.")
+                pool = []
+            resolved_profile["pool"] = list(dict.fromkeys(self.resolve_model_alias(m) for m in pool))
+            if resolved_profile["pool"] and not resolved_profile.get("model"):
+                resolved_profile["model"] = pool[0]
+
+        provider = resolved_profile.get("provider")
+        if provider is not None and not isinstance(provider, dict):
+            myLogger.warning(f"Ignoring 'provider' in profile '{name}': expected OpenRouter provider preferences.")
+            del resolved_profile["provider"]
+
         # Resolve model alias
         model_alias = resolved_profile.get("model")
-        if model_alias and model_alias in self.model_aliases:
-            resolved_model = self.model_aliases[model_alias]
+        resolved_model = self.resolve_model_alias(model_alias) if model_alias else None
+        if model_alias and resolved_model != model_alias:
             resolved_profile["model"] = resolved_model
             myLogger.debug(f"Resolved model alias '{model_alias}' to '{resolved_model}' for profile '{name}'")
         elif model_alias:
@@ -125,8 +97,59 @@ class ProfileLoader:
              # Decide how to handle invalid strategy (e.g., return None, use default)
              # return None # Option 1: Consider profile invalid
 
+        # Resolve aliases and validate strategies in per-file rules
+        rules = resolved_profile.get("rules")
+        if rules is not None:
+            if not isinstance(rules, list):
+                myLogger.warning(f"Ignoring 'rules' in profile '{name}': expected a list.")
+                resolved_profile["rules"] = []
+            else:
+                resolved_profile["rules"] = [self._resolve_rule(rule, name) for rule in rules if isinstance(rule, dict)]
+
+        # Resolve the fallback chain: {model, strategy} pairs or names of other commenter profiles
+        chain = resolved_profile.get("chain")
+        if chain is not None:
+            if not isinstance(chain, list):
+                myLogger.warning(f"Ignoring 'chain' in profile '{name}': expected a list.")
+                chain = []
+            entries = [self._resolve_chain_entry(entry, resolved_profile, name) for entry in chain]
+            resolved_profile["chain"] = [entry for entry in entries if entry]
+
+        hedge_after = resolved_profile.get("hedge_after")
+        if hedge_after is not None and hedge_after != "p95" and (
+                isinstance(hedge_after, bool) or not isinstance(hedge_after, (int, float)) or hedge_after <= 0):
+            myLogger.warning(f"Ignoring 'hedge_after' in profile '{name}': expected seconds or 'p95'.")
+            del resolved_profile["hedge_after"]
+
         return resolved_profile
 
+    def _resolve_chain_entry(self, entry: Any, profile: Dict[str, Any], profile_name: str) -> Optional[Dict[str, str]]:
+        """A chain entry as {model, strategy} with the alias resolved, None if it is invalid."""
+        if isinstance(entry, str):
+            referenced = self.profiles.get(ProfileType.COMMENTER, {}).get(entry)
+            if not isinstance(referenced, dict):
+                myLogger.warning(f"Ignoring unknown profile '{entry}' in the chain of profile '{profile_name}'.")
+                return None
+            entry = referenced
+        if not isinstance(entry, dict) or not entry.get("model"):
+            myLogger.warning(f"Ignoring a chain entry without 'model' in profile '{profile_name}'.")
+            return None
+        strategy = entry.get("strategy") or profile.get("strategy")
+        if strategy not in self.VALID_STRATEGIES:
+            myLogger.warning(f"Ignoring a chain entry with invalid strategy '{strategy}' in profile '{profile_name}'.")
+            return None
+        return {"model": self.resolve_model_alias(entry["model"]), "strategy": strategy}
+
+    def _resolve_rule(self, rule: Dict[str, Any], profile_name: str) -> Dict[str, Any]:
+        """Resolve the model alias of a profile rule and drop an invalid strategy."""
+        resolved_rule = rule.copy()
+        if "model" in resolved_rule:
+            resolved_rule["model"] = self.resolve_model_alias(resolved_rule["model"])
+        if "strategy" in resolved_rule and resolved_rule["strategy"] not in self.VALID_STRATEGIES:
+            myLogger.warning(f"Ignoring invalid strategy '{resolved_rule['strategy']}' in a rule of profile '{profile_name}'.")
+            del resolved_rule["strategy"]
+        return resolved_rule
+
 
     def get_available_profiles(self, profile_type: ProfileType) -> List[str]:
         """
@@ -138,5 +161,20 @@ class ProfileLoader:
         return list(self.profiles.get(profile_type, {}).keys())
 
 
-# Singleton instance
-profile_loader = ProfileLoader()
\ No newline at end of file
+_profile_loader: Optional[ProfileLoader] = None
+
+
+def get_profile_loader() -> ProfileLoader:
+    """Shared profile loader for the current config snapshot, created on first use and after a reload"""
+    global _profile_loader
+    snapshot = get_config_snapshot()
+    if _profile_loader is None or _profile_loader.snapshot is not snapshot:
+        _profile_loader = ProfileLoader(snapshot)
+    return _profile_loader
+
+
+def __getattr__(name: str):
+    # `from aicoder.profiles import profile_loader` keeps working and loads the profiles at that point
+    if name == "profile_loader":
+        return get_profile_loader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
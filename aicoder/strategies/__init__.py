@@ -2,5 +2,22 @@ from .base import ChangeStrategy
 from .wholefile_strategy import WholeFileStrategy
 from .udiff_strategy import UDiffStrategy
 from .searchreplace_strategy import SearchReplaceStrategy
+from .docblock_strategy import DocblockStrategy
 
-__all__ = ['ChangeStrategy', 'WholeFileStrategy', 'UDiffStrategy', 'SearchReplaceStrategy']
+STRATEGIES = {
+    "wholefile": WholeFileStrategy,
+    "udiff": UDiffStrategy,
+    "searchreplace": SearchReplaceStrategy,
+    "docblock": DocblockStrategy,
+}
+
+
+def create_strategy(name: str) -> ChangeStrategy:
+    """Instantiate a change strategy by its profile/CLI name"""
+    strategy_class = STRATEGIES.get(name.lower())
+    if strategy_class is None:
+        raise ValueError(f"Invalid strategy: {name}. Choose from: {', '.join(STRATEGIES)}")
+    return strategy_class()
+
+
+__all__ = ['ChangeStrategy', 'WholeFileStrategy', 'UDiffStrategy', 'SearchReplaceStrategy', 'DocblockStrategy', 'STRATEGIES', 'create_strategy']
@@ -1,11 +1,14 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
 import tempfile
 import subprocess
 
 class ChangeStrategy(ABC):
 
+    # Provider `response_format` to request (e.g. {"type": "json_object"}); None for free-form text
+    response_format: Optional[dict] = None
+
     @staticmethod
     @abstractmethod
     def get_prompt_additions() -> str:
@@ -27,4 +30,17 @@ class ChangeStrategy(ABC):
         """
         pass
 
+    def process_llm_stream(self, llmResponseStream: Iterable[str], pathOrigFile) -> Tuple[str, Path|None]:
+        """
+        Apply changes from a streamed LLM response.
+
+        Strategies that can act on parts of the response before it is complete override
+        this; the default collects the whole response and calls process_llm_response.
+
+        Returns:
+            tuple: (full raw response, temporary_file_path or None)
+        """
+        llmResponseRaw = ''.join(llmResponseStream)
+        return llmResponseRaw, self.process_llm_response(llmResponseRaw, pathOrigFile)
+
 
@@ -0,0 +1,194 @@
+import json
+import re
+from pathlib import Path
+from textwrap import dedent
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base import ChangeStrategy
+from aicoder.core.structure import Symbol, find_symbols
+from aicoder.llm.helpers import MyHelpers
+from aicoder.utils.logger import myLogger
+
+
+class DocblockStrategy(ChangeStrategy):
+    """
+    Strategy where the LLM returns only the comments, as JSON keyed by symbol name.
+
+    Each entry is `{symbol, kind, docblock, section_comments}`; the docblock is placed
+    above the declaration found by scanning the original file (replacing an existing
+    docblock) and section comments are inserted above the given code lines inside
+    the symbol. No code is echoed back, so responses are a fraction of the size.
+    """
+
+    # Ask providers that support it for a syntactically valid JSON response
+    response_format = {"type": "json_object"}
+
+    @staticmethod
+    def get_prompt_additions() -> str:
+        """Return strategy-specific prompt additions for the JSON docblock format"""
+        return dedent("""
+            - Do NOT return the code. Respond ONLY with a JSON object of this form:
+            ```
+            {"entries": [
+              {"symbol": "ClassName::methodName", "kind": "method",
+               "docblock": "/**\\n * Explains what the method does.\\n */",
+               "section_comments": [{"before": "exact code line the comment goes above", "comment": "// ---- what the next part does"}]}
+            ]}
+            ```
+            - `symbol`: class, interface, trait or function name, `ClassName::methodName` for methods, block or macro name for Twig
+            - `kind`: class, interface, trait, enum, function, method, block or macro
+            - `docblock`: the complete new comment for directly above the declaration (`/** ... */` for PHP, `{# ... #}` for Twig), or null to keep the existing one
+            - `section_comments`: comments inside the symbol; `before` must be copied exactly from a line of the code
+            - Only include symbols whose documentation you add or improve
+        """)
+
+    def process_llm_response(self, llmResponseRaw: str, pathOrigFile: Path) -> Optional[Path]:
+        """
+        Parse the JSON entries and apply them to the original file.
+
+        Returns:
+            Optional[Path]: Temp file with the documented code, or None if the response has no usable entries
+        """
+        myLogger.debug("Processing response with DocblockStrategy")
+
+        entries = self.parse_entries(llmResponseRaw)
+        if entries is None:
+            myLogger.error("LLM response is not valid JSON in the docblock format")
+            return None
+
+        with open(pathOrigFile, 'r') as f:
+            original_content = f.read()
+
+        modified_content = self.apply_entries(original_content, pathOrigFile.suffix.lower(), entries)
+        if modified_content == original_content:
+            return None
+
+        return MyHelpers.writeTempCodeFile(modified_content, pathOrigFile.suffix)
+
+    @staticmethod
+    def parse_entries(llmResponseRaw: str) -> Optional[List[Dict[str, Any]]]:
+        """Extract the entry list from the response (tolerates code fences and surrounding prose)"""
+        text = MyHelpers.strip_code_block_markers(llmResponseRaw.strip())
+        start = min((i for i in (text.find('{'), text.find('[')) if i != -1), default=-1)
+        if start == -1:
+            return None
+        try:
+            data, _ = json.JSONDecoder().raw_decode(text[start:])
+        except ValueError:
+            return None
+        if isinstance(data, dict):
+            data = data.get("entries")
+        if not isinstance(data, list):
+            return None
+        return [entry for entry in data if isinstance(entry, dict) and entry.get("symbol")]
+
+    def apply_entries(self, code: str, file_extension: str, entries: List[Dict[str, Any]]) -> str:
+        """Apply docblocks and section comments; entries whose symbol cannot be found are skipped"""
+        lines = code.splitlines(keepends=True)
+        symbols = self._find_symbols(code, file_extension)
+        edits: List[Tuple[int, int, List[str]]] = []  # (start, end exclusive, replacement lines)
+
+        for entry in entries:
+            symbol = self._resolve_symbol(symbols, entry)
+            if symbol is None:
+                myLogger.warning(f"Symbol '{entry['symbol']}' not found, skipping its documentation")
+                continue
+
+            indent = re.match(r'[ \t]*', lines[symbol.start_line]).group(0)
+            docblock = entry.get("docblock")
+            if isinstance(docblock, str) and docblock.strip():
+                start, end = self._existing_docblock(lines, symbol, file_extension)
+                edits.append((start, end, self._indent_comment(docblock, indent)))
+
+            for section in entry.get("section_comments") or []:
+                edit = self._section_comment_edit(lines, symbol, section)
+                if edit:
+                    edits.append(edit)
+
+        return ''.join(self._apply_edits(lines, edits))
+
+    # ---- locating symbols ----
+
+    @staticmethod
+    def _find_symbols(code: str, file_extension: str) -> List[Symbol]:
+        if file_extension == '.php' and '<?php' not in code and '<?=' not in code:
+            # chunk of a larger file: scan it as PHP code, then shift back by the added line
+            symbols = find_symbols("<?php\n" + code, file_extension)
+            for symbol in symbols:
+                symbol.start_line -= 1
+                symbol.end_line -= 1
+                symbol.doc_start -= 1
+            return symbols
+        return find_symbols(code, file_extension)
+
+    @staticmethod
+    def _resolve_symbol(symbols: List[Symbol], entry: Dict[str, Any]) -> Optional[Symbol]:
+        name = str(entry["symbol"]).strip()
+        parent = None
+        if '::' in name:
+            parent, name = name.rsplit('::', 1)
+            parent = parent.rsplit('\\', 1)[-1]
+        name = name.rstrip('()').lstrip('$')
+        candidates = [s for s in symbols if s.name == name]
+        # only narrow down, never fall back: a docblock must not land on a same-named symbol elsewhere
+        if parent:
+            candidates = [s for s in candidates if s.parent == parent]
+        if len(candidates) > 1 and entry.get("kind"):
+            candidates = [s for s in candidates if s.kind == entry["kind"]]
+        return candidates[0] if candidates else None
+
+    @staticmethod
+    def _existing_docblock(lines: List[str], symbol: Symbol, file_extension: str) -> Tuple[int, int]:
+        """Line range of the docblock to replace; empty range at the insertion point if there is none"""
+        opener, closer = ('{#', '#}') if file_extension == '.twig' else ('/**', '*/')
+        for index in range(symbol.doc_start, symbol.start_line):
+            if lines[index].strip().startswith(opener):
+                for end in range(index, symbol.start_line):
+                    if lines[end].rstrip().endswith(closer):
+                        return index, end + 1
+                break
+        # PHP docblocks go above attributes and line comments, Twig comments right above the tag
+        insert_at = symbol.doc_start if file_extension != '.twig' else symbol.start_line
+        return insert_at, insert_at
+
+    @staticmethod
+    def _indent_comment(comment: str, indent: str) -> List[str]:
+        result = []
+        for line in comment.strip().splitlines():
+            stripped = line.strip()
+            # align the ` * ` lines of a docblock under the opening `/**`
+            prefix = indent + (' ' if stripped.startswith('*') else '')
+            result.append(prefix + stripped + '\n' if stripped else '\n')
+        return result
+
+    def _section_comment_edit(self, lines: List[str], symbol: Symbol,
+                              section: Any) -> Optional[Tuple[int, int, List[str]]]:
+        if not isinstance(section, dict):
+            return None
+        before = str(section.get("before") or "").strip()
+        comment = str(section.get("comment") or "").strip()
+        if not before or not comment:
+            return None
+
+        for index in range(symbol.start_line + 1, symbol.end_line + 1):
+            if lines[index].strip() == before:
+                if index > 0 and lines[index - 1].strip() == comment:
+                    return None  # already there
+                indent = re.match(r'[ \t]*', lines[index]).group(0)
+                return index, index, self._indent_comment(comment, indent)
+
+        myLogger.warning(f"Line '{before}' not found in '{symbol.name}', skipping section comment")
+        return None
+
+    @staticmethod
+    def _apply_edits(lines: List[str], edits: List[Tuple[int, int, List[str]]]) -> List[str]:
+        """Apply edits bottom-up so earlier line numbers stay valid; overlapping replacements are dropped"""
+        result = list(lines)
+        lowest_start = len(lines) + 1
+        for start, end, replacement in sorted(edits, key=lambda e: (e[0], e[1]), reverse=True):
+            if end > lowest_start:
+                myLogger.warning(f"Skipping overlapping documentation edit at line {start + 1}")
+                continue
+            result[start:end] = replacement
+            lowest_start = start
+        return result
@@ -1,11 +1,13 @@
 import re
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 from textwrap import dedent
 
 from .base import ChangeStrategy
 from aicoder.utils.logger import myLogger
 from aicoder.llm.helpers import MyHelpers
+from aicoder.utils.search_replace import SearchReplaceEngine
+from .stream_parsers import SearchReplaceStreamParser
 
 
 class SearchReplaceStrategy(ChangeStrategy):
@@ -62,9 +64,54 @@ class SearchReplaceStrategy(ChangeStrategy):
         return temp_file
 
 
+    def process_llm_stream(self, llmResponseStream: Iterable[str], pathOrigFile: Path) -> Tuple[str, Optional[Path]]:
+        """
+        Process a streamed LLM response, locating each search/replace block as soon as it is complete
+
+        Blocks are located in the original content while the response is still being
+        generated; a block whose SEARCH text cannot be found is reported immediately.
+        The staged replacements are applied once the stream ends.
+
+        Returns:
+            tuple: (full raw response, path to the modified file)
+        """
+        myLogger.debug(f"Processing streamed response with SearchReplaceStrategy")
+
+        with open(pathOrigFile, 'r') as f:
+            original_content = f.read()
+
+        parser = SearchReplaceStreamParser()
+        engine = SearchReplaceEngine(original_content)
+        response_parts = []
+        reported = set()
+
+        def stage(blocks):
+            for search_str, replace_str in blocks:
+                block = engine.add(search_str, replace_str)
+                if block.located:
+                    myLogger.debug(f"Block {block.number}: located at offset {block.start}")
+                else:
+                    myLogger.warning(f"Block {block.number}: search text {block.status}: {search_str[:50]}...")
+                    reported.add(block.number)
+
+        for piece in llmResponseStream:
+            response_parts.append(piece)
+            stage(parser.feed(piece))
+        stage(parser.finish())
+
+        # Apply all located blocks in one pass; a block overlapping an earlier one is skipped
+        modified_content = engine.apply()
+        engine.report(already_reported=reported)
+
+        temp_file = MyHelpers.writeTempCodeFile(modified_content, "-searchreplace.php")
+        return ''.join(response_parts), temp_file
+
     def _apply_search_replace_blocks(self, original_content: str, response: str) -> str:
         """
-        Parse and apply search/replace blocks from the LLM response using line-by-line processing
+        Parse and apply search/replace blocks from the LLM response
+
+        All blocks are located in the original content first and then applied
+        together; blocks that are not found, ambiguous or overlapping are reported.
 
         Args:
             original_content: The original file content
@@ -73,47 +120,12 @@ class SearchReplaceStrategy(ChangeStrategy):
         Returns:
             str: The modified content with search/replace blocks applied
         """
-        # Split response into lines for processing
-        response_lines = response.split('\n')
-
-        modified_content = original_content
-        search_text = []
-        replace_text = []
-        current_block = None
-
         # Parse the response line by line to extract search/replace blocks
-        for line in response_lines:
-            if line.startswith('<<<<<<< SEARCH'):
-                current_block = 'search'
-                search_text = []
-            elif line.startswith('======='):
-                current_block = 'replace'
-                replace_text = []
-            elif line.startswith('>>>>>>> REPLACE'):
-                if search_text and replace_text:
-                    # Convert lists to strings
-                    search_str = '\n'.join(search_text)
-                    replace_str = '\n'.join(replace_text)
-
-                    # Find and replace the first occurrence
-                    try:
-                        search_pos = modified_content.find(search_str)
-                        if search_pos != -1:
-                            before = modified_content[:search_pos]
-                            after = modified_content[search_pos + len(search_str):]
-                            modified_content = before + replace_str + after
-                            myLogger.debug(f"Successfully applied search/replace block")
-                        else:
-                            myLogger.warning(f"Search text not found: {search_str[:50]}...")
-                    except Exception as e:
-                        myLogger.error(f"Error applying search/replace block: {str(e)}")
-
-                current_block = None
-                search_text = []
-                replace_text = []
-            elif current_block == 'search':
-                search_text.append(line)
-            elif current_block == 'replace':
-                replace_text.append(line)
-
-        return modified_content
\ No newline at end of file
+        parser = SearchReplaceStreamParser()
+        engine = SearchReplaceEngine(original_content)
+        for search_str, replace_str in parser.feed(response) + parser.finish():
+            engine.add(search_str, replace_str)
+
+        modified_content = engine.apply()
+        engine.report()
+        return modified_content
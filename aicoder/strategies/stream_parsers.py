@@ -0,0 +1,120 @@
+from typing import List, Tuple
+
+
+class _LineBuffer:
+    """Turns arbitrary text pieces into complete lines (line endings kept, normalized to \\n)"""
+
+    def __init__(self):
+        self._pending = ''
+
+    def feed(self, text: str) -> List[str]:
+        self._pending += text
+        lines = self._pending.split('\n')
+        self._pending = lines.pop()
+        return [line.rstrip('\r') + '\n' for line in lines]
+
+    def flush(self) -> List[str]:
+        rest, self._pending = self._pending, ''
+        return [rest] if rest else []
+
+
+class SearchReplaceStreamParser:
+    """
+    Incremental parser for `<<<<<<< SEARCH` / `=======` / `>>>>>>> REPLACE` blocks.
+
+    `feed` returns every block completed by the new text, so callers can act on a
+    block while the rest of the response is still being generated.
+    """
+
+    def __init__(self):
+        self._lines = _LineBuffer()
+        self._current_block = None
+        self._search_text: List[str] = []
+        self._replace_text: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        return self._parse(self._lines.feed(text))
+
+    def finish(self) -> List[Tuple[str, str]]:
+        return self._parse(self._lines.flush())
+
+    def _parse(self, lines: List[str]) -> List[Tuple[str, str]]:
+        completed = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if line.startswith('<<<<<<< SEARCH'):
+                self._current_block = 'search'
+                self._search_text = []
+            elif line.startswith('=======') and self._current_block == 'search':
+                self._current_block = 'replace'
+                self._replace_text = []
+            elif line.startswith('>>>>>>> REPLACE'):
+                if self._search_text and self._replace_text:
+                    completed.append(('\n'.join(self._search_text), '\n'.join(self._replace_text)))
+                self._current_block = None
+                self._search_text = []
+                self._replace_text = []
+            elif self._current_block == 'search':
+                self._search_text.append(line)
+            elif self._current_block == 'replace':
+                self._replace_text.append(line)
+        return completed
+
+
+class UDiffStreamParser:
+    """
+    Incremental parser for unified diff hunks, mirroring PatcherV4._parse_hunks.
+
+    A hunk is complete when a line that is not part of a hunk (e.g. the next `@@ ... @@`)
+    arrives, or at the end of the stream. If the diff is wrapped in a markdown code
+    fence, only the first fenced block is used.
+    """
+
+    def __init__(self):
+        self._lines = _LineBuffer()
+        self._current_hunk: List[str] = []
+        self._seen_fence = False
+        self._done = False
+
+    def feed(self, text: str) -> List[List[str]]:
+        return self._parse(self._lines.feed(text))
+
+    def finish(self) -> List[List[str]]:
+        completed = self._parse(self._lines.flush())
+        if self._current_hunk and not self._done:
+            completed.append(self._current_hunk)
+        self._current_hunk = []
+        self._done = True
+        return completed
+
+    def _parse(self, lines: List[str]) -> List[List[str]]:
+        completed = []
+        for line in lines:
+            if self._done:
+                break
+            if line.startswith('```'):
+                if self._seen_fence:
+                    # end of the first fenced block: everything after it is prose
+                    if self._current_hunk:
+                        completed.append(self._current_hunk)
+                    self._current_hunk = []
+                    self._done = True
+                else:
+                    # an unfinished hunk before the opening fence was prose, not diff
+                    self._seen_fence = True
+                    self._current_hunk = []
+                continue
+
+            # Skip diff header lines
+            if line.startswith(('---', '+++')):
+                continue
+
+            # Start new hunk when we hit a non-diff line
+            if not line.startswith((' ', '-', '+')):
+                if self._current_hunk:
+                    completed.append(self._current_hunk)
+                    self._current_hunk = []
+                continue
+
+            self._current_hunk.append(line)
+        return completed
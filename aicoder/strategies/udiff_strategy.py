@@ -3,12 +3,15 @@ import hashlib
 from .base import ChangeStrategy
 from pathlib import Path
 from textwrap import dedent
+from typing import Iterable, Tuple
 
 from ..llm.helpers import MyHelpers
 from ..utils.patcher import MyPatcher
 from ..utils.patcher_v3 import PatcherV3
-from ..utils.patcher_v4 import PatcherV4
+from ..utils.line_index import LineIndex
+from ..utils.patcher_v4 import PatchError, PatcherV4
 from ..utils.logger import myLogger
+from .stream_parsers import UDiffStreamParser
 
 
 class UDiffStrategy(ChangeStrategy):
@@ -88,7 +91,49 @@ class UDiffStrategy(ChangeStrategy):
             # return None
             
         # Write modified content to temp file
-        pathTempPhpFile = MyHelpers.writeTempFileV2(hash, modified_content, '-patched.php')
+        pathTempPhpFile = MyHelpers.writeUniqueTempFile(hash, modified_content, '-patched.php')
         
         return pathTempPhpFile
 
+    def process_llm_stream(self, llmResponseStream: Iterable[str], pathOrigFile) -> Tuple[str, Path|None]:
+        """
+        Apply hunks from a streamed udiff response as soon as each hunk is complete.
+
+        Patching overlaps generation; a hunk that cannot be located is reported immediately.
+
+        Returns:
+            tuple: (full raw response, path of the patched temp file)
+        """
+        print("🔄 Applying streamed changes hunk by hunk...")
+
+        with open(pathOrigFile, 'r') as f:
+            original_content = f.read()
+        hash = hashlib.sha256(original_content.encode('utf-8')).hexdigest()[:8]
+        MyHelpers.writeTempFileV2(hash, original_content, '-original.php')
+
+        patcher = PatcherV4(continue_on_error=True, fuzzy_match=True)
+        parser = UDiffStreamParser()
+        index = LineIndex(patcher._normalize_newlines(original_content))
+        response_parts = []
+        hunk_count = 0
+
+        def apply(hunks):
+            nonlocal hunk_count
+            for hunk in hunks:
+                hunk_count += 1
+                try:
+                    before, after = patcher._hunk_to_before_after(hunk)
+                    patcher._apply_hunk(index, before, after)
+                    myLogger.debug(f"Applied hunk {hunk_count} while streaming")
+                except PatchError as e:
+                    myLogger.warning(f"Failed to apply hunk {hunk_count}: {str(e)}")
+
+        for piece in llmResponseStream:
+            response_parts.append(piece)
+            apply(parser.feed(piece))
+        apply(parser.finish())
+
+        llmResponseRaw = ''.join(response_parts)
+        MyHelpers.writeTempFileV2(hash, llmResponseRaw, '-patch.diff')
+        pathTempPhpFile = MyHelpers.writeUniqueTempFile(hash, index.text(), '-patched.php')
+        return llmResponseRaw, pathTempPhpFile
@@ -0,0 +1,142 @@
+# ---- Line Index ----
+# File: aicoder/utils/line_index.py
+#
+# Hash index over the lines of a document, used to locate patch anchors without
+# scanning the whole text per hunk. Lines are indexed by their exact text and by a
+# whitespace-normalized key; the index is built once and kept valid while line
+# ranges are replaced.
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+
+def normalized_key(line: str) -> str:
+    """Line text with indentation and runs of whitespace collapsed"""
+    return ' '.join(line.split())
+
+
+class LineIndex:
+    """
+    Lines of a document with lookups by exact and normalized line text.
+
+    Positions in the index are stored with the number of edits applied when the line
+    was indexed; a lookup translates them through the later edits. Replacing a range
+    therefore only indexes the new lines instead of rebuilding the index.
+    """
+
+    def __init__(self, text: str):
+        self.lines: List[str] = text.splitlines(keepends=True)
+        self._edits: List[Tuple[int, int, int]] = []  # (start, removed, added) in order of application
+        self._exact: Dict[str, List[Tuple[int, int]]] = {}
+        self._normalized: Dict[str, List[Tuple[int, int]]] = {}
+        self._index_lines(0, len(self.lines))
+
+    def text(self) -> str:
+        return ''.join(self.lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def line(self, number: int) -> str:
+        """Line text without its line break"""
+        return self.lines[number].rstrip('\n')
+
+    def _index_lines(self, start: int, end: int) -> None:
+        generation = len(self._edits)
+        for number in range(start, end):
+            text = self.line(number)
+            self._exact.setdefault(text, []).append((generation, number))
+            self._normalized.setdefault(normalized_key(text), []).append((generation, number))
+
+    def _current(self, generation: int, number: int) -> Optional[int]:
+        """Translate a line number recorded after `generation` edits; None if the line was replaced since"""
+        for start, removed, added in self._edits[generation:]:
+            if number >= start + removed:
+                number += added - removed
+            elif number >= start:
+                return None
+        return number
+
+    def _lookup(self, table: Dict[str, List[Tuple[int, int]]], key: str, normalized: bool) -> List[int]:
+        positions = []
+        for generation, number in table.get(key, ()):
+            current = self._current(generation, number)
+            if current is None:
+                continue
+            text = self.line(current)
+            if (normalized_key(text) if normalized else text) == key:
+                positions.append(current)
+        return sorted(positions)
+
+    def count(self, key: str, normalized: bool = False) -> int:
+        """Upper bound of the lines with this key (cheap; includes lines replaced since)"""
+        return len((self._normalized if normalized else self._exact).get(key, ()))
+
+    def find_line(self, key: str, normalized: bool = False) -> List[int]:
+        """Current line numbers whose exact (or normalized) text equals `key`"""
+        return self._lookup(self._normalized if normalized else self._exact, key, normalized)
+
+    def find_exact(self, lines: List[str]) -> List[int]:
+        """Start lines where `lines` occur verbatim, anchored on the rarest line of the block"""
+        anchor = min(range(len(lines)), key=lambda i: self.count(lines[i]))
+        matches = []
+        for position in self.find_line(lines[anchor]):
+            start = position - anchor
+            if start >= 0 and start + len(lines) <= len(self.lines) and \
+                    all(self.line(start + i) == line for i, line in enumerate(lines)):
+                matches.append(start)
+        return matches
+
+    def find_normalized(self, lines: List[str]) -> List[Tuple[int, int]]:
+        """
+        Line ranges (start, end exclusive) matching `lines` when whitespace is ignored.
+
+        Blank lines are skipped on both sides; the range starts at the first non-blank line.
+        """
+        keys = [normalized_key(line) for line in lines if line.strip()]
+        if not keys:
+            return []
+        matches = []
+        for start in self.find_line(keys[0], normalized=True):
+            number, matched = start, 0
+            while number < len(self.lines) and matched < len(keys):
+                key = normalized_key(self.line(number))
+                if key:
+                    if key != keys[matched]:
+                        break
+                    matched += 1
+                number += 1
+            if matched == len(keys):
+                matches.append((start, number))
+        return matches
+
+    def candidate_starts(self, lines: List[str], limit: int = 20, max_occurrences: int = 50) -> List[int]:
+        """
+        Likely start lines for a block that does not match exactly.
+
+        Each non-blank line votes for the start it implies wherever its normalized text
+        occurs; very common lines (closing braces, `else`) are ignored. Returns the
+        starts with the most votes.
+        """
+        votes: Counter = Counter()
+        for offset, line in enumerate(lines):
+            key = normalized_key(line)
+            if not key or self.count(key, normalized=True) > max_occurrences:
+                continue
+            for position in self.find_line(key, normalized=True):
+                if position >= offset:
+                    votes[position - offset] += 1
+        return [start for start, _ in votes.most_common(limit)]
+
+    def replace(self, start: int, end: int, new_text: str) -> None:
+        """Replace lines [start, end) with `new_text` and index the new lines"""
+        new_lines = new_text.splitlines(keepends=True)
+        if end >= len(self.lines) and self.lines and not self.lines[-1].endswith('\n') \
+                and new_lines and new_lines[-1].endswith('\n'):
+            # keep a missing line break at the end of the document
+            new_lines[-1] = new_lines[-1][:-1]
+        if start > 0 and start == len(self.lines) and not self.lines[-1].endswith('\n'):
+            self.lines[-1] += '\n'
+        self.lines[start:end] = new_lines
+        self._edits.append((start, end - start, len(new_lines)))
+        self._index_lines(start, start + len(new_lines))
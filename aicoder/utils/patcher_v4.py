@@ -3,7 +3,9 @@ from rich.console import Console
 from rich.theme import Theme
 import difflib
 
+from .line_index import LineIndex
 from .logger import myLogger
+from .tracing import span
 
 class PatchError(Exception):
     """Base exception for patch application errors"""
@@ -58,14 +60,14 @@ class PatcherV4:
         hunks = self._parse_hunks(udiff)
         self.console.print(f"[info]Found {len(hunks)} hunks to apply[/info]")
 
-        current_content = original_content
+        index = LineIndex(original_content)
         failed_hunks = []
 
         for i, hunk in enumerate(hunks, 1):
             self.console.print(f"[info]Processing hunk {i} of {len(hunks)}...[/info]")
             try:
                 before, after = self._hunk_to_before_after(hunk)
-                current_content = self._apply_single_hunk(current_content, before, after)
+                self._apply_hunk(index, before, after)
                 self.console.print(f"[success]Successfully applied hunk {i}[/success]")
             except PatchError as e:
                 error_msg = f"Failed to apply hunk {i}: {str(e)}"
@@ -83,7 +85,7 @@ class PatcherV4:
         else:
             self.console.print("[success]Patch application completed successfully[/success]")
 
-        return current_content
+        return index.text()
 
     def _normalize_newlines(self, text: str) -> str:
         """Normalize line endings to \n"""
@@ -147,134 +149,104 @@ class PatcherV4:
 
         return before_text, after_text
 
-    def _find_best_match(self, content: str, before: str) -> int:
+    def _find_best_match(self, index: LineIndex, before: str) -> tuple[int, int]:
         """
-        Find the best matching location for a code hunk using exact and fuzzy matching strategies.
+        Find the line range a code hunk's 'before' text applies to.
 
-        This method attempts to find where a piece of code ('before' content) best fits within
-        the target content. It uses a two-stage matching process:
-        1. First attempts exact string matching
-        2. If exact matching fails and fuzzy matching is enabled, uses difflib for approximate matching
+        Matching runs in three stages on the document's line index:
+        1. Exact match of the 'before' lines, anchored on the rarest of them
+        2. Match ignoring indentation and whitespace (blank lines are skipped)
+        3. If fuzzy matching is enabled, the best of the start lines suggested by
+           indexed lines of 'before', scored with difflib (at least 80% similar)
+
+        Each stage looks up candidate positions in the index instead of scanning the
+        document, so a hunk is located in time proportional to its own size plus the
+        number of candidates.
 
         Parameters
         ----------
-        content : str
-            The full text content to search within. This is typically the entire file
-            or document where we want to find the matching location.
+        index : LineIndex
+            Index of the document the hunk is applied to.
         before : str
-            The text content to match against. This is typically a code snippet or
-            text block that we want to locate within the main content.
+            The hunk's context and removed lines.
 
         Returns
         -------
-        int
-            The character position in 'content' where the best match begins.
-            For empty 'before' content, returns the length of 'content'.
+        tuple[int, int]
+            Start and end line (exclusive) to replace. For empty 'before' content,
+            an empty range at the end of the document.
 
         Raises
         ------
         MultipleMatchesError
-            When multiple exact matches are found, making it ambiguous where to place the hunk.
+            When 'before' occurs more than once (exactly or with normalized whitespace).
         NoMatchError
-            When no exact match is found and either:
-            - Fuzzy matching is disabled
-            - Fuzzy matching is enabled but no match meets the minimum similarity threshold
-
-        Notes
-        -----
-        The fuzzy matching algorithm:
-        - Splits both content and before text into lines
-        - Uses difflib.SequenceMatcher to find matching blocks
-        - For each matching block:
-            * Calculates similarity ratio between the matched subsequence and 'before'
-            * Requires a minimum similarity ratio of 0.8 (80% similar)
-        - Converts the best matching line number to a character position
-
-        The method prefers exact matches when available and only falls back to
-        fuzzy matching when necessary and enabled. This helps ensure the most
-        accurate placement of code hunks.
+            When no stage finds a match.
 
         Example
         -------
         >>> patcher = PatcherV4(fuzzy_match=True)
-        >>> content = "def hello():\\n    print('hello')\\n\\ndef world():"
-        >>> before = "def hello():\\n    print('hello')"
-        >>> patcher._find_best_match(content, before)
-        0  # Returns 0 since the match is at the start
+        >>> index = LineIndex("def hello():\\n    print('hello')\\n\\ndef world():")
+        >>> patcher._find_best_match(index, "def hello():\\n    print('hello')\\n")
+        (0, 2)
         """
 
         # Handle empty before case
         if not before.strip():
-            return len(content)
+            return len(index), len(index)
 
-        # Try exact match first
-        exact_matches = []
-        start = 0
-        while True:
-            idx = content.find(before, start)
-            if idx == -1:
-                break
-            exact_matches.append(idx)
-            start = idx + 1
+        before_lines = before.splitlines()
 
+        # Try exact match first
+        exact_matches = index.find_exact(before_lines)
         if len(exact_matches) == 1:
-            myLogger.success(f"💡 Found exact match at {exact_matches[0]}")
-            return exact_matches[0]
-
+            myLogger.success(f"💡 Found exact match at line {exact_matches[0] + 1}")
+            return exact_matches[0], exact_matches[0] + len(before_lines)
         elif len(exact_matches) > 1:
             raise MultipleMatchesError("Multiple exact matches found")
 
+        # Try with normalized whitespace
+        normalized_matches = index.find_normalized(before_lines)
+        if len(normalized_matches) == 1:
+            self.console.print("[warning]Found match with normalized whitespace[/warning]")
+            start, end = normalized_matches[0]
+            # leading blank context lines belong to the replaced range
+            leading_blank = next((i for i, line in enumerate(before_lines) if line.strip()), 0)
+            while leading_blank and start > 0 and not index.line(start - 1).strip():
+                start -= 1
+                leading_blank -= 1
+            return start, end
+        elif len(normalized_matches) > 1:
+            raise MultipleMatchesError("Multiple matches found with normalized whitespace")
+
         if not self.fuzzy_match:
             raise NoMatchError("No exact match found and fuzzy matching is disabled")
 
-        # Try fuzzy matching
-        before_lines = before.splitlines()
-        content_lines = content.splitlines()
-
-        matcher = difflib.SequenceMatcher(None, before_lines, content_lines)
-        matches = matcher.get_matching_blocks()  # Fixed: Call get_matching_blocks() on matcher instance
-
+        # Try fuzzy matching on the candidate positions only
         best_match = None
         best_ratio = 0.8  # Minimum similarity threshold
 
-        for match in matches:
-            i, j, n = match
-            if n > 0:  # Only consider non-zero length matches
-                subsequence = '\n'.join(content_lines[j:j + n])
-                ratio = difflib.SequenceMatcher(None, before, subsequence).ratio()
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_match = j
+        for start in index.candidate_starts(before_lines):
+            window = ''.join(index.lines[start:start + len(before_lines)])
+            ratio = difflib.SequenceMatcher(None, before, window).ratio()
+            if ratio > best_ratio:
+                best_ratio = ratio
+                best_match = start
 
         if best_match is not None:
-            # Convert line number to character position
-            char_pos = sum(len(line) + 1 for line in content_lines[:best_match])
-            return char_pos
+            return best_match, min(best_match + len(before_lines), len(index))
 
         raise NoMatchError("No suitable match found even with fuzzy matching")
 
+    def _apply_hunk(self, index: LineIndex, before: str, after: str) -> None:
+        """Apply a single hunk to the indexed document"""
+        with span("patch.hunk_match", lines=before.count('\n') + 1):
+            start, end = self._find_best_match(index, before)
+        self.console.print(f"[info]Found match at line {start + 1}[/info]")
+        index.replace(start, end, after)
+
     def _apply_single_hunk(self, content: str, before: str, after: str) -> str:
-        """Apply a single hunk to the content"""
-        # self.console.print("[info]Attempting to apply single hunk...[/info]")
-
-        try:
-            start = self._find_best_match(content, before)
-            self.console.print(f"[info]Found match at position {start}[/info]")
-
-            end = start + len(before)
-            return content[:start] + after + content[end:]
-
-        except NoMatchError:
-            # Try with normalized whitespace
-            normalized_content = ' '.join(content.split())
-            normalized_before = ' '.join(before.split())
-
-            if normalized_content.find(normalized_before) != -1:
-                self.console.print("[warning]Found match with normalized whitespace[/warning]")
-                # If we find a match with normalized whitespace, try to find the actual
-                # location in the original content
-                start = self._find_best_match(content, before.strip())
-                end = start + len(before)
-                return content[:start] + after + content[end:]
-            else:
-                raise
\ No newline at end of file
+        """Apply a single hunk to the content (builds a one-off index; use _apply_hunk for many hunks)"""
+        index = LineIndex(content)
+        self._apply_hunk(index, before, after)
+        return index.text()
@@ -0,0 +1,187 @@
+# ---- Search/Replace Engine ----
+# File: aicoder/utils/search_replace.py
+#
+# Resolves SEARCH/REPLACE blocks against the original content through a line
+# index and applies all of them in one join. Every block is located in the
+# original (not in partially modified content), so no text is copied per block
+# and overlapping or ambiguous blocks are detected. A block only claims the lines
+# it changes: unchanged context lines at its start and end may be shared with the
+# neighbouring blocks (e.g. the lines between two documented methods).
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Collection, List, Optional, Tuple
+
+from .line_index import LineIndex, normalized_key
+from .logger import myLogger
+from .tracing import span
+
+EXACT = "exact"
+NORMALIZED = "normalized"
+NOT_FOUND = "not found"
+AMBIGUOUS = "ambiguous"
+OVERLAPPING = "overlapping"
+
+
+@dataclass
+class ResolvedBlock:
+    """A SEARCH/REPLACE block and the range of the original it changes (character offsets)"""
+    number: int
+    search: str
+    replace: str
+    status: str
+    start: int = -1
+    end: int = -1
+
+    @property
+    def located(self) -> bool:
+        return self.status in (EXACT, NORMALIZED)
+
+
+class SearchReplaceEngine:
+    """
+    Locate SEARCH/REPLACE blocks in `original` and apply them together.
+
+    Blocks are matched on whole lines through the index: exactly first, then
+    ignoring indentation and whitespace (the REPLACE text is re-indented to the
+    original). A SEARCH text that is only part of a line falls back to a plain
+    substring search. When the SEARCH text occurs more than once, the occurrence
+    after the previous block is used, as models emit blocks in file order; if there
+    are several, the block is ambiguous. Blocks changing lines that an earlier block
+    changes too are skipped; shared unchanged context does not count.
+    """
+
+    def __init__(self, original: str):
+        self.original = original
+        self.index = LineIndex(original)
+        self.blocks: List[ResolvedBlock] = []
+        self._previous_end = 0
+        # character offset where each line starts
+        self._offsets = [0]
+        for line in self.index.lines:
+            self._offsets.append(self._offsets[-1] + len(line))
+
+    def add(self, search: str, replace: str) -> ResolvedBlock:
+        """Resolve one block against the original content (can be called while a response streams in)"""
+        with span("patch.block_match", lines=search.count('\n') + 1) as traced:
+            block = self._resolve(search, replace)
+            traced.set(status=block.status)
+        return block
+
+    def _resolve(self, search: str, replace: str) -> ResolvedBlock:
+        block = ResolvedBlock(len(self.blocks) + 1, search, replace, NOT_FOUND)
+        self.blocks.append(block)
+
+        search_lines = search.split('\n')
+        status = EXACT
+        whole_lines = True
+        spans = [self._span(start, start + len(search_lines)) for start in self.index.find_exact(search_lines)]
+        if not spans:
+            spans = self._find_substring(search)
+            whole_lines = False
+        if not spans:
+            status = NORMALIZED
+            whole_lines = True
+            spans = [self._span(start, end) for start, end in self.index.find_normalized(search_lines)]
+
+        chosen = self._choose(spans)
+        if chosen is None:
+            block.status = AMBIGUOUS if spans else NOT_FOUND
+            return block
+
+        block.status = status
+        block.start, block.end = chosen
+        if whole_lines:
+            first_line = bisect_right(self._offsets, block.start) - 1
+            if status == NORMALIZED:
+                block.replace = self._reindent(search_lines, replace, self.index.line(first_line))
+            self._clip(block, first_line, search_lines, status == NORMALIZED)
+        self._previous_end = block.end
+        return block
+
+    def _clip(self, block: ResolvedBlock, first_line: int, search_lines: List[str], normalized: bool) -> None:
+        """Narrow a whole-line block to the lines it changes, leaving its unchanged context lines out"""
+        replace_lines = block.replace.split('\n')
+        same = (lambda a, b: normalized_key(a) == normalized_key(b)) if normalized else (lambda a, b: a == b)
+        shortest = min(len(search_lines), len(replace_lines))
+        prefix = 0
+        while prefix < shortest and same(search_lines[prefix], replace_lines[prefix]):
+            prefix += 1
+        suffix = 0
+        while suffix < shortest - prefix and same(search_lines[-1 - suffix], replace_lines[-1 - suffix]):
+            suffix += 1
+        if prefix == 0 and suffix == 0:
+            return
+
+        start_line, end_line = first_line + prefix, first_line + len(search_lines) - suffix
+        replacement = ''.join(line + '\n' for line in replace_lines[prefix:len(replace_lines) - suffix])
+        # replace whole lines including their line breaks; only the last line of the file may lack one
+        if end_line == len(self.index) and not self.original.endswith('\n') and replacement:
+            if start_line < end_line:
+                replacement = replacement[:-1]
+            else:
+                replacement = '\n' + replacement[:-1]
+        block.start, block.end = self._offsets[start_line], self._offsets[end_line]
+        block.replace = replacement
+
+    def _span(self, start_line: int, end_line: int) -> Tuple[int, int]:
+        """Character range of lines [start_line, end_line), without the last line break"""
+        return self._offsets[start_line], self._offsets[end_line - 1] + len(self.index.line(end_line - 1))
+
+    def _find_substring(self, search: str) -> List[Tuple[int, int]]:
+        """Character ranges of `search` where it is not made of whole lines (e.g. part of a line)"""
+        if not search.strip():
+            return []
+        spans = []
+        position = self.original.find(search)
+        while position != -1:
+            spans.append((position, position + len(search)))
+            position = self.original.find(search, position + 1)
+        return spans
+
+    def _choose(self, spans: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """The only match, or for repeated SEARCH text the only one after the previous block"""
+        if len(spans) == 1:
+            return spans[0]
+        after = [span for span in spans if span[0] >= self._previous_end]
+        return after[0] if len(after) == 1 else None
+
+    @staticmethod
+    def _reindent(search_lines: List[str], replace: str, original_line: str) -> str:
+        """Shift the REPLACE lines by the indentation difference between SEARCH and the original"""
+        first = next((line for line in search_lines if line.strip()), '')
+        search_indent = re.match(r'[ \t]*', first).group(0)
+        original_indent = re.match(r'[ \t]*', original_line).group(0)
+        if search_indent == original_indent:
+            return replace
+        lines = replace.split('\n')
+        for i, line in enumerate(lines):
+            if line.strip() and line.startswith(search_indent):
+                lines[i] = original_indent + line[len(search_indent):]
+        return '\n'.join(lines)
+
+    def apply(self) -> str:
+        """Apply all located blocks in one pass; blocks changing the lines of an earlier one are marked and skipped"""
+        result = []
+        cursor = 0
+        for block in sorted((b for b in self.blocks if b.located), key=lambda b: (b.start, b.number)):
+            if block.start < cursor:
+                block.status = OVERLAPPING
+                continue
+            result.append(self.original[cursor:block.start])
+            result.append(block.replace)
+            cursor = block.end
+        result.append(self.original[cursor:])
+        return ''.join(result)
+
+    def report(self, already_reported: Collection[int] = ()) -> None:
+        """Log blocks that could not be applied (except the numbers in `already_reported`) and a summary"""
+        for block in self.blocks:
+            if not block.located and block.number not in already_reported:
+                myLogger.warning(f"Block {block.number}: search text {block.status}: {block.search[:50]}...")
+        applied = sum(1 for b in self.blocks if b.located)
+        if applied < len(self.blocks):
+            myLogger.warning(f"Applied {applied} of {len(self.blocks)} search/replace blocks")
+        else:
+            myLogger.debug(f"Applied all {applied} search/replace blocks")
@@ -0,0 +1,18 @@
+# ---- Worker Threads ----
+# File: aicoder/utils/threads.py
+
+import asyncio
+import contextvars
+import functools
+from typing import Any, Callable
+
+
+async def run_in_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking call in the loop's default executor, like `asyncio.to_thread` (Python 3.9+).
+
+    The call runs in a copy of the current context, so tracing spans and ledger labels carry over.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(None, call)
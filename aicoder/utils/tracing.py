@@ -0,0 +1,157 @@
+# ---- Tracing Spans ----
+# File: aicoder/utils/tracing.py
+#
+# Minimal span tracing for finding where the time of a run goes. Spans nest through
+# a context variable (run_in_thread and copy_context() carry them into worker
+# threads) and are written as JSON lines in the shape of OTLP/JSON spans when a
+# trace file is configured (--trace-out / Config.TRACE_OUT). Without a trace file
+# every call is a cheap no-op.
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from ..config import Config
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("aicoder_span", default=None)
+_lock = threading.Lock()
+_output = None
+_output_path: Optional[Path] = None
+
+
+class Span:
+    """One timed operation; attributes can be added until it ends"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any], start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_otlp(self) -> dict:
+        """The span as an OTLP/JSON span object"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)}
+                           for key, value in self.attributes.items() if value is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoSpan:
+    """Stand-in yielded while tracing is off"""
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def enabled() -> bool:
+    return Config.TRACE_OUT is not None
+
+
+def _write(span: Span) -> None:
+    global _output, _output_path
+    line = json.dumps(span.to_otlp())
+    with _lock:
+        path = Path(Config.TRACE_OUT)
+        if _output is None or _output_path != path:
+            if _output is not None:
+                _output.close()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _output = open(path, "a", encoding="utf-8")
+            _output_path = path
+        _output.write(line + "\n")
+        _output.flush()
+
+
+def _finish(span: Span, end_ns: Optional[int] = None) -> None:
+    span.end_ns = end_ns if end_ns is not None else time.time_ns()
+    try:
+        _write(span)
+    except OSError:
+        pass  # tracing must never break a run
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Any]:
+    """
+    Time the enclosed block as a child of the current span.
+
+    Do not use around `yield` in generators: the current span would leak to the
+    consumer. Use record() for spans measured there.
+    """
+    if not enabled():
+        yield _NO_SPAN
+        return
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        _finish(current)
+
+
+def record(name: str, start_ns: int, end_ns: Optional[int] = None, error: Optional[str] = None, **attributes) -> None:
+    """Emit a span measured by the caller (time.time_ns() values) as a child of the current span"""
+    if not enabled():
+        return
+    finished = Span(name, _current.get(), attributes, start_ns=start_ns)
+    finished.error = error
+    _finish(finished, end_ns)
+
+
+def current_span() -> Any:
+    """The current span (a no-op stand-in while tracing is off), e.g. to add attributes"""
+    return (_current.get() or _NO_SPAN) if enabled() else _NO_SPAN
+
+
+def close() -> None:
+    """Close the trace file (called at exit)"""
+    global _output, _output_path
+    with _lock:
+        if _output is not None:
+            _output.close()
+        _output = _output_path = None
+
+
+atexit.register(close)
@@ -5,8 +5,26 @@ import subprocess
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 
+from .fast_compare import EQUAL, UNKNOWN, fast_compare
+from .worker_pool import COMPARE_SCRIPTS, ValidationWorkerError, get_worker_pool
+from ..config import Config
+from ..utils.logger import myLogger
+
 def validate_code_integrity(original: str, modified: str) -> bool:
-    """Verify that only comments were modified using the PHP comparator script"""
+    """Verify that only comments were modified (in-process if possible, else using the PHP comparator script)"""
+    if Config.VALIDATION_FAST_PATH:
+        verdict = fast_compare(original, modified, '.php')
+        if verdict != UNKNOWN:
+            return verdict == EQUAL
+
+    # Prefer the persistent worker: sources are sent inline, no temp files needed
+    pool = get_worker_pool('.php')
+    if pool is not None:
+        try:
+            return pool.compare_contents(original, modified)
+        except ValidationWorkerError as e:
+            myLogger.warning(f"Validation worker unavailable, falling back to one-shot comparison: {e}")
+
     # Create temp files for comparison
     with NamedTemporaryFile(mode='w+', suffix='.php', delete=False) as f1, \
          NamedTemporaryFile(mode='w+', suffix='.php', delete=False) as f2:
@@ -18,7 +36,7 @@ def validate_code_integrity(original: str, modified: str) -> bool:
 
         # Run the PHP comparator script
         result = subprocess.run(
-            ['php', 'compare-php-files/compare-php-files.php', f1.name, f2.name],
+            ['php', str(COMPARE_SCRIPTS['.php']), f1.name, f2.name],
             capture_output=True,
             text=True
         )
@@ -0,0 +1,226 @@
+# ---- Fast Comment-Only Comparison ----
+# File: aicoder/validation/fast_compare.py
+#
+# Pure-Python tokenizers for PHP and Twig that decide most validations without
+# the PHP comparator: if the token streams without comments and whitespace are
+# identical, only comments/whitespace changed (EQUAL); if the code tokens
+# differ in a way no formatting change can explain, the code changed (DIFFERENT).
+# Everything else (unusual syntax, formatting-only differences) is UNKNOWN and
+# left to the comparator scripts.
+
+import re
+from typing import List, Optional, Tuple
+
+EQUAL = "equal"
+DIFFERENT = "different"
+UNKNOWN = "unknown"
+
+Token = Tuple[str, str]  # (kind, text)
+
+# ---- PHP ----
+
+# Kinds compared when looking for a proven difference; punctuation, open/close
+# tags and whitespace separators can differ between equivalent sources
+_PHP_SIGNIFICANT = ('word', 'var', 'string', 'html')
+
+_PHP_TOKEN_RE = re.compile(r"""
+      (?P<ws>[ \t\r\n]+)
+    | (?P<close>\?>(?:\r?\n)?)
+    | (?P<line_comment>(?://|\#(?!\[))[^\r\n?]*(?:\?(?!>)[^\r\n?]*)*)
+    | (?P<block_comment>/\*.*?\*/)
+    | (?P<open_comment>/\*)
+    | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`\\]|\\.)*`)
+    | (?P<heredoc><<<[ \t]*(?P<quote>["']?)(?P<label>[A-Za-z_\x80-\uffff][\w\x80-\uffff]*)(?P=quote)\r?\n)
+    | (?P<var>\$[A-Za-z_\x80-\uffff][\w\x80-\uffff]*)
+    | (?P<word>[\\\w\x80-\uffff]+)
+    | (?P<punct>[^ \t\r\n])
+""", re.VERBOSE | re.DOTALL)
+
+_PHP_OPEN_TAG_RE = re.compile(r'<\?(?:php(?=[ \t\r\n]|$)|=)?', re.IGNORECASE)
+
+# Alternative spellings of casts that the parser treats as the same
+_PHP_CAST_ALIASES = {'integer': 'int', 'boolean': 'bool', 'double': 'float', 'real': 'float', 'binary': 'string'}
+
+
+def _interpolates_expressions(literal: str) -> bool:
+    # `{$a["k"]}` and `${...}` may contain quotes, which the string patterns do not track
+    return '{$' in literal or '${' in literal
+
+
+def php_tokens(code: str) -> Optional[List[Token]]:
+    """
+    Code tokens of a PHP source: comments dropped, whitespace reduced to a separator token.
+
+    Returns None for sources the tokenizer cannot handle with certainty (short open
+    tags, complex string interpolation, unterminated comments, __halt_compiler).
+    """
+    tokens: List[Token] = []
+    position, length = 0, len(code)
+
+    def separate():
+        if tokens and tokens[-1][0] != 'sep':
+            tokens.append(('sep', ' '))
+
+    while position < length:
+        # ---- inline HTML up to the next open tag ----
+        match = _PHP_OPEN_TAG_RE.search(code, position)
+        html_end = match.start() if match else length
+        if html_end > position:
+            tokens.append(('html', code[position:html_end]))
+        if not match:
+            break
+        if match.group(0) == '<?':
+            return None  # short open tag: depends on the short_open_tag setting
+        tokens.append(('tag', match.group(0).lower()))
+        position = match.end()
+
+        # ---- PHP code up to the close tag ----
+        while position < length:
+            match = _PHP_TOKEN_RE.match(code, position)
+            kind = match.lastgroup
+            text = match.group(0)
+            position = match.end()
+
+            if kind in ('ws', 'line_comment', 'block_comment'):
+                separate()
+            elif kind == 'open_comment':
+                return None
+            elif kind == 'close':
+                tokens.append(('tag', '?>' + ('\n' if text.endswith('\n') else '')))
+                break
+            elif kind == 'heredoc':
+                label = match.group('label')
+                closing = re.compile(r'^[ \t]*' + re.escape(label) + r'(?![\w\x80-\uffff])', re.MULTILINE)
+                end = closing.search(code, position)
+                if end is None:
+                    return None
+                literal = code[match.start():end.end()]
+                if match.group('quote') != "'" and _interpolates_expressions(literal):
+                    return None
+                tokens.append(('string', literal))
+                position = end.end()
+            elif kind == 'string':
+                if not text.startswith("'") and _interpolates_expressions(text):
+                    return None
+                tokens.append(('string', text))
+            elif kind == 'word' and text.lower() == '__halt_compiler':
+                return None
+            else:
+                tokens.append((kind, text))
+
+    return tokens
+
+
+def _php_significant(tokens: List[Token]) -> List[str]:
+    # keywords, names and casts are compared case-insensitively: the comparator's
+    # pretty printer normalizes some of them
+    result = []
+    for kind, text in tokens:
+        if kind not in _PHP_SIGNIFICANT:
+            continue
+        if kind == 'word':
+            if text[0].isdigit():
+                continue  # numbers are printed from their value (1_000 == 1000)
+            text = text.lower()
+            text = _PHP_CAST_ALIASES.get(text, text)
+        result.append(text)
+    return result
+
+
+def compare_php(original: str, modified: str) -> str:
+    """EQUAL, DIFFERENT or UNKNOWN for two PHP sources"""
+    tokens_original, tokens_modified = php_tokens(original), php_tokens(modified)
+    if tokens_original is None or tokens_modified is None:
+        return UNKNOWN
+    if tokens_original == tokens_modified:
+        return EQUAL
+    if _php_significant(tokens_original) != _php_significant(tokens_modified):
+        return DIFFERENT
+    return UNKNOWN
+
+
+# ---- Twig ----
+
+_TWIG_START_RE = re.compile(r'\{[#{%]|<!--')
+_TWIG_STRING = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*\""""
+_TWIG_TAG_RES = {
+    '{#': re.compile(r'\{#.*?#\}', re.DOTALL),
+    '<!': re.compile(r'<!--.*?-->', re.DOTALL),
+    '{{': re.compile(r'\{\{(?:[^\'"}]|' + _TWIG_STRING + r'|\}(?!\}))*\}\}', re.DOTALL),
+    '{%': re.compile(r'\{%(?:[^\'"%]|' + _TWIG_STRING + r'|%(?!\}))*%\}', re.DOTALL),
+}
+_TWIG_KINDS = {'{#': 'comment', '<!': 'html_comment', '{{': 'expression', '{%': 'statement'}
+# whitespace as matched by PCRE's \s in the comparator's normalization
+_TWIG_WHITESPACE_RE = re.compile(r'[ \t\n\r\f\v]+')
+
+
+def twig_tokens(code: str) -> Optional[List[Token]]:
+    """
+    Tokens of a Twig template: text, `{# #}` and `<!-- -->` comments, `{{ }}` expressions, `{% %}` statements.
+
+    Returns None where the comparator's comment removal (which ignores context) could
+    see the template differently, e.g. `{#` inside a string or an HTML comment.
+    """
+    tokens: List[Token] = []
+    position = 0
+    while position < len(code):
+        match = _TWIG_START_RE.search(code, position)
+        if not match:
+            tokens.append(('text', code[position:]))
+            break
+        if match.start() > position:
+            tokens.append(('text', code[position:match.start()]))
+
+        opener = match.group(0)[:2]
+        tag = _TWIG_TAG_RES[opener].match(code, match.start())
+        if tag is None:
+            return None  # unterminated tag or comment
+        text = tag.group(0)
+        kind = _TWIG_KINDS[opener]
+        if kind != 'comment' and '{#' in text:
+            return None
+        if kind in ('expression', 'statement') and '<!--' in text:
+            return None
+        tokens.append((kind, text))
+        position = tag.end()
+    return tokens
+
+
+def _twig_normalized(tokens: List[Token]) -> str:
+    # same normalization as TwigAstComparator::normalizeContent
+    text = ''.join(text for kind, text in tokens if kind not in ('comment', 'html_comment'))
+    return _TWIG_WHITESPACE_RE.sub(' ', text).strip()
+
+
+def _twig_tag_structure(tokens: List[Token]) -> List[str]:
+    structure = []
+    for kind, text in tokens:
+        if kind == 'expression':
+            structure.append('{{')
+        elif kind == 'statement':
+            words = text[2:-2].strip('-~ \t\r\n').split(None, 1)
+            structure.append(words[0] if words else '')
+    return structure
+
+
+def compare_twig(original: str, modified: str) -> str:
+    """EQUAL, DIFFERENT or UNKNOWN for two Twig templates"""
+    tokens_original, tokens_modified = twig_tokens(original), twig_tokens(modified)
+    if tokens_original is None or tokens_modified is None:
+        return UNKNOWN
+    if _twig_normalized(tokens_original) == _twig_normalized(tokens_modified):
+        return EQUAL
+    # a different sequence of tags gives the comparator different node types or counts
+    if _twig_tag_structure(tokens_original) != _twig_tag_structure(tokens_modified):
+        return DIFFERENT
+    # text-only differences: the comparator's AST comparison decides
+    return UNKNOWN
+
+
+def fast_compare(original: str, modified: str, file_extension: str) -> str:
+    """Decide in-process whether `modified` only changes comments/whitespace of `original`"""
+    if file_extension == '.php':
+        return compare_php(original, modified)
+    if file_extension in ('.twig', '.html.twig'):
+        return compare_twig(original, modified)
+    return UNKNOWN
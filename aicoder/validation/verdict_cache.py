@@ -0,0 +1,126 @@
+# ---- Validation Verdict Cache ----
+# File: aicoder/validation/verdict_cache.py
+#
+# Validation results keyed on (original hash, candidate hash), and normalized forms
+# of originals keyed on their content hash. Originals are normalized in the
+# background while the LLM request is in flight, so the comparator only has to
+# parse the candidate once the response arrives. When the verdict is found without
+# a worker (cache, fast path), the prefetch is cancelled or its result dropped.
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ..config import Config
+from ..utils.logger import myLogger
+from .worker_pool import get_worker_pool
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class _LruCache:
+    """Small thread-safe LRU mapping"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def remove(self, key, value=None):
+        """Remove `key` (only while it maps to `value`, if given); returns the removed value"""
+        with self._lock:
+            if key not in self._items or (value is not None and self._items[key] is not value):
+                return None
+            return self._items.pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_verdicts = _LruCache(Config.VALIDATION_CACHE_SIZE)
+_normalized = _LruCache(Config.VALIDATION_CACHE_SIZE)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_verdict(original: str, modified: str) -> Optional[bool]:
+    """Cached result of validating `modified` against `original`, None if unknown"""
+    return _verdicts.get((content_hash(original), content_hash(modified)))
+
+
+def put_verdict(original: str, modified: str, equal: bool) -> None:
+    _verdicts.put((content_hash(original), content_hash(modified)), equal)
+
+
+def _normalize(source: str, file_extension: str) -> Optional[str]:
+    try:
+        return get_worker_pool(file_extension).normalize(source)
+    except Exception as e:
+        myLogger.debug(f"Could not normalize original in the background: {e}")
+        return None
+
+
+def prefetch_normalized(original: str, file_extension: str) -> None:
+    """
+    Start normalizing `original` on a background thread (PHP only; no-op if already cached).
+
+    Called before the LLM request is sent; get_normalized picks up the result.
+    """
+    global _executor
+    if file_extension != '.php' or not Config.VALIDATION_CACHE_ENABLED or get_worker_pool(file_extension) is None:
+        return
+    key = content_hash(original)
+    with _executor_lock:
+        if _normalized.get(key) is not None:
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.VALIDATION_WORKERS, thread_name_prefix="aicoder-normalize")
+        future = _executor.submit(_normalize, original, file_extension)
+        _normalized.put(key, future)
+    # a failed normalization is forgotten, so the next validation of this original can try again
+    future.add_done_callback(lambda done: done.cancelled() or done.result() is not None
+                             or _normalized.remove(key, done))
+
+
+def cancel_prefetch(original: str) -> None:
+    """Drop the prefetched normalization of `original`, e.g. because no worker comparison is needed"""
+    future = _normalized.remove(content_hash(original))
+    if future is not None:
+        # only stops a normalization that is still queued; a running one finishes unused
+        future.cancel()
+
+
+def get_normalized(original: str) -> Optional[str]:
+    """Normalized form of `original` if it was prefetched (waits for a running normalization)"""
+    key = content_hash(original)
+    future = _normalized.get(key)
+    if future is None or future.cancelled():
+        return None
+    normalized = future.result()
+    if normalized is None:
+        _normalized.remove(key, future)  # failed: not kept for the next validation
+    return normalized
+
+
+def clear_validation_caches() -> None:
+    _verdicts.clear()
+    _normalized.clear()
@@ -0,0 +1,234 @@
+# ---- Validation Worker Pool ----
+# File: aicoder/validation/worker_pool.py
+
+import atexit
+import itertools
+import json
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from ..config import Config
+from ..utils.logger import myLogger
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Comparator scripts by file extension; both support `--worker` (JSON lines on stdin/stdout)
+COMPARE_SCRIPTS = {
+    '.php': PROJECT_ROOT / 'compare-php-files' / 'compare-php-files.php',
+    '.twig': PROJECT_ROOT / 'compare-twig-files' / 'compare-twig-files.php',
+}
+
+# A pair is either two file paths or an (original, modified) pair of source strings
+ComparisonPair = Union[Tuple[Path, Path], Dict[str, str]]
+
+
+class ValidationWorkerError(RuntimeError):
+    """Raised when a worker process dies or answers with something unexpected"""
+    pass
+
+
+class ValidationWorker:
+    """A single long-lived comparator process speaking the JSON-lines worker protocol"""
+
+    def __init__(self, command: List[str]):
+        self.command = command
+        self._ids = itertools.count(1)
+        myLogger.debug(f"Starting validation worker: {' '.join(command)}")
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def compare(self, pairs: Sequence[ComparisonPair]) -> List[bool]:
+        """Send one batch of pairs and wait for the verdicts, in the same order"""
+        results = self._round_trip(
+            "pairs", [pair if isinstance(pair, dict) else [str(pair[0]), str(pair[1])] for pair in pairs]
+        )
+        verdicts = []
+        for result in results:
+            if result.get("error"):
+                myLogger.debug(f"Validation worker reported: {result['error']}")
+            verdicts.append(bool(result.get("equal")))
+        return verdicts
+
+    def normalize(self, sources: Sequence[str]) -> List[Optional[str]]:
+        """Normalized form (comments and whitespace removed) of each source; None where it does not parse"""
+        results = self._round_trip("normalize", list(sources))
+        normalized = []
+        for result in results:
+            if result.get("error"):
+                myLogger.debug(f"Validation worker reported: {result['error']}")
+            normalized.append(result.get("normalized"))
+        return normalized
+
+    def _round_trip(self, operation: str, items: list) -> List[dict]:
+        request_id = next(self._ids)
+        request = {"id": request_id, operation: items}
+
+        # a stuck comparator is killed, which ends the pending readline() with EOF
+        timed_out = threading.Event()
+
+        def kill() -> None:
+            timed_out.set()
+            self.process.kill()
+
+        timer = threading.Timer(Config.VALIDATION_WORKER_TIMEOUT, kill)
+        timer.daemon = True
+        timer.start()
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise ValidationWorkerError(f"Validation worker died: {e}") from e
+        finally:
+            timer.cancel()
+
+        if timed_out.is_set():
+            raise ValidationWorkerError(f"Validation worker did not answer within {Config.VALIDATION_WORKER_TIMEOUT}s")
+        if not line:
+            raise ValidationWorkerError(f"Validation worker exited with code {self.process.poll()}")
+
+        try:
+            response = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValidationWorkerError(f"Invalid response from validation worker: {line.strip()[:200]}") from e
+
+        if response.get("id") != request_id or len(response.get("results", [])) != len(items):
+            raise ValidationWorkerError(f"Unexpected response from validation worker: {line.strip()[:200]}")
+        return response["results"]
+
+    def close(self) -> None:
+        if self.is_alive():
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except Exception:
+                self.process.kill()
+
+
+class ValidationWorkerPool:
+    """
+    Small pool of comparator workers for one script.
+
+    Workers are spawned lazily up to `size` and handed out one caller at a time,
+    so concurrent validations never interleave on a worker's stdin/stdout.
+    A worker that fails is discarded and replaced on the next request.
+    """
+
+    def __init__(self, command: List[str], size: int = Config.VALIDATION_WORKERS):
+        self.command = command
+        self.size = max(1, size)
+        self._idle: List[ValidationWorker] = []
+        self._spawned = 0
+        # notified whenever a worker is returned or discarded
+        self._available = threading.Condition()
+
+    def _acquire(self) -> ValidationWorker:
+        with self._available:
+            while not self._idle and self._spawned >= self.size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            # below `size`, e.g. after a worker was discarded: start a replacement
+            self._spawned += 1
+        try:
+            return ValidationWorker(self.command)
+        except OSError as e:
+            with self._available:
+                self._spawned -= 1
+                self._available.notify()
+            raise ValidationWorkerError(f"Could not start validation worker: {e}") from e
+
+    def _release(self, worker: ValidationWorker) -> None:
+        with self._available:
+            self._idle.append(worker)
+            self._available.notify()
+
+    def _discard(self, worker: ValidationWorker) -> None:
+        worker.close()
+        with self._available:
+            self._spawned -= 1
+            self._available.notify()
+
+    def _with_worker(self, call):
+        worker = self._acquire()
+        try:
+            result = call(worker)
+        except ValidationWorkerError:
+            self._discard(worker)
+            raise
+        except BaseException:
+            self._release(worker)
+            raise
+        self._release(worker)
+        return result
+
+    def compare_many(self, pairs: Sequence[ComparisonPair]) -> List[bool]:
+        """Validate a whole batch of pairs with a single worker round trip"""
+        if not pairs:
+            return []
+        return self._with_worker(lambda worker: worker.compare(pairs))
+
+    def normalize(self, source: str) -> Optional[str]:
+        """Normalized form of one source (PHP comparator only), None if it does not parse"""
+        return self._with_worker(lambda worker: worker.normalize([source]))[0]
+
+    def compare(self, original: Path, modified: Path) -> bool:
+        return self.compare_many([(original, modified)])[0]
+
+    def compare_contents(self, original: str, modified: str) -> bool:
+        return self.compare_many([{"original": original, "modified": modified}])[0]
+
+    def compare_normalized(self, normalized_original: str, modified: str) -> bool:
+        """Compare against an original normalized earlier, so only `modified` is parsed"""
+        return self.compare_many([{"normalized_original": normalized_original, "modified": modified}])[0]
+
+    def close(self) -> None:
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._spawned -= len(idle)
+        for worker in idle:
+            worker.close()
+
+
+_pools: Dict[str, ValidationWorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(file_extension: str) -> Optional[ValidationWorkerPool]:
+    """
+    Return the shared worker pool for a file extension ('.php' or '.twig').
+
+    Returns None if worker mode is disabled or the comparator script is missing.
+    """
+    if not Config.VALIDATION_WORKERS_ENABLED:
+        return None
+    compare_script = COMPARE_SCRIPTS.get(file_extension)
+    if compare_script is None or not compare_script.exists():
+        return None
+
+    with _pools_lock:
+        pool = _pools.get(file_extension)
+        if pool is None:
+            pool = ValidationWorkerPool(['php', str(compare_script), '--worker'])
+            _pools[file_extension] = pool
+        return pool
+
+
+@atexit.register
+def close_worker_pools() -> None:
+    """Shut down all worker processes (registered to run at interpreter exit)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,4 @@
+# ---- Benchmarks ----
+# File: benchmarks/__init__.py
+#
+# Offline benchmarks of the documentation pipeline: `python -m benchmarks --help`
@@ -0,0 +1,154 @@
+# ---- Benchmark Corpora ----
+# File: benchmarks/corpus.py
+#
+# Deterministic PHP and Twig sources of several sizes, and the responses a model
+# would give for them with each strategy (a docblock above every class, method,
+# block and macro that has none). Responses are derived from the code, so they
+# also exist for the chunks large files are split into.
+
+import json
+from typing import Dict, List
+
+from aicoder.core.structure import Symbol, find_symbols
+
+# lines per corpus file (approximate)
+SIZES = {"small": 100, "medium": 1500, "large": 12000}
+STRATEGIES = ["wholefile", "udiff", "searchreplace", "docblock"]
+
+
+def php_source(lines: int) -> str:
+    """A namespaced PHP file with classes of 8 methods, about `lines` lines long"""
+    out = ["<?php", "", "namespace Bench\\Generated;", "", "use RuntimeException;", ""]
+    class_number = 0
+    while len(out) < lines:
+        out += [f"class Service{class_number}", "{", f"    private array $items{class_number} = [];", ""]
+        for method in range(8):
+            name = f"handle{class_number}x{method}"
+            out += [
+                f"    public function {name}(array $input, int $limit = {method + 1}): array",
+                "    {",
+                "        $result = [];",
+                "        foreach ($input as $key => $value) {",
+                "            if (count($result) >= $limit) {",
+                "                break;",
+                "            }",
+                f"            $result[$key] = is_string($value) ? trim($value) : $value * {method + 2};",
+                "        }",
+                f"        if (empty($result)) {{ throw new RuntimeException('{name}: nothing to do'); }}",
+                "        return $result;",
+                "    }",
+                "",
+            ]
+        out[-1] = "}"
+        out.append("")
+        class_number += 1
+    return "\n".join(out) + "\n"
+
+
+def twig_source(lines: int) -> str:
+    """A Twig template with blocks and macros, about `lines` lines long"""
+    out = ["{% extends 'base.html.twig' %}", ""]
+    number = 0
+    while len(out) < lines:
+        out += [
+            f"{{% macro row{number}(item) %}}",
+            f"    <tr class=\"row-{number}\">",
+            "        <td>{{ item.name|e }}</td>",
+            "        <td>{{ item.price|number_format(2) }}</td>",
+            "    </tr>",
+            "{% endmacro %}",
+            "",
+            f"{{% block section{number} %}}",
+            f"    <section id=\"section-{number}\">",
+            "        {% for item in items if item.visible %}",
+            f"            {{{{ _self.row{number}(item) }}}}",
+            "        {% else %}",
+            "            <p>{{ 'No items'|trans }}</p>",
+            "        {% endfor %}",
+            "    </section>",
+            "{% endblock %}",
+            "",
+        ]
+        number += 1
+    return "\n".join(out) + "\n"
+
+
+def corpus() -> Dict[str, tuple]:
+    """name -> (file extension, source) for every language and size"""
+    files = {}
+    for size, lines in SIZES.items():
+        files[f"php-{size}"] = (".php", php_source(lines))
+        files[f"twig-{size}"] = (".twig", twig_source(lines))
+    return files
+
+
+# ---- synthesized model responses ----
+
+def _symbols(code: str, file_extension: str) -> List[Symbol]:
+    if file_extension == ".php" and "<?php" not in code:
+        # chunk of a larger file
+        symbols = find_symbols("<?php\n" + code, file_extension)
+        for symbol in symbols:
+            symbol.start_line -= 1
+            symbol.end_line -= 1
+            symbol.doc_start -= 1
+        return symbols
+    return find_symbols(code, file_extension)
+
+
+def _undocumented(code: str, file_extension: str) -> List[Symbol]:
+    lines = code.splitlines()
+    opener = "{#" if file_extension == ".twig" else "/**"
+    return [s for s in _symbols(code, file_extension)
+            if not any(lines[i].strip().startswith(opener) for i in range(s.doc_start, s.start_line))]
+
+
+def _docblock(symbol: Symbol, file_extension: str, indent: str) -> List[str]:
+    if file_extension == ".twig":
+        return [f"{indent}{{# {symbol.kind.capitalize()} {symbol.name}: renders its part of the page #}}"]
+    return [f"{indent}/**", f"{indent} * {symbol.kind.capitalize()} {symbol.name}: documented by the benchmark.", f"{indent} */"]
+
+
+def response_for(code: str, file_extension: str, strategy: str) -> str:
+    """The response a model would give for `code` with `strategy` (comment-only changes)"""
+    lines = code.splitlines()
+    symbols = _undocumented(code, file_extension)
+    fence = "twig" if file_extension == ".twig" else "php"
+
+    def indent_of(symbol):
+        line = lines[symbol.start_line]
+        return line[:len(line) - len(line.lstrip())]
+
+    if strategy == "wholefile":
+        out = list(lines)
+        for symbol in sorted(symbols, key=lambda s: s.start_line, reverse=True):
+            out[symbol.start_line:symbol.start_line] = _docblock(symbol, file_extension, indent_of(symbol))
+        return f"```{fence}\n" + "\n".join(out) + "\n```"
+
+    if strategy == "searchreplace":
+        blocks = []
+        for symbol in symbols:
+            declaration = lines[symbol.start_line]
+            replacement = "\n".join(_docblock(symbol, file_extension, indent_of(symbol)) + [declaration])
+            blocks.append(f"<<<<<<< SEARCH\n{declaration}\n=======\n{replacement}\n>>>>>>> REPLACE")
+        return f"```{fence}\n" + "\n\n".join(blocks) + "\n```"
+
+    if strategy == "udiff":
+        hunks = []
+        for symbol in symbols:
+            added = "".join(f"+{line}\n" for line in _docblock(symbol, file_extension, indent_of(symbol)))
+            context = "".join(f" {line}\n" for line in lines[symbol.start_line:symbol.start_line + 2])
+            hunks.append(f"@@ ... @@\n{added}{context}")
+        return "```diff\n--- a/file\n+++ b/file\n" + "".join(hunks) + "```"
+
+    if strategy == "docblock":
+        entries = [{
+            "symbol": f"{s.parent}::{s.name}" if s.parent else s.name,
+            "kind": s.kind,
+            "docblock": "\n".join(line.strip() if i == 0 else line.strip() and " " + line.strip()
+                                  for i, line in enumerate(_docblock(s, file_extension, ""))),
+            "section_comments": [],
+        } for s in symbols]
+        return json.dumps({"entries": entries})
+
+    raise ValueError(f"Unknown strategy: {strategy}")
@@ -0,0 +1,58 @@
+# ---- Fake LLM Provider ----
+# File: benchmarks/fake_provider.py
+#
+# Provider for the model prefix "fake" (e.g. "fake/udiff"): answers with the
+# response corpus.response_for gives for the code in the prompt, using the strategy
+# named by the model. Responses are recorded on first use and replayed afterwards,
+# so timed runs measure the pipeline and not the response synthesis.
+
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+
+from aicoder.llm import api_client
+from aicoder.llm.providers.base import LLMProvider
+
+from .corpus import response_for
+
+# code marker in the user prompt -> file extension
+_CODE_MARKERS = {"\n\nPHP_CODE:\n": ".php", "\n\nTWIG_CODE:\n": ".twig"}
+
+
+class FakeProvider(LLMProvider):
+    """Offline provider replaying synthesized responses; `latency` seconds are added per request"""
+
+    latency = 0.0
+    recordings: Dict[str, str] = {}
+    _lock = threading.Lock()
+
+    def get_api_credentials(self, api_key: Optional[str]) -> tuple:
+        return None, None
+
+    def create_completion(self, model: str, messages: list, verbose: bool = False,
+                          response_format: Optional[dict] = None) -> str:
+        user_prompt = messages[-1]["content"]
+        key = hashlib.sha256(f"{model}\0{user_prompt}".encode('utf-8')).hexdigest()
+        with self._lock:
+            response = self.recordings.get(key)
+        if response is None:
+            response = self._respond(model, user_prompt)
+            with self._lock:
+                self.recordings[key] = response
+        if self.latency:
+            time.sleep(self.latency)
+        return response
+
+    @staticmethod
+    def _respond(strategy: str, user_prompt: str) -> str:
+        for marker, file_extension in _CODE_MARKERS.items():
+            before, found, code = user_prompt.rpartition(marker)
+            if found:
+                return response_for(code[:-1] if code.endswith("\n") else code, file_extension, strategy)
+        raise ValueError("No PHP_CODE or TWIG_CODE in the prompt")
+
+
+def register() -> None:
+    """Make "fake/<strategy>" models resolve to the FakeProvider"""
+    api_client.PROVIDERS["fake"] = FakeProvider
@@ -0,0 +1,245 @@
+# ---- Benchmark Runner ----
+# File: benchmarks/run.py
+#
+# Times the stages of the documentation pipeline on the generated corpora without
+# network access: prompt building, strategy parsing, each patcher version,
+# validation and the final write, then the whole pipeline against the fake
+# provider (files/min). Results are written as JSON and can be compared with a
+# baseline run to catch regressions.
+#
+#   python -m benchmarks --output bench.json
+#   python -m benchmarks --baseline bench.json --max-regression 0.25
+
+import contextlib
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import typer
+
+from aicoder.config import Config
+from aicoder.core.processor import _build_prompts, _validate_code, improve_file_documentation
+from aicoder.strategies import create_strategy
+from aicoder.utils.patcher import MyPatcher
+from aicoder.utils.patcher_v2 import UnifiedDiffPatcher
+from aicoder.utils.patcher_v3 import PatcherV3
+from aicoder.utils.patcher_v4 import PatcherV4
+
+from . import fake_provider
+from .corpus import SIZES, STRATEGIES, corpus, response_for
+
+# regressions smaller than this are timer noise
+MIN_REGRESSION_MS = 1.0
+# the old patchers search the whole text per hunk; above this many lines they take minutes
+LEGACY_PATCHER_MAX_LINES = 2000
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Swallow what the pipeline prints (the logger's rich console writes to sys.stdout)"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def _time(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with _quiet():
+            function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def _diff_body(response: str) -> str:
+    """The diff inside the ```diff fence of a udiff response"""
+    return response.split("\n", 1)[1].rsplit("```", 1)[0]
+
+
+def _apply_hunkwise(patcher: UnifiedDiffPatcher, source: str, diff: str) -> str:
+    # UnifiedDiffPatcher treats its input as a single hunk
+    for hunk in diff.split("@@ ... @@\n")[1:]:
+        source = patcher.apply_patch(source, hunk)
+    return source
+
+
+def bench_stages(name: str, file_extension: str, source: str, workdir: Path, repeat: int) -> Dict[str, dict]:
+    """Per-stage timings for one corpus file"""
+    results = {}
+    path = workdir / f"{name}{file_extension}"
+    path.write_text(source)
+
+    results["prompt.build"] = _time(lambda: _build_prompts(source, file_extension, create_strategy("udiff")), repeat)
+
+    modified_paths = {}
+    for strategy_name in STRATEGIES:
+        strategy = create_strategy(strategy_name)
+        response = response_for(source, file_extension, strategy_name)
+
+        def parse():
+            modified_paths[strategy_name] = strategy.process_llm_response(response, path)
+
+        results[f"strategy.{strategy_name}"] = _time(parse, repeat)
+
+    diff = _diff_body(response_for(source, file_extension, "udiff"))
+    patchers = {
+        "patcher.v1": lambda: MyPatcher(verbose=False).apply_patch(source, diff),
+        "patcher.v2": lambda: _apply_hunkwise(UnifiedDiffPatcher(), source, diff),
+        "patcher.v3": lambda: PatcherV3(continue_on_error=True).apply_patch(source, diff),
+        "patcher.v4": lambda: PatcherV4(continue_on_error=True).apply_patch(source, diff),
+    }
+    for stage, apply in patchers.items():
+        if stage != "patcher.v4" and source.count("\n") > LEGACY_PATCHER_MAX_LINES:
+            continue
+        results[stage] = _time(apply, repeat)
+
+    modified = modified_paths["wholefile"]
+    results["validate"] = _time(lambda: _validate_code(path, modified), repeat)
+
+    target = workdir / f"{name}.written{file_extension}"
+    target.write_text(source)
+
+    def write():
+        shutil.copystat(target, modified)
+        shutil.copy2(modified, target)
+
+    results["write"] = _time(write, repeat)
+    for modified_path in modified_paths.values():
+        if modified_path is not None:
+            modified_path.unlink(missing_ok=True)
+    return results
+
+
+def bench_end_to_end(files: Dict[str, tuple], workdir: Path, repeat: int) -> Dict[str, dict]:
+    """improve_file_documentation over all corpus files per strategy, with the fake provider"""
+    results = {}
+    for strategy_name in STRATEGIES:
+        strategy = create_strategy(strategy_name)
+        model = f"fake/{strategy_name}"
+        timings = []
+        failures = 0
+        # the first round records the fake responses and is not timed
+        for round_number in range(repeat + 1):
+            paths = []
+            for name, (file_extension, source) in files.items():
+                path = workdir / f"e2e-{name}{file_extension}"
+                path.write_text(source)
+                paths.append(path)
+            start = time.perf_counter()
+            for path in paths:
+                try:
+                    with _quiet():
+                        improve_file_documentation(path, model, strategy)
+                except Exception:
+                    failures += 1
+            if round_number:
+                timings.append((time.perf_counter() - start) * 1000 / len(paths))
+        per_file = statistics.median(timings)
+        results[f"e2e.{strategy_name}"] = {
+            "median_ms": round(per_file, 3),
+            "min_ms": round(min(timings), 3),
+            "files_per_min": round(60000 / per_file, 1),
+            "failures": failures,
+        }
+    return results
+
+
+def run_benchmarks(sizes: List[str], repeat: int, latency: float = 0.0) -> dict:
+    """Run all benchmarks; `latency` is added to every fake LLM response (seconds)"""
+    fake_provider.register()
+    fake_provider.FakeProvider.latency = latency
+    files = {name: item for name, item in corpus().items() if name.split("-", 1)[1] in sizes}
+
+    saved = {key: getattr(Config, key) for key in ("LLM_CACHE_ENABLED", "VALIDATION_CACHE_ENABLED", "LLM_STREAMING")}
+    # measure the work itself: no cached responses or verdicts
+    Config.LLM_CACHE_ENABLED = False
+    Config.VALIDATION_CACHE_ENABLED = False
+    Config.LLM_STREAMING = False
+    try:
+        with tempfile.TemporaryDirectory(prefix="aicoder-bench-") as tmp:
+            workdir = Path(tmp)
+            results = {}
+            for name, (file_extension, source) in files.items():
+                for stage, timing in bench_stages(name, file_extension, source, workdir, repeat).items():
+                    results[f"{name}/{stage}"] = timing
+            for stage, timing in bench_end_to_end(files, workdir, repeat).items():
+                results[f"all/{stage}"] = timing
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+
+    return {
+        "meta": {
+            "version": Config.APP_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeat": repeat,
+            "latency": latency,
+            "lines": {name: source.count("\n") for name, (_, source) in files.items()},
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Stages whose median got slower than the baseline by more than `max_regression` (fraction)"""
+    regressions = []
+    for key, timing in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if before is None:
+            continue
+        now, then = timing["median_ms"], before["median_ms"]
+        if now - then > MIN_REGRESSION_MS and now > then * (1 + max_regression):
+            regressions.append(f"{key}: {then:.2f} ms -> {now:.2f} ms (+{(now / then - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(
+    sizes: str = typer.Option(",".join(SIZES), "--sizes", help="Comma separated corpus sizes: " + ", ".join(SIZES)),
+    repeat: int = typer.Option(5, "--repeat", "-n", help="Timed runs per stage (median and minimum are reported)"),
+    latency: float = typer.Option(0.0, "--latency", help="Simulated LLM latency per request in seconds"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Write the results as JSON to this file"),
+    baseline: Optional[Path] = typer.Option(None, "--baseline", help="Compare with the JSON results of an earlier run"),
+    max_regression: float = typer.Option(0.25, "--max-regression", help="Allowed slowdown against the baseline (0.25 = 25%)"),
+):
+    """Benchmark the documentation pipeline offline"""
+    selected = [size.strip() for size in sizes.split(",") if size.strip()]
+    unknown = [size for size in selected if size not in SIZES]
+    if unknown:
+        raise typer.BadParameter(f"Unknown size(s): {', '.join(unknown)}", param_hint="--sizes")
+
+    report = run_benchmarks(selected, repeat, latency)
+    text = json.dumps(report, indent=2)
+    if output:
+        output.write_text(text + "\n")
+    else:
+        typer.echo(text)
+
+    for key, timing in report["results"].items():
+        extra = f"  {timing['files_per_min']:.1f} files/min" if "files_per_min" in timing else ""
+        typer.echo(f"{key:40} {timing['median_ms']:10.2f} ms{extra}", err=True)
+
+    if baseline:
+        regressions = compare_with_baseline(report, json.loads(baseline.read_text()), max_regression)
+        if regressions:
+            typer.echo("Regressions against the baseline:", err=True)
+            for regression in regressions:
+                typer.echo(f"  {regression}", err=True)
+            raise typer.Exit(code=1)
+        typer.echo("No regressions against the baseline", err=True)
+
+
+def cli():
+    typer.run(main)
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -6,15 +6,15 @@ use App\PhpCleaner;
 
 
 /**
- * TODO: rename this method to something more descriptive
+ * Compare two PHP sources, ignoring comments and whitespace.
+ *
+ * The cleaner is passed in so the worker mode can reuse one parser for all comparisons.
  */
-function main(string $file1, string $file2, bool $debug): bool
+function compareCode(PhpCleaner $cleaner, string $source1, string $source2, bool $debug, string $label1 = 'File 1', string $label2 = 'File 2'): bool
 {
-    $cleaner = new PhpCleaner();
-
     try {
-        $code1 = $cleaner->removeCommentsAndWhitespace(file_get_contents($file1));
-        $code2 = $cleaner->removeCommentsAndWhitespace(file_get_contents($file2));
+        $code1 = $cleaner->removeCommentsAndWhitespace($source1);
+        $code2 = $cleaner->removeCommentsAndWhitespace($source2);
     } catch( \PhpParser\Error $e) {
 
        if ($debug) {
@@ -25,9 +25,9 @@ function main(string $file1, string $file2, bool $debug): bool
     $equal = $code1 === $code2;
 
     if ($debug && !$equal) {
-        echo "=== File 1 ($file1) ===\n";
+        echo "=== $label1 ===\n";
         echo $code1 . "\n\n";
-        echo "=== File 2 ($file2) ===\n";
+        echo "=== $label2 ===\n";
         echo $code2 . "\n\n";
 
         // Show diff using similar_text
@@ -41,10 +41,91 @@ function main(string $file1, string $file2, bool $debug): bool
     return $equal;
 }
 
+/**
+ * TODO: rename this method to something more descriptive
+ */
+function main(string $file1, string $file2, bool $debug): bool
+{
+    $cleaner = new PhpCleaner();
+
+    return compareCode($cleaner, file_get_contents($file1), file_get_contents($file2), $debug, "File 1 ($file1)", "File 2 ($file2)");
+}
+
+/**
+ * Worker mode: read JSON-line requests from stdin and answer each with one JSON line on stdout.
+ *
+ * Request:  {"id": 1, "pairs": [["a.php", "b.php"], {"original": "<?php ...", "modified": "<?php ..."}]}
+ * Response: {"id": 1, "results": [{"equal": true}, {"equal": false, "error": "..."}]}
+ *
+ * An original normalized earlier can be passed instead of its source, so only the
+ * modified side is parsed: {"normalized_original": "...", "modified": "<?php ..."}.
+ *
+ * Normalize request:  {"id": 2, "normalize": ["<?php ...", ...]}
+ * Normalize response: {"id": 2, "results": [{"normalized": "..."}, {"error": "..."}]}
+ *
+ * The parser is built once and reused for every pair of every request.
+ */
+function runWorker(): void
+{
+    $cleaner = new PhpCleaner();
+
+    while (($line = fgets(STDIN)) !== false) {
+        $line = trim($line);
+        if ($line === '') {
+            continue;
+        }
+
+        $request = json_decode($line, true);
+        if (!is_array($request)) {
+            echo json_encode(['id' => null, 'error' => 'Invalid JSON request']) . "\n";
+            continue;
+        }
+
+        $results = [];
+        foreach ($request['normalize'] ?? [] as $source) {
+            try {
+                $results[] = ['normalized' => $cleaner->removeCommentsAndWhitespace($source)];
+            } catch (\Throwable $e) {
+                $results[] = ['error' => $e->getMessage()];
+            }
+        }
+        foreach ($request['pairs'] ?? [] as $pair) {
+            try {
+                if (isset($pair['normalized_original'])) {
+                    $results[] = ['equal' => $pair['normalized_original'] === $cleaner->removeCommentsAndWhitespace($pair['modified'])];
+                    continue;
+                }
+                if (isset($pair['original'])) {
+                    $source1 = $pair['original'];
+                    $source2 = $pair['modified'];
+                } else {
+                    [$file1, $file2] = $pair;
+                    if (!is_file($file1) || !is_file($file2)) {
+                        throw new \InvalidArgumentException("One or both files do not exist.");
+                    }
+                    $source1 = file_get_contents($file1);
+                    $source2 = file_get_contents($file2);
+                }
+                $results[] = ['equal' => compareCode($cleaner, $source1, $source2, false)];
+            } catch (\Throwable $e) {
+                $results[] = ['equal' => false, 'error' => $e->getMessage()];
+            }
+        }
+
+        echo json_encode(['id' => $request['id'] ?? null, 'results' => $results]) . "\n";
+        fflush(STDOUT);
+    }
+}
+
 // Parse command line arguments
-$options = getopt('', ['debug']);
+$options = getopt('', ['debug', 'worker']);
 $debug = isset($options['debug']);
 
+if (isset($options['worker'])) {
+    runWorker();
+    exit(0);
+}
+
 // Remove the processed options from argv
 $nonOptionArgv = array_values(array_filter($argv, function ($arg) {
     return !str_starts_with($arg, '--');
@@ -52,6 +133,7 @@ $nonOptionArgv = array_values(array_filter($argv, function ($arg) {
 
 if (count($nonOptionArgv) !== 3) {
     echo "Usage: php compare-php-files.php [--debug] <file1> <file2>\n";
+    echo "       php compare-php-files.php --worker   (JSON lines on stdin/stdout)\n";
     exit(1);
 }
 
@@ -60,4 +142,3 @@ $file2 = $nonOptionArgv[2];
 
 echo main($file1, $file2, $debug) ? 'true' : 'false';
 echo "\n";
-
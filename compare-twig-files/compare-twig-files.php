@@ -5,16 +5,63 @@ require_once __DIR__ . '/vendor/autoload.php';
 
 use Aicoder\TwigAstComparator\TwigAstComparator;
 
+/**
+ * Worker mode: read JSON-line requests from stdin and answer each with one JSON line on stdout.
+ *
+ * Request:  {"id": 1, "pairs": [["a.twig", "b.twig"], {"original": "...", "modified": "..."}]}
+ * Response: {"id": 1, "results": [{"equal": true}, {"equal": false, "error": "..."}]}
+ *
+ * The Twig environment is built once and reused for every pair of every request.
+ */
+function runWorker(TwigAstComparator $comparator): void
+{
+    while (($line = fgets(STDIN)) !== false) {
+        $line = trim($line);
+        if ($line === '') {
+            continue;
+        }
+
+        $request = json_decode($line, true);
+        if (!is_array($request)) {
+            echo json_encode(['id' => null, 'error' => 'Invalid JSON request']) . "\n";
+            continue;
+        }
+
+        $results = [];
+        foreach ($request['pairs'] ?? [] as $pair) {
+            try {
+                if (isset($pair['original'])) {
+                    $equal = $comparator->compareContents($pair['original'], $pair['modified']);
+                } else {
+                    $equal = $comparator->compareFiles($pair[0], $pair[1]);
+                }
+                $results[] = ['equal' => $equal];
+            } catch (\Throwable $e) {
+                $results[] = ['equal' => false, 'error' => $e->getMessage()];
+            }
+        }
+
+        echo json_encode(['id' => $request['id'] ?? null, 'results' => $results]) . "\n";
+        fflush(STDOUT);
+    }
+}
+
+$comparator = new TwigAstComparator();
+
+if ($argc === 2 && $argv[1] === '--worker') {
+    runWorker($comparator);
+    exit(0);
+}
+
 if ($argc !== 3) {
     echo "Usage: php compare-twig-files.php <file1.twig> <file2.twig>\n";
+    echo "       php compare-twig-files.php --worker   (JSON lines on stdin/stdout)\n";
     exit(1);
 }
 
 $file1 = $argv[1];
 $file2 = $argv[2];
 
-$comparator = new TwigAstComparator();
-
 try {
     if ($comparator->compareFiles($file1, $file2)) {
         echo "true";
@@ -26,4 +73,4 @@ try {
 } catch (Exception $e) {
     echo "Error: " . $e->getMessage() . "\n";
     exit(1);
-}
\ No newline at end of file
+}
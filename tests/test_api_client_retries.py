@@ -1,5 +1,6 @@
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import time
 
 from aicoder.llm.api_client import LLMClient
@@ -155,5 +156,57 @@ class TestLLMClientRetries(unittest.TestCase):
         self.assertEqual(calculated_delays, expected_delays)
 
 
+class TestLLMClientAsync(unittest.TestCase):
+    """Test cases for the async LLM client."""
+
+    def setUp(self):
+        self.original_retry_count = Config.LLM_RETRY_COUNT
+        Config.LLM_RETRY_COUNT = 3
+
+    def tearDown(self):
+        Config.LLM_RETRY_COUNT = self.original_retry_count
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    @patch('aicoder.llm.api_client.asyncio.sleep', new_callable=AsyncMock)
+    @patch('aicoder.llm.api_client.time.sleep')
+    def test_async_retry_awaits_instead_of_sleeping(self, mock_time_sleep, mock_async_sleep, mock_adapter_class):
+        mock_adapter = MagicMock()
+        mock_adapter_class.return_value = mock_adapter
+        rate_limit_error = RequestsHTTPError("429 Too Many Requests")
+        rate_limit_error.response = MagicMock(status_code=429)
+        mock_adapter.acreate_completion = AsyncMock(side_effect=[rate_limit_error, "success response"])
+
+        client = LLMClient("openai/test-model")
+        result = asyncio.run(client.asendRequest("system prompt", "user prompt"))
+
+        self.assertEqual(result, "success response")
+        mock_async_sleep.assert_awaited_once()
+        mock_time_sleep.assert_not_called()
+        mock_adapter.create_completion.assert_not_called()
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    def test_many_requests_share_one_event_loop(self, mock_adapter_class):
+        mock_adapter = MagicMock()
+        mock_adapter_class.return_value = mock_adapter
+        in_flight = []
+
+        async def fake_completion(model, messages, verbose):
+            in_flight.append(1)
+            await asyncio.sleep(0.01)
+            peak = len(in_flight)
+            in_flight.pop()
+            return f"{messages[1]['content']}:{peak}"
+
+        mock_adapter.acreate_completion = fake_completion
+        client = LLMClient("openai/test-model")
+
+        async def run():
+            return await asyncio.gather(*(client.asendRequest("s", f"u{i}") for i in range(50)))
+
+        results = asyncio.run(run())
+        self.assertEqual([r.split(':')[0] for r in results], [f"u{i}" for i in range(50)])
+        self.assertGreater(max(int(r.split(':')[1]) for r in results), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
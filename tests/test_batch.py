@@ -0,0 +1,80 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aicoder.core.batch import collect_files, run_batch
+
+
+class TestCollectFiles(unittest.TestCase):
+    """Test cases for expanding CLI arguments into files."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for rel in ["a.php", "sub/b.php", "sub/c.html.twig", "sub/notes.txt", "vendor/lib.php"]:
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("<?php\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_directory_is_walked_for_supported_files(self):
+        files = collect_files([str(self.root)])
+        names = [f.relative_to(self.root).as_posix() for f in files]
+        self.assertEqual(names, ["a.php", "sub/b.php", "sub/c.html.twig"])
+
+    def test_glob_and_duplicates(self):
+        files = collect_files([str(self.root / "**" / "*.php"), str(self.root / "a.php")])
+        names = [f.relative_to(self.root).as_posix() for f in files]
+        self.assertEqual(names, ["a.php", "sub/b.php"])
+        # explicitly named files are kept even in excluded directories
+        self.assertEqual(collect_files([str(self.root / "vendor" / "lib.php")]), [self.root / "vendor" / "lib.php"])
+
+    def test_unmatched_pattern_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            collect_files([str(self.root / "*.missing")])
+
+
+class TestRunBatch(unittest.TestCase):
+    """Test cases for the concurrent batch pipeline."""
+
+    def test_concurrency_limit_and_failures_are_reported(self):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def fake_improve(path, model, strategy, chain=None, regions=None):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            if path.name == "bad.php":
+                raise RuntimeError("validation failed")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            files = [Path(tmp) / f"f{i}.php" for i in range(6)] + [Path(tmp) / "bad.php"]
+            for path in files:
+                path.write_text("<?php\n")
+            reported = []
+            with patch("aicoder.core.batch.improve_file_documentation", side_effect=fake_improve):
+                results = asyncio.run(run_batch(files, "model", "wholefile", jobs=3, on_result=reported.append))
+
+        self.assertEqual(len(results), 7)
+        self.assertEqual(reported, results)
+        self.assertLessEqual(peak, 3)
+        self.assertGreater(peak, 1)
+        failed = [r for r in results if not r.success]
+        self.assertEqual([r.path.name for r in failed], ["bad.php"])
+        self.assertIn("validation failed", failed[0].error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from aicoder.llm.api_client import resolve_provider
+from benchmarks import fake_provider
+from benchmarks.corpus import php_source
+from benchmarks.run import compare_with_baseline
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for the fake provider and the baseline comparison of the benchmarks."""
+
+    def test_fake_models_resolve_to_fake_provider(self):
+        fake_provider.register()
+        self.assertEqual(resolve_provider("fake/udiff"), (fake_provider.FakeProvider, "fake", "udiff"))
+
+    def test_fake_provider_replays_recorded_response(self):
+        code = php_source(20)
+        messages = [{"role": "user", "content": f"Document this.\n\nPHP_CODE:\n{code}\n"}]
+        provider = fake_provider.FakeProvider()
+        first = provider.create_completion("searchreplace", messages)
+        self.assertIn("<<<<<<< SEARCH\nclass Service0\n", first)
+        self.assertIs(provider.create_completion("searchreplace", messages), first)
+
+    def test_baseline_comparison_ignores_noise(self):
+        baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 0.1}, "c": {"median_ms": 10.0}}}
+        current = {"results": {"a": {"median_ms": 14.0}, "b": {"median_ms": 0.5}, "c": {"median_ms": 11.0}}}
+        regressions = compare_with_baseline(current, baseline, max_regression=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("a: "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from aicoder.config import Config
+from aicoder.core.chain import ChainEntry, FallbackChain, learned_hedge_delay, run_chain
+from aicoder.core.processor import _produce_documented_code
+from aicoder.llm import ledger
+from aicoder.llm.api_client import LLMClient, RequestCancelled
+from aicoder.profiles import ProfileType, profile_loader
+
+PRIMARY = ChainEntry("openai/slow", "wholefile")
+FALLBACK = ChainEntry("openai/fast", "searchreplace")
+
+
+class TestFallbackChain(unittest.TestCase):
+    """Test cases for fallback chains and hedged requests."""
+
+    def setUp(self):
+        for patcher in (patch.object(Config, "LLM_RATE_LIMIT_ENABLED", False),
+                        patch.object(Config, "LLM_CACHE_ENABLED", False),
+                        patch.object(Config, "LEDGER_ENABLED", False),
+                        patch('aicoder.llm.api_client.OpenAIApiAdapter')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_falls_back_in_order_after_failures(self):
+        started = []
+
+        def produce(entry, client):
+            started.append(entry)
+            if entry == PRIMARY:
+                raise RuntimeError("primary failed")
+            return entry.model
+
+        winner, result = run_chain([PRIMARY, FALLBACK], produce, discard=lambda result: None)
+        self.assertEqual((winner, result), (FALLBACK, "openai/fast"))
+        self.assertEqual(started, [PRIMARY, FALLBACK])
+
+    def test_last_error_is_raised_when_every_entry_fails(self):
+        def produce(entry, client):
+            raise ValueError(entry.model)
+
+        with self.assertRaisesRegex(ValueError, "openai/fast"):
+            run_chain([PRIMARY, FALLBACK], produce, discard=lambda result: None)
+
+    def test_entry_whose_client_cannot_be_created_falls_back(self):
+        def make_client(modelWithPrefix, **kwargs):
+            if modelWithPrefix == PRIMARY.model:
+                raise ValueError("API key is required")
+            return LLMClient(modelWithPrefix=modelWithPrefix, **kwargs)
+
+        with patch('aicoder.core.chain.LLMClient', side_effect=make_client):
+            winner, result = run_chain([PRIMARY, FALLBACK], lambda entry, client: entry.model,
+                                       discard=lambda result: None)
+        self.assertEqual((winner, result), (FALLBACK, "openai/fast"))
+
+    def test_stalled_request_is_hedged_and_cancelled(self):
+        discarded = []
+        primary_cancelled = threading.Event()
+
+        def produce(entry, client):
+            if entry == PRIMARY:
+                # a stalled request that only returns once it is given up
+                client.cancelled.wait(5)
+                primary_cancelled.set()
+                return "late result"
+            return "hedged result"
+
+        start = time.monotonic()
+        winner, result = run_chain([PRIMARY, FALLBACK], produce, discarded.append, hedge_delay=lambda model: 0.05)
+        self.assertEqual((winner, result), (FALLBACK, "hedged result"))
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertTrue(primary_cancelled.wait(2))
+        for _ in range(100):
+            if discarded:
+                break
+            time.sleep(0.01)
+        self.assertEqual(discarded, ["late result"])
+
+    def test_no_hedge_once_the_first_token_arrived(self):
+        started = []
+
+        def produce(entry, client):
+            started.append(entry)
+            client.firstToken.set()
+            time.sleep(0.2)
+            return entry.model
+
+        winner, _ = run_chain([PRIMARY, FALLBACK], produce, discard=lambda result: None, hedge_delay=lambda model: 0.05)
+        self.assertEqual(winner, PRIMARY)
+        self.assertEqual(started, [PRIMARY])
+
+    def test_cancelled_stream_stops_at_next_piece(self):
+        client = LLMClient("openai/test-model")
+        client.provider.stream_completion.return_value = iter(["one", "two", "three"])
+
+        stream = client.streamRequest("system", "user", verbose=False)
+        self.assertEqual(next(stream), "one")
+        self.assertTrue(client.firstToken.is_set())
+        client.cancel()
+        with self.assertRaises(RequestCancelled):
+            next(stream)
+
+    @patch('aicoder.core.processor._validate_code')
+    @patch('aicoder.core.processor._request_and_apply')
+    def test_response_arriving_after_cancel_is_not_validated(self, mock_request, mock_validate):
+        client = LLMClient("openai/test-model")
+        with tempfile.TemporaryDirectory() as tmp:
+            original, response = Path(tmp) / "a.php", Path(tmp) / "response.php"
+            original.write_text("<?php\n")
+            response.write_text("<?php\n// documented\n")
+
+            def in_flight_request(*args):
+                client.cancel()  # the hedge won while this non-streamed request was waiting
+                return "raw", response
+
+            mock_request.side_effect = in_flight_request
+            with self.assertRaises(RequestCancelled):
+                _produce_documented_code(original, "<?php\n", client, MagicMock(), time.time())
+            mock_validate.assert_not_called()
+            self.assertFalse(response.exists())
+
+    def test_p95_delay_is_learned_from_the_ledger(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(Config, "LEDGER_ENABLED", True), \
+                patch.object(Config, "LEDGER_PATH", Path(tmp) / "ledger.sqlite"), \
+                patch.object(Config, "LLM_STREAMING", True), \
+                patch.object(Config, "HEDGE_MIN_SAMPLES", 5), \
+                patch.object(ledger, "_ledger", None):
+            chain = FallbackChain([FALLBACK], hedge_after="p95")
+            self.assertIsNone(learned_hedge_delay("openai/slow"))
+            self.assertEqual(chain.hedge_delay("openai/slow"), Config.HEDGE_DEFAULT_DELAY)
+
+            for seconds in range(1, 21):
+                ledger.get_ledger().record(started_at=time.time(), model="openai/slow", outcome="success",
+                                           latency=seconds * 2.0, ttft=float(seconds))
+            self.assertEqual(learned_hedge_delay("openai/slow"), 19.0)
+            self.assertEqual(FallbackChain([FALLBACK], hedge_after=7).hedge_delay("openai/slow"), 7.0)
+
+    def test_profile_chain_resolves_profiles_and_aliases(self):
+        profiles = {"primary": {"model": "openai/a", "strategy": "wholefile", "hedge_after": "soon",
+                                "chain": ["other", {"model": "openai/c"}, {"model": "openai/d", "strategy": "bad"}, "missing"]},
+                    "other": {"model": "openai/b", "strategy": "udiff"}}
+        with patch.dict(profile_loader.profiles, {ProfileType.COMMENTER: profiles}):
+            resolved = profile_loader.get_profile(ProfileType.COMMENTER, "primary")
+        self.assertEqual(resolved["chain"], [{"model": "openai/b", "strategy": "udiff"},
+                                             {"model": "openai/c", "strategy": "wholefile"}])
+        self.assertNotIn("hedge_after", resolved)
+        self.assertEqual(FallbackChain.from_profile(resolved).entries,
+                         [ChainEntry("openai/b", "udiff"), ChainEntry("openai/c", "wholefile")])
+
+
+if __name__ == '__main__':
+    unittest.main()
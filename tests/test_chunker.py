@@ -0,0 +1,114 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from aicoder.config import Config
+from aicoder.core.chunker import split_into_chunks
+from aicoder.core.processor import improve_file_documentation
+from aicoder.core.structure import find_php_symbols, find_twig_symbols
+from aicoder.strategies import WholeFileStrategy
+
+
+def make_php_class(num_methods: int, body_lines: int = 8) -> str:
+    parts = ["<?php\n", "namespace App;\n", "\n", "class Big\n", "{\n"]
+    for m in range(num_methods):
+        parts.append(f"    // method {m}\n")
+        parts.append(f"    public function method{m}($a)\n")
+        parts.append("    {\n")
+        parts.extend(f"        $a = $a . '}}{m}';\n" for _ in range(body_lines))
+        parts.append("        return $a;\n")
+        parts.append("    }\n")
+        parts.append("\n")
+    parts.append("}\n")
+    return ''.join(parts)
+
+
+class TestStructure(unittest.TestCase):
+    """Test cases for the PHP/Twig symbol scanners."""
+
+    def test_php_methods_ignore_braces_in_strings_and_comments(self):
+        symbols = find_php_symbols(make_php_class(3))
+        self.assertEqual([(s.kind, s.name) for s in symbols],
+                         [("class", "Big"), ("method", "method0"), ("method", "method1"), ("method", "method2")])
+        method0 = symbols[1]
+        self.assertEqual((method0.doc_start, method0.start_line, method0.end_line), (5, 6, 17))
+        self.assertEqual(method0.parent, "Big")
+
+    def test_twig_blocks_macros_and_shorthand_blocks(self):
+        code = ("{% extends 'base.html.twig' %}\n"
+                "{% block title 'Home' %}\n"
+                "{# Main content #}\n"
+                "{% block body %}\n"
+                "  {% block inner %}x{% endblock %}\n"
+                "{% endblock %}\n"
+                "{% macro button(label) %}<b>{{ label }}</b>{% endmacro %}\n")
+        symbols = {s.name: s for s in find_twig_symbols(code)}
+        self.assertEqual((symbols["title"].start_line, symbols["title"].end_line), (1, 1))
+        self.assertEqual((symbols["body"].doc_start, symbols["body"].end_line), (2, 5))
+        self.assertEqual(symbols["inner"].depth, 1)
+        self.assertEqual(symbols["button"].kind, "macro")
+
+
+class TestChunker(unittest.TestCase):
+    """Test cases for splitting large files on declaration boundaries."""
+
+    def test_chunks_cover_file_and_respect_boundaries(self):
+        code = make_php_class(40)
+        chunks = split_into_chunks(code, '.php', max_lines=100)
+
+        self.assertGreater(len(chunks), 4)
+        self.assertEqual(''.join(c.text for c in chunks), code)
+        for chunk in chunks:
+            self.assertLessEqual(chunk.end_line - chunk.start_line, 100)
+        for chunk in chunks[1:]:
+            self.assertTrue(chunk.text.startswith("    // method"), chunk.text[:40])
+
+    def test_small_file_is_a_single_chunk(self):
+        code = make_php_class(2)
+        self.assertEqual(len(split_into_chunks(code, '.php', max_lines=1000)), 1)
+
+
+class TestChunkedProcessing(unittest.TestCase):
+    """Test cases for documenting a large file chunk by chunk."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original_threshold = Config.CHUNK_THRESHOLD_LINES
+        self.original_max_lines = Config.CHUNK_MAX_LINES
+        Config.CHUNK_THRESHOLD_LINES = 50
+        Config.CHUNK_MAX_LINES = 60
+
+    def tearDown(self):
+        Config.CHUNK_THRESHOLD_LINES = self.original_threshold
+        Config.CHUNK_MAX_LINES = self.original_max_lines
+        self.tmp.cleanup()
+
+    @patch('aicoder.core.processor._validate_code', return_value=True)
+    @patch('aicoder.core.processor.get_response_cache', return_value=None)
+    @patch('aicoder.core.processor.LLMClient')
+    def test_chunks_are_documented_and_reassembled_in_order(self, mock_client_class, _cache, mock_validate):
+        path = Path(self.tmp.name) / "Big.php"
+        code = make_php_class(12)
+        path.write_text(code)
+
+        def fake_send(system_prompt, user_prompt):
+            # "document" each chunk by tagging its method comments, echoing it back without trailing newline
+            chunk = user_prompt.split("PHP_CODE:\n", 1)[1][:-1]
+            self.assertIn("excerpt of a larger file", user_prompt)
+            return chunk.replace("// method", "// documented method").rstrip('\n')
+
+        mock_client = MagicMock()
+        mock_client.cancelled.is_set.return_value = False
+        mock_client.sendRequest.side_effect = fake_send
+        mock_client_class.return_value = mock_client
+
+        improve_file_documentation(path, "model", WholeFileStrategy())
+
+        self.assertGreater(mock_client.sendRequest.call_count, 1)
+        self.assertEqual(path.read_text(), code.replace("// method", "// documented method"))
+        mock_validate.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import importlib
+import inspect
+import subprocess
+import sys
+import unittest
+
+from typer.testing import CliRunner
+
+from aicoder.cli.main import AicoderGroup, app
+from aicoder.cli.startup_trace import parse_import_times
+
+
+class TestCliStartup(unittest.TestCase):
+    """Test cases for lazily imported commands."""
+
+    def test_listed_help_matches_command_docstrings(self):
+        for name, spec in AicoderGroup.lazy_commands.items():
+            function = getattr(importlib.import_module(spec.module), spec.function)
+            summary = " ".join(inspect.getdoc(function).split("\n\n")[0].split())
+            self.assertEqual(spec.short_help, summary, name)
+
+    def test_version_and_help_do_not_import_commands_or_sdks(self):
+        code = ("import sys\n"
+                "from aicoder.cli.main import main\n"
+                "sys.argv = ['aicoder', '--help']\n"
+                "try:\n"
+                "    main()\n"
+                "except SystemExit:\n"
+                "    pass\n"
+                "loaded = [m for m in ('openai', 'requests', 'yaml', 'aicoder.profiles', 'aicoder.cli.commands.add_comments')\n"
+                "          if m in sys.modules]\n"
+                "print('LOADED', loaded)\n")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertIn("LOADED []", output)
+
+    def test_lazy_command_runs(self):
+        result = CliRunner().invoke(app, ["list-profiles"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Commenter Profiles", result.output)
+
+    def test_parse_import_times(self):
+        stderr = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       120 |        120 |   yaml.error\n"
+                  "import time:      3000 |       3120 | yaml\n"
+                  "warning: something else\n")
+        imports, other = parse_import_times(stderr)
+        self.assertEqual([(i.module, i.self_us, i.cumulative_us, i.depth) for i in imports],
+                         [("yaml.error", 120, 120, 1), ("yaml", 3000, 3120, 0)])
+        self.assertEqual(other, ["warning: something else"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aicoder import config_snapshot
+from aicoder.config import Config
+from aicoder.llm.api_client import resolve_provider
+from aicoder.profiles import ProfileLoader, ProfileType, get_profile_loader
+
+
+class TestConfigSnapshot(unittest.TestCase):
+    """Test cases for the compiled, mtime-validated configuration."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        (self.dir / "profiles").mkdir()
+        self._write("model-aliases.yaml", "flash: openrouter/google/flash\n")
+        self._write("profiles/commenter-profiles.yaml",
+                    "profiles:\n  default:\n    model: flash\n    strategy: wholefile\n")
+        self._write("profiles/analyzer-profiles.yaml", "profiles:\n  default:\n    model: openai/gpt\n")
+        self._write("profiles/analyzer-prompts.yaml", "prompts:\n  default: Review this code\n")
+        for patcher in (patch.object(config_snapshot, "CONFIG_DIR", self.dir),
+                        patch.object(Config, "CONFIG_SNAPSHOT_PATH", self.dir / "cache" / "snapshot.pickle"),
+                        patch.object(Config, "CONFIG_RELOAD_CHECK_SECONDS", 0),
+                        patch.object(config_snapshot, "_snapshot", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _write(self, name, content, mtime=None):
+        path = self.dir / name
+        path.write_text(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_compiles_aliases_profiles_and_prompts(self):
+        loader = ProfileLoader(config_snapshot.load_snapshot())
+        self.assertEqual(loader.get_profile(ProfileType.COMMENTER, "default")["model"], "openrouter/google/flash")
+        self.assertEqual(loader.get_available_profiles(ProfileType.ANALYZER), ["default"])
+        self.assertEqual(loader.analyzer_prompts, {"default": "Review this code"})
+
+    def test_stored_snapshot_is_used_until_a_file_changes(self):
+        config_snapshot.load_snapshot()
+        self.assertTrue(Config.CONFIG_SNAPSHOT_PATH.exists())
+
+        with patch.object(config_snapshot, "compile_snapshot", side_effect=AssertionError("recompiled")):
+            self.assertEqual(config_snapshot.load_snapshot().model_aliases, {"flash": "openrouter/google/flash"})
+
+        self._write("model-aliases.yaml", "flash: openrouter/google/flash-2\n", mtime=1_000_000)
+        self.assertEqual(config_snapshot.load_snapshot().model_aliases, {"flash": "openrouter/google/flash-2"})
+
+    def test_hot_reload_resolves_aliases_in_one_place(self):
+        self.assertEqual(resolve_provider("flash")[1:], ("openrouter", "google/flash"))
+        first = get_profile_loader()
+
+        self._write("model-aliases.yaml", "flash: openai/gpt-flash\n", mtime=1_000_000)
+        self.assertEqual(resolve_provider("flash")[1:], ("openai", "gpt-flash"))
+        self.assertIsNot(get_profile_loader(), first)
+        self.assertEqual(get_profile_loader().get_profile(ProfileType.COMMENTER, "default")["model"], "openai/gpt-flash")
+
+    def test_invalid_files_compile_to_empty_settings(self):
+        self._write("profiles/commenter-profiles.yaml", "just a string\n")
+        self._write("profiles/analyzer-prompts.yaml", "prompts: [a, b]\n")
+        (self.dir / "model-aliases.yaml").unlink()
+        snapshot = config_snapshot.compile_snapshot()
+        self.assertEqual(snapshot.profiles["commenter"], {})
+        self.assertEqual(snapshot.analyzer_prompts, {})
+        self.assertEqual(snapshot.model_aliases, {})
+
+    def test_snapshot_with_unparseable_file_is_not_stored(self):
+        self._write("model-aliases.yaml", "flash: [unclosed\n")
+        snapshot = config_snapshot.load_snapshot()
+        self.assertEqual(snapshot.errors, [str(self.dir / "model-aliases.yaml")])
+        self.assertFalse(Config.CONFIG_SNAPSHOT_PATH.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
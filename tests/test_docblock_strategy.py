@@ -0,0 +1,86 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from aicoder.core.processor import _request_and_apply
+from aicoder.strategies import DocblockStrategy, WholeFileStrategy
+
+PHP_CODE = """<?php
+
+/**
+ * Old summary.
+ */
+class Cart
+{
+    public function total(): int
+    {
+        $sum = 0;
+        foreach ($this->items as $item) {
+            $sum += $item->price;
+        }
+        return $sum;
+    }
+}
+"""
+
+
+class TestDocblockStrategy(unittest.TestCase):
+    """Test cases for applying JSON docblock entries at parsed symbol positions."""
+
+    def setUp(self):
+        self.strategy = DocblockStrategy()
+
+    def test_parse_entries_tolerates_fences_and_prose(self):
+        raw = 'Here you go:\n```json\n{"entries": [{"symbol": "Cart"}, {"kind": "class"}]}\n```'
+        self.assertEqual(self.strategy.parse_entries(raw), [{"symbol": "Cart"}])
+        self.assertEqual(self.strategy.parse_entries('[{"symbol": "f"}]'), [{"symbol": "f"}])
+        self.assertIsNone(self.strategy.parse_entries("no json here"))
+
+    def test_replaces_inserts_and_adds_section_comments(self):
+        entries = [
+            {"symbol": "Cart", "kind": "class", "docblock": "/**\n * Shopping cart.\n */"},
+            {"symbol": "Cart::total", "kind": "method", "docblock": "/**\n * Sum of item prices.\n */",
+             "section_comments": [{"before": "foreach ($this->items as $item) {", "comment": "// ---- add up"}]},
+            {"symbol": "Missing::thing", "docblock": "/** ignored */"},
+        ]
+        result = self.strategy.apply_entries(PHP_CODE, ".php", entries)
+
+        self.assertNotIn("Old summary", result)
+        self.assertIn("/**\n * Shopping cart.\n */\nclass Cart", result)
+        self.assertIn("    /**\n     * Sum of item prices.\n     */\n    public function total()", result)
+        self.assertIn("        // ---- add up\n        foreach", result)
+        self.assertNotIn("ignored", result)
+        # code lines are untouched
+        self.assertEqual([l for l in result.splitlines() if "$" in l], [l for l in PHP_CODE.splitlines() if "$" in l])
+
+    def test_symbol_of_another_class_is_not_documented(self):
+        code = PHP_CODE + "\nclass Invoice\n{\n    public function total(): int\n    {\n        return 0;\n    }\n}\n"
+        entries = [{"symbol": "Order::total", "docblock": "/** Order total. */"},
+                   {"symbol": "total", "kind": "function", "docblock": "/** Some total. */"}]
+        self.assertEqual(self.strategy.apply_entries(code, ".php", entries), code)
+
+    def test_chunk_without_open_tag(self):
+        chunk = "function helper($a)\n{\n    return $a;\n}\n"
+        result = self.strategy.apply_entries(chunk, ".php", [{"symbol": "helper", "docblock": "/** Helper. */"}])
+        self.assertEqual(result, "/** Helper. */\n" + chunk)
+
+    def test_twig_blocks(self):
+        twig = "{% block body %}\n  <p>Hi</p>\n{% endblock %}\n"
+        result = self.strategy.apply_entries(twig, ".twig", [{"symbol": "body", "kind": "block", "docblock": "{# Page body #}"}])
+        self.assertEqual(result, "{# Page body #}\n" + twig)
+
+    def test_response_format_is_only_requested_by_json_strategies(self):
+        client = MagicMock()
+        client.sendRequest.return_value = json.dumps({"entries": []})
+        with patch.object(DocblockStrategy, "process_llm_response", return_value=None):
+            _request_and_apply(client, ("system", "user"), DocblockStrategy(), MagicMock())
+        client.sendRequest.assert_called_once_with("system", "user", responseFormat={"type": "json_object"})
+
+        client.reset_mock()
+        with patch.object(WholeFileStrategy, "process_llm_response", return_value=None):
+            _request_and_apply(client, ("system", "user"), WholeFileStrategy(), MagicMock())
+        client.sendRequest.assert_called_once_with("system", "user")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aicoder.core.processor import _run_comparator
+from aicoder.validation.fast_compare import DIFFERENT, EQUAL, UNKNOWN, compare_php, compare_twig, php_tokens
+
+PHP = """<?php
+namespace App;
+
+class Cart
+{
+    public function label($x)
+    {
+        $s = "a // not a comment $x";
+        $h = <<<EOT
+          keep /* this */ text
+          EOT;
+        return $x - -1; # trailing
+    }
+}
+?>
+<p>inline html</p>
+"""
+
+TWIG = "{% block body %}\n<p>{{ user.name|default('{{ nobody }}') }}</p>\n{% endblock %}\n"
+
+
+class TestFastCompare(unittest.TestCase):
+    """Test cases for the in-process comment-only comparison."""
+
+    def test_php_comment_changes_are_equal(self):
+        documented = (PHP.replace("class Cart", "/**\n * Shopping cart\n */\nclass Cart")
+                      .replace("# trailing", "// why? because")
+                      .replace("        return", "        // ---- result\n        return"))
+        self.assertEqual(compare_php(PHP, documented), EQUAL)
+
+    def test_php_code_changes_are_different(self):
+        self.assertEqual(compare_php(PHP, PHP.replace("keep /* this */", "keep")), DIFFERENT)
+        self.assertEqual(compare_php(PHP, PHP.replace("return $x", "return $y")), DIFFERENT)
+        self.assertEqual(compare_php(PHP, PHP.replace("inline html", "inline HTML")), DIFFERENT)
+        # a comment that swallows code, or ends PHP mode
+        self.assertEqual(compare_php(PHP, PHP.replace("# trailing", "// a ?> b")), DIFFERENT)
+        self.assertEqual(compare_php(PHP, PHP.replace("        return", "        // result return")), DIFFERENT)
+
+    def test_php_ambiguous_cases_are_left_to_the_comparator(self):
+        self.assertEqual(compare_php(PHP, PHP.replace("- -1", "--1")), UNKNOWN)
+        self.assertEqual(compare_php(PHP, PHP.replace("class Cart", "CLASS Cart")), UNKNOWN)
+        self.assertEqual(compare_php(PHP, PHP.replace('"a //', '"{$x["k"]} //')), UNKNOWN)
+        self.assertIsNone(php_tokens("<?php\n/* unterminated"))
+        self.assertIsNone(php_tokens("<? echo 1;"))
+
+    def test_twig(self):
+        documented = "{# Page body #}\n" + TWIG.replace("<p>", "<!-- user -->\n  <p>")
+        self.assertEqual(compare_twig(TWIG, documented), EQUAL)
+        self.assertEqual(compare_twig(TWIG, TWIG.replace("{{ user.name", "{{ user.email")), UNKNOWN)
+        self.assertEqual(compare_twig(TWIG, TWIG.replace("{% block body %}", "{% if x %}")), DIFFERENT)
+        self.assertEqual(compare_twig(TWIG, "<!-- {# x #} -->" + TWIG), UNKNOWN)
+
+    @patch("aicoder.core.processor.get_worker_pool")
+    def test_comparator_runs_only_when_unknown(self, mock_get_pool):
+        with tempfile.TemporaryDirectory() as tmp:
+            original, modified = Path(tmp) / "a.php", Path(tmp) / "b.php"
+            original.write_text(PHP)
+            modified.write_text("<?php\n// doc\n" + PHP[len("<?php\n"):])
+            self.assertTrue(_run_comparator(Path("unused.php"), original, modified))
+            mock_get_pool.assert_not_called()
+
+            modified.write_text(PHP.replace("- -1", "--1"))
+            mock_get_pool.return_value.compare.return_value = False
+            self.assertFalse(_run_comparator(Path("unused.php"), original, modified))
+            mock_get_pool.return_value.compare.assert_called_once_with(original, modified)
+
+
+if __name__ == '__main__':
+    unittest.main()
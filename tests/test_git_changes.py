@@ -0,0 +1,131 @@
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from aicoder.config import Config
+from aicoder.core.batch import document_file
+from aicoder.core.chunker import changed_regions, split_on_regions
+from aicoder.core.git_changes import collect_changes, parse_diff
+
+PHP = ("<?php\n"                                  # 0
+       "class Cart\n"                             # 1
+       "{\n"                                      # 2
+       "    private $items = [];\n"               # 3
+       "\n"                                       # 4
+       "    // adds an item\n"                    # 5
+       "    public function add($item)\n"         # 6
+       "    {\n"                                  # 7
+       "        $this->items[] = $item;\n"        # 8
+       "    }\n"                                  # 9
+       "\n"                                       # 10
+       "    public function total()\n"            # 11
+       "    {\n"                                  # 12
+       "        return count($this->items);\n"    # 13
+       "    }\n"                                  # 14
+       "}\n")                                     # 15
+
+DIFF = """diff --git a/src/Cart.php b/src/Cart.php
+index 1111111..2222222 100644
+--- a/src/Cart.php
++++ b/src/Cart.php
+@@ -9 +9,2 @@ class Cart
+-        $this->items[] = $item;
++        $this->items[] = $item;
++        return $this;
+@@ -20,2 +21,0 @@ class Cart
+-    }
+-
+diff --git a/old.php b/old.php
+deleted file mode 100644
+--- a/old.php
++++ /dev/null
+@@ -1,3 +0,0 @@
+-<?php
+"""
+
+
+class TestChangedRegions(unittest.TestCase):
+    """Test cases for mapping changed lines to the declarations to document."""
+
+    def test_parse_diff_new_side_ranges(self):
+        self.assertEqual(parse_diff(DIFF), {"src/Cart.php": [(8, 10), (20, 21)]})
+
+    def test_change_in_method_selects_the_method_with_its_docblock(self):
+        self.assertEqual(changed_regions(PHP, '.php', [(8, 9)], context_lines=1), [(5, 10)])
+
+    def test_change_outside_methods_selects_context_lines(self):
+        self.assertEqual(changed_regions(PHP, '.php', [(3, 4)], context_lines=1), [(2, 5)])
+        # a declaration within the context brings its docblock along; adjacent regions merge
+        self.assertEqual(changed_regions(PHP, '.php', [(3, 4), (13, 14)], context_lines=3), [(0, 15)])
+
+    def test_regions_split_file_without_losing_text(self):
+        chunks = split_on_regions(PHP, [(5, 10), (11, 15)])
+        self.assertEqual(''.join(chunk.text for chunk in chunks), PHP)
+        self.assertEqual([(c.start_line, c.end_line, c.selected) for c in chunks],
+                         [(0, 5, False), (5, 10, True), (10, 11, False), (11, 15, True), (15, 16, False)])
+
+    @patch('aicoder.core.processor._validate_code', return_value=True)
+    @patch('aicoder.core.processor.get_response_cache', return_value=None)
+    @patch('aicoder.core.processor.LLMClient')
+    def test_only_changed_regions_are_sent_and_merged_back(self, mock_client_class, _cache, _validate):
+        sent = []
+
+        def fake_send(system_prompt, user_prompt, **options):
+            chunk = user_prompt.split("PHP_CODE:\n", 1)[1][:-1]
+            sent.append(chunk)
+            return chunk.replace("    public function", "    /** Documented */\n    public function")
+
+        mock_client = MagicMock()
+        mock_client.cancelled.is_set.return_value = False
+        mock_client.sendRequest.side_effect = fake_send
+        mock_client_class.return_value = mock_client
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(Config, "GIT_CONTEXT_LINES", 0):
+            path = Path(tmp) / "Cart.php"
+            path.write_text(PHP)
+            result = document_file(path, "openai/model", "wholefile", changed_lines=[(13, 14)])
+            self.assertTrue(result.success, result.error)
+            self.assertEqual(sent, [''.join(PHP.splitlines(keepends=True)[11:15])])
+            self.assertEqual(path.read_text(), PHP.replace("    public function total",
+                                                            "    /** Documented */\n    public function total"))
+
+            self.assertEqual(document_file(path, "openai/model", "wholefile", changed_lines=[]).skip_reason,
+                             "no changed lines")
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class TestCollectChanges(unittest.TestCase):
+    """Test cases for reading changed lines from a git repository."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.git("init", "-q")
+        (self.root / "Cart.php").write_text(PHP)
+        (self.root / "Other.php").write_text(PHP)
+        self.git("add", ".")
+        self.git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "initial")
+
+    def git(self, *args):
+        subprocess.run(["git", *args], cwd=self.root, check=True, capture_output=True)
+
+    def test_since_and_staged(self):
+        (self.root / "Cart.php").write_text(PHP.replace("count(", "\\count("))
+        (self.root / "Other.php").write_text(PHP.replace("private $items", "protected $items"))
+        self.git("add", "Other.php")
+
+        changes = collect_changes(since="HEAD", cwd=self.root)
+        cart, other = (self.root / "Cart.php").resolve(), (self.root / "Other.php").resolve()
+        self.assertEqual(changes, {cart: [(13, 14)], other: [(3, 4)]})
+        self.assertEqual(collect_changes(staged=True, cwd=self.root), {other: [(3, 4)]})
+
+        with self.assertRaisesRegex(RuntimeError, "git diff"):
+            collect_changes(since="no-such-revision", cwd=self.root)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from requests.exceptions import HTTPError as RequestsHTTPError
+
+from aicoder.config import Config
+from aicoder.llm import ledger
+from aicoder.llm.api_client import LLMClient
+
+
+def row(**values):
+    base = {"started_at": 1000.0, "model": "openai/a", "profile": "default", "strategy": "wholefile",
+            "latency": 1.0, "ttft": None, "retries": 0, "cache_hit": 0, "outcome": "success",
+            "prompt_tokens": 100, "completion_tokens": 50, "cached_tokens": None, "validation": None}
+    return {**base, **values}
+
+
+class TestLedgerSummary(unittest.TestCase):
+    """Test cases for the request statistics."""
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(ledger.percentile(values, 0.50), 50)
+        self.assertEqual(ledger.percentile(values, 0.95), 95)
+        self.assertEqual(ledger.percentile([3.0], 0.99), 3.0)
+        self.assertIsNone(ledger.percentile([], 0.5))
+
+    def test_summarize_groups_and_excludes_cache_hits_from_latency(self):
+        rows = [
+            row(latency=1.0, validation=ledger.VALIDATION_PASSED),
+            row(started_at=1030.0, latency=3.0, retries=2, validation=ledger.VALIDATION_FAILED),
+            row(started_at=1060.0, latency=0.0, cache_hit=1, validation=ledger.VALIDATION_PASSED),
+            row(model="openai/b", outcome="error", latency=5.0),
+        ]
+        first, second = ledger.summarize(rows)
+
+        self.assertEqual((first["model"], first["profile"]), ("openai/a", "default"))
+        self.assertEqual(first["requests"], 3)
+        self.assertEqual(first["cache_hits"], 1)
+        self.assertEqual(first["retries"], 2)
+        self.assertEqual(first["p50"], 1.0)
+        self.assertEqual(first["p99"], 3.0)
+        self.assertEqual(first["completion_tokens"], 100)
+        self.assertEqual(first["tokens_per_sec"], 25.0)
+        self.assertAlmostEqual(first["pass_rate"], 2 / 3)
+        self.assertAlmostEqual(first["requests_per_min"], 3.0)
+        self.assertEqual(second["errors"], 1)
+        self.assertIsNone(second["p50"])
+        self.assertIsNone(second["pass_rate"])
+
+    def test_parse_since(self):
+        with patch("aicoder.llm.ledger.time.time", return_value=100_000.0):
+            self.assertEqual(ledger.parse_since("30m"), 100_000.0 - 1800)
+            self.assertEqual(ledger.parse_since("2d"), 100_000.0 - 172_800)
+            self.assertIsNone(ledger.parse_since(None))
+        with self.assertRaises(ValueError):
+            ledger.parse_since("soon")
+
+
+class TestLedgerRecording(unittest.TestCase):
+    """Test cases for recording LLM requests in the ledger."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for patcher in (patch.object(Config, "LEDGER_PATH", Path(self.tmp.name) / "ledger.sqlite"),
+                        patch.object(Config, "LEDGER_ENABLED", True),
+                        patch.object(Config, "LLM_RATE_LIMIT_ENABLED", False),
+                        patch.object(ledger, "_ledger", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    @patch.object(Config, "LLM_RETRY_MIN_DELAY", 0.1)
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    @patch('aicoder.llm.api_client.time.sleep')
+    def test_request_with_reported_usage_and_validation(self, mock_sleep, mock_adapter_class):
+        adapter = mock_adapter_class.return_value
+        rate_limit_error = RequestsHTTPError("429 Too Many Requests")
+        rate_limit_error.response = MagicMock(status_code=429)
+
+        attempts = []
+
+        def complete(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise rate_limit_error
+            adapter.add_usage_listener.call_args[0][0](
+                {"prompt_tokens": 120, "completion_tokens": 30, "prompt_tokens_details": {"cached_tokens": 64}}
+            )
+            return "documented"
+        adapter.create_completion.side_effect = complete
+
+        client = LLMClient("openai/test-model")
+        with ledger.labels(profile="fast", strategy="udiff", file="a.php"):
+            client.sendRequest("system", "user prompt", verbose=False)
+        client.recordValidation(True)
+
+        recorded, = ledger.get_ledger().rows()
+        self.assertEqual(recorded["model"], "openai/test-model")
+        self.assertEqual((recorded["profile"], recorded["strategy"], recorded["file"]), ("fast", "udiff", "a.php"))
+        self.assertEqual((recorded["prompt_tokens"], recorded["completion_tokens"], recorded["cached_tokens"]), (120, 30, 64))
+        self.assertFalse(recorded["tokens_estimated"])
+        self.assertEqual(recorded["retries"], 1)
+        self.assertEqual(recorded["outcome"], "success")
+        self.assertEqual(recorded["validation"], ledger.VALIDATION_PASSED)
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    def test_usage_is_reported_per_request_and_estimated_without_it(self, mock_adapter_class):
+        adapter = mock_adapter_class.return_value
+        adapter.create_completion.return_value = "documented"
+        adapter.stream_completion.return_value = iter(["docu", "mented"])
+
+        client = LLMClient("openai/test-model")
+        client.sendRequest("system", "user prompt", verbose=False)
+        self.assertEqual("".join(client.streamRequest("system", "other prompt", verbose=False)), "documented")
+
+        sent, streamed = ledger.get_ledger().rows()
+        self.assertTrue(sent["tokens_estimated"])
+        self.assertGreater(sent["prompt_tokens"], 0)
+        self.assertTrue(streamed["streaming"])
+        self.assertIsNotNone(streamed["ttft"])
+        self.assertEqual(streamed["completion_tokens"], sent["completion_tokens"])
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    def test_failed_request_is_recorded(self, mock_adapter_class):
+        mock_adapter_class.return_value.create_completion.side_effect = ValueError("bad request")
+
+        with self.assertRaises(Exception):
+            LLMClient("openai/test-model").sendRequest("system", "user prompt", verbose=False)
+
+        recorded, = ledger.get_ledger().rows()
+        self.assertEqual(recorded["outcome"], "error")
+        self.assertIn("bad request", recorded["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from aicoder.llm.api_client import LLMClient
+from aicoder.llm.cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the persistent LLM response cache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "cache.sqlite"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_depends_on_every_request_component(self):
+        base = ResponseCache.make_key("m", "sys", "user", 0.0, "1")
+        self.assertEqual(base, ResponseCache.make_key("m", "sys", "user", 0.0, "1"))
+        for variant in [("m2", "sys", "user", 0.0, "1"), ("m", "sys2", "user", 0.0, "1"),
+                        ("m", "sys", "user2", 0.0, "1"), ("m", "sys", "user", 0.5, "1"),
+                        ("m", "sys", "user", 0.0, "2")]:
+            self.assertNotEqual(base, ResponseCache.make_key(*variant))
+
+    def test_roundtrip_and_ttl(self):
+        cache = ResponseCache(self.path, ttl=3600, max_bytes=0)
+        cache.put("k", "m", "hello " * 100)
+        self.assertEqual(cache.get("k"), "hello " * 100)
+
+        expired = ResponseCache(self.path, ttl=0.01, max_bytes=0)
+        time.sleep(0.02)
+        self.assertIsNone(expired.get("k"))
+
+    def test_lru_eviction_keeps_recently_used(self):
+        cache = ResponseCache(self.path, ttl=0, max_bytes=10 ** 9)
+        for key in ["a", "b", "c"]:
+            cache.put(key, "m", key * 1000)
+            time.sleep(0.01)
+        cache.get("a")  # touch a so b becomes least recently used
+
+        cache.max_bytes = 40  # each compressed body is ~20 bytes
+        cache.evict()
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+    def test_single_flight_shares_one_computation(self):
+        cache = ResponseCache(self.path, ttl=0, max_bytes=0)
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", "m", compute)))
+                   for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["result"] * 5)
+
+    def test_leader_rechecks_cache_before_computing(self):
+        cache = ResponseCache(self.path, ttl=0, max_bytes=0)
+        real_get = cache.get
+
+        def get(key):
+            # the previous leader stores its result right after this caller's first lookup
+            if not getattr(get, "missed", False):
+                get.missed = True
+                cache.put(key, "m", "stored")
+                return None
+            return real_get(key)
+
+        compute = MagicMock(return_value="computed")
+        with patch.object(cache, "get", side_effect=get):
+            self.assertEqual(cache.get_or_compute("k", "m", compute), "stored")
+        compute.assert_not_called()
+
+    def test_failed_store_still_returns_the_completion(self):
+        cache = ResponseCache(self.path, ttl=0, max_bytes=0)
+        with patch.object(cache, "put", side_effect=sqlite3.OperationalError("database is locked")):
+            self.assertEqual(cache.get_or_compute("k", "m", lambda: "paid for"), "paid for")
+
+    def test_unreadable_cache_counts_as_a_miss(self):
+        cache = ResponseCache(self.path, ttl=0, max_bytes=0)
+        broken = MagicMock()
+        broken.execute.side_effect = sqlite3.DatabaseError("database disk image is malformed")
+        with patch.object(cache, "_connection", return_value=broken):
+            self.assertIsNone(cache.get("k"))
+            cache.discard("k")
+            self.assertEqual(cache.get_or_compute("k", "m", lambda: "computed"), "computed")
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    def test_client_serves_repeat_requests_from_cache(self, mock_adapter_class):
+        mock_adapter = MagicMock()
+        mock_adapter_class.return_value = mock_adapter
+        mock_adapter.create_completion.return_value = "documented"
+
+        client = LLMClient("openai/test-model", cache=ResponseCache(self.path))
+        self.assertEqual(client.sendRequest("sys", "user"), "documented")
+        self.assertEqual(client.sendRequest("sys", "user"), "documented")
+        self.assertEqual(mock_adapter.create_completion.call_count, 1)
+
+        client.discardCachedResponse("sys", "user")
+        client.sendRequest("sys", "user")
+        self.assertEqual(mock_adapter.create_completion.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
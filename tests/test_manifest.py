@@ -0,0 +1,138 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aicoder.config import Config
+from aicoder.core.batch import document_file
+from aicoder.core.manifest import RunManifest, RunManifests
+from aicoder.core.processor import CodeValidationError
+
+
+class TestRunManifest(unittest.TestCase):
+    """Test cases for skipping unchanged files via the run manifest."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / ".git").mkdir()
+        self.file = self.root / "src" / "Foo.php"
+        self.file.parent.mkdir()
+        self.file.write_text("<?php\nclass Foo {}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _document(self, manifest, side_effect=None, profile="default", force=False, written=True, changed_lines=None):
+        def fake_improve(path, model, strategy, chain=None, regions=None):
+            if side_effect:
+                raise side_effect
+            if written:
+                path.write_text("<?php\n/** Foo */\nclass Foo {}\n")
+            return written
+
+        with patch("aicoder.core.batch.improve_file_documentation", side_effect=fake_improve) as mock_improve:
+            result = document_file(self.file, "model", "wholefile", profile=profile, manifest=manifest, force=force,
+                                   changed_lines=changed_lines)
+        return result, mock_improve.call_count
+
+    def test_documented_file_is_skipped_until_it_changes(self):
+        manifest = RunManifest.for_directory(self.root / "src")
+        self.assertEqual(manifest.root, self.root.resolve())
+
+        result, calls = self._document(manifest)
+        self.assertTrue(result.success)
+        self.assertEqual(calls, 1)
+        manifest.save()
+
+        # a fresh run loads the manifest from disk
+        manifest = RunManifest(self.root)
+        result, calls = self._document(manifest)
+        self.assertTrue(result.skipped)
+        self.assertEqual(calls, 0)
+
+        result, calls = self._document(manifest, force=True)
+        self.assertFalse(result.skipped)
+        self.assertEqual(calls, 1)
+
+        self.file.write_text("<?php\nclass Foo { public $bar; }\n")
+        result, calls = self._document(manifest)
+        self.assertFalse(result.skipped)
+        self.assertEqual(calls, 1)
+
+    def test_run_without_changes_is_not_skipped_next_time(self):
+        manifest = RunManifest(self.root)
+        result, calls = self._document(manifest, written=False)
+        self.assertTrue(result.success)
+        self.assertEqual(manifest.entries["src/Foo.php"]["outcome"], "unchanged")
+
+        result, calls = self._document(manifest)
+        self.assertFalse(result.skipped)
+        self.assertEqual(calls, 1)
+
+    def test_partial_run_does_not_skip_the_next_full_run(self):
+        manifest = RunManifest(self.root)
+        result, calls = self._document(manifest, changed_lines=[(1, 2)])
+        self.assertTrue(result.success)
+        self.assertTrue(manifest.entries["src/Foo.php"]["partial"])
+
+        # a later --since run has nothing left to do for the file...
+        result, calls = self._document(manifest, changed_lines=[(1, 2)])
+        self.assertTrue(result.skipped)
+        self.assertEqual(calls, 0)
+
+        # ...but a full run documents the rest of it, after which both kinds of runs skip it
+        result, calls = self._document(manifest)
+        self.assertFalse(result.skipped)
+        self.assertEqual(calls, 1)
+        self.assertFalse(manifest.entries["src/Foo.php"]["partial"])
+        self.assertTrue(self._document(manifest)[0].skipped)
+
+    def test_repeated_validation_failures_are_held_back(self):
+        manifest = RunManifest(self.root)
+        error = CodeValidationError("validation failed")
+
+        for _ in range(Config.MANIFEST_MAX_VALIDATION_FAILURES):
+            result, calls = self._document(manifest, side_effect=error)
+            self.assertFalse(result.success)
+            self.assertEqual(calls, 1)
+
+        result, calls = self._document(manifest, side_effect=error)
+        self.assertTrue(result.skipped)
+        self.assertIn("failed validation", result.skip_reason)
+
+        # another profile still gets its chance
+        result, calls = self._document(manifest, side_effect=error, profile="sonnet45")
+        self.assertEqual(calls, 1)
+
+    def test_other_errors_do_not_count_as_validation_failures(self):
+        manifest = RunManifest(self.root)
+        for _ in range(Config.MANIFEST_MAX_VALIDATION_FAILURES + 1):
+            result, calls = self._document(manifest, side_effect=RuntimeError("network down"))
+            self.assertEqual(calls, 1)
+
+    def test_files_use_the_manifest_of_their_own_repository(self):
+        other_repo = self.root / "lib"
+        (other_repo / ".git").mkdir(parents=True)
+        other_file = other_repo / "Bar.php"
+        other_file.write_text("<?php\nclass Bar {}\n")
+        with tempfile.TemporaryDirectory() as plain:
+            outside = [Path(plain) / "a" / "A.php", Path(plain) / "b" / "B.php"]
+            for path in outside:
+                path.parent.mkdir()
+                path.write_text("<?php\n")
+
+            manifests = RunManifests([self.file, other_file, *outside])
+            for path in [self.file, other_file, *outside]:
+                manifests.record(path, path.read_text(), "success", "default", "model", "wholefile",
+                                 output_content=path.read_text())
+            manifests.save()
+
+            self.assertEqual(list(RunManifest(self.root).entries), ["src/Foo.php"])
+            self.assertEqual(list(RunManifest(other_repo).entries), ["Bar.php"])
+            self.assertEqual(sorted(RunManifest(Path(plain)).entries), ["a/A.php", "b/B.php"])
+            self.assertIsNotNone(manifests.skip_reason(other_file, other_file.read_text(), "default"))
+
+
+if __name__ == '__main__':
+    unittest.main()
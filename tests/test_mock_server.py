@@ -0,0 +1,70 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from aicoder.config import Config
+from aicoder.llm.api_client import LLMClient
+from aicoder.llm.mock_server import MockLLMServer, MockServerSettings
+from aicoder.llm.providers import OpenAIApiAdapter, OpenRouterApiAdapter
+
+PROMPT = [{"role": "user", "content": "Document it.\n\nPHP_CODE:\n<?php\n$a = 1;\n"}]
+
+
+class TestMockServer(unittest.TestCase):
+    """Test cases for the local mock LLM server driven through the real provider adapters."""
+
+    def _server(self, **settings) -> MockLLMServer:
+        server = MockLLMServer(MockServerSettings(latency=0.0, **settings)).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    @patch.dict(os.environ, {"OPENROUTER_API_KEY": "sk-mock"})
+    def test_openrouter_completion_and_stream(self):
+        server = self._server(responses=["first answer"])
+        adapter = OpenRouterApiAdapter(base_url=server.base_url)
+        self.assertEqual(adapter.create_completion("mock", PROMPT), "first answer")
+        # without a script the code of the prompt is echoed
+        self.assertEqual("".join(adapter.stream_completion("mock", PROMPT)), "```php\n<?php\n$a = 1;\n```")
+
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "sk-mock"})
+    def test_openai_completion_and_stream(self):
+        server = self._server(responses=["scripted"], stream_chunk_tokens=1)
+        adapter = OpenAIApiAdapter(base_url=server.base_url)
+        self.assertEqual(adapter.create_completion("mock", PROMPT), "scripted")
+        self.assertEqual("".join(adapter.stream_completion("mock", PROMPT)), "```php\n<?php\n$a = 1;\n```")
+
+    @patch.dict(os.environ, {"OPENROUTER_API_KEY": "sk-mock"})
+    def test_rate_limit_burst_sends_retry_after(self):
+        server = self._server(rate_limit_every=1, rate_limit_burst=1, retry_after=2)
+        adapter = OpenRouterApiAdapter(base_url=server.base_url)
+        adapter.create_completion("mock", PROMPT)
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            adapter.create_completion("mock", PROMPT)
+        self.assertEqual(raised.exception.response.status_code, 429)
+        self.assertEqual(raised.exception.response.headers["Retry-After"], "2")
+        adapter.create_completion("mock", PROMPT)
+
+    def test_truncated_and_failing_responses(self):
+        server = self._server(truncate_rate=1.0, responses=[{"status": 502, "body": {"error": "bad gateway"}}])
+        url = f"{server.base_url}/chat/completions"
+        self.assertEqual(requests.post(url, json={"messages": PROMPT}).status_code, 502)
+        choice = requests.post(url, json={"messages": PROMPT}).json()["choices"][0]
+        self.assertEqual(choice["finish_reason"], "length")
+        echoed = "```php\n<?php\n$a = 1;\n```"
+        self.assertEqual(choice["message"]["content"], echoed[:len(echoed) // 2])
+
+    @patch.object(Config, "LLM_RATE_LIMIT_ENABLED", False)
+    @patch.dict(os.environ, {"OPENROUTER_API_KEY": "sk-mock"})
+    def test_base_url_override_reaches_the_server(self):
+        server = self._server(responses=["from the mock"])
+        with patch.object(Config, "LLM_BASE_URL", server.base_url):
+            client = LLMClient("openrouter/any/model")
+            self.assertEqual(client.sendRequest("system", "user", verbose=False), "from the mock")
+        self.assertEqual(server.request_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from aicoder.utils.line_index import LineIndex
+from aicoder.utils.patcher_v4 import MultipleMatchesError, NoMatchError, PatcherV4
+
+
+def make_diff(*hunks: str) -> str:
+    return "--- a.php\n+++ a.php\n" + "@@ @@\n".join(hunks)
+
+
+class TestPatcherV4(unittest.TestCase):
+    """Test cases for locating udiff hunks with the line index."""
+
+    def setUp(self):
+        self.patcher = PatcherV4(continue_on_error=False, fuzzy_match=True)
+        # the patcher prints every hunk
+        self.print_patch = patch("builtins.print")
+        self.print_patch.start()
+        self.patcher.console.quiet = True
+
+    def tearDown(self):
+        self.print_patch.stop()
+
+    def test_sequential_hunks_use_updated_positions(self):
+        content = "<?php\nfunction a() {\n    return 1;\n}\nfunction b() {\n    return 2;\n}\n"
+        diff = make_diff(
+            "+/** A */\n function a() {\n",
+            "+/** B */\n function b() {\n     return 2;\n",
+            "+/**\n+ * Also A\n+ */\n /** A */\n",
+        )
+        result = self.patcher.apply_patch(content, diff)
+        self.assertEqual(result, "<?php\n/**\n * Also A\n */\n/** A */\nfunction a() {\n    return 1;\n}\n"
+                                 "/** B */\nfunction b() {\n    return 2;\n}\n")
+
+    def test_multiple_exact_matches(self):
+        with self.assertRaises(MultipleMatchesError):
+            self.patcher.apply_patch("}\nx\n}\n", make_diff("+// end\n }\n"))
+
+    def test_whitespace_normalized_match(self):
+        content = "<?php\nif ($a) {\n\treturn  $b;\n}\n"
+        result = self.patcher.apply_patch(content, make_diff(" if ($a) {\n+    // shortcut\n     return $b;\n"))
+        self.assertEqual(result, "<?php\nif ($a) {\n    // shortcut\n    return $b;\n}\n")
+
+    def test_fuzzy_match_and_no_match(self):
+        content = "<?php\n$total = $price * $quantity;\n$tax = $total * 0.2;\necho $tax;\n"
+        diff = make_diff("+// tax\n $total = $price * $qty;\n $tax = $total * 0.2;\n")
+        self.assertEqual(self.patcher.apply_patch(content, diff),
+                         "<?php\n// tax\n$total = $price * $qty;\n$tax = $total * 0.2;\necho $tax;\n")
+
+        strict = PatcherV4(fuzzy_match=False)
+        strict.console.quiet = True
+        with self.assertRaises(NoMatchError):
+            strict.apply_patch(content, diff)
+
+    def test_missing_final_newline_is_kept(self):
+        index = LineIndex("a\nb")
+        index.replace(1, 2, "// b\nb\n")
+        self.assertEqual(index.text(), "a\n// b\nb")
+        self.assertEqual(index.find_line("b"), [2])
+
+    def test_many_hunks_on_large_file(self):
+        lines = [f"function f{i}() {{\n    return {i};\n}}\n" for i in range(3000)]
+        hunks = [f"+/** f{i} */\n function f{i}() {{\n     return {i};\n" for i in range(0, 3000, 50)]
+
+        started = time.perf_counter()
+        result = self.patcher.apply_patch("".join(lines), make_diff(*hunks))
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(result.count("/** f"), 60)
+        self.assertIn("/** f2950 */\nfunction f2950() {", result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aicoder.config import Config
+from aicoder.core.batch import document_file
+from aicoder.core.planner import (TokenBudget, comment_density, pin_rules, plan_file,
+                                  select_model_and_strategy)
+
+RULES = [
+    {"max_lines": 400, "strategy": "wholefile"},
+    {"min_lines": 400, "strategy": "searchreplace"},
+    {"min_lines": 3000, "max_comment_density": 0.05, "model": "openai/gpt-big"},
+]
+
+
+def make_php(lines: int) -> str:
+    return "<?php\n" + "".join(f"$variable{i} = 'some string value {i}';\n" for i in range(lines - 2)) + "// done\n"
+
+
+class TestPlanner(unittest.TestCase):
+    """Test cases for offline estimates and per-file model/strategy selection."""
+
+    def test_comment_density(self):
+        code = "<?php\n/**\n * Doc\n */\nfunction a() {}\n// note\n\n#[Attr]\n$x = 1; // trailing\n"
+        self.assertAlmostEqual(comment_density(code, ".php"), 4 / 8)
+        self.assertAlmostEqual(comment_density("{# a #}\n<p>\n{#\nb\n#}\n", ".twig"), 4 / 5)
+
+    def test_rules_first_match_per_setting(self):
+        self.assertEqual(select_model_and_strategy("m", "udiff", RULES, 100, 0.0, 1000), ("m", "wholefile"))
+        self.assertEqual(select_model_and_strategy("m", "udiff", RULES, 5000, 0.01, 1000),
+                         ("openai/gpt-big", "searchreplace"))
+        self.assertEqual(select_model_and_strategy("m", "udiff", RULES, 5000, 0.2, 1000), ("m", "searchreplace"))
+
+        pinned = pin_rules(RULES, model_pinned=True, strategy_pinned=False)
+        self.assertEqual(select_model_and_strategy("cli", "udiff", pinned, 5000, 0.01, 1000), ("cli", "searchreplace"))
+
+    def test_wholefile_on_openai_may_be_truncated(self):
+        code = make_php(1200)
+        small = plan_file(Path("a.php"), code, "openai/gpt-x", "searchreplace")
+        whole = plan_file(Path("a.php"), code, "openai/gpt-x", "wholefile")
+
+        self.assertGreater(whole.output_tokens, small.output_tokens)
+        self.assertTrue(whole.may_be_truncated)
+        self.assertFalse(small.may_be_truncated)
+        self.assertEqual(whole.output_limit, 8000)
+
+    @patch.object(Config, "CHUNK_MAX_LINES", 300)
+    @patch.object(Config, "CHUNK_THRESHOLD_LINES", 500)
+    def test_large_files_are_planned_per_chunk(self):
+        code = "<?php\n" + "".join(f"function f{i}() {{\n" + "  $x = 1;\n" * 20 + "}\n" for i in range(60))
+        plan = plan_file(Path("big.php"), code, "openrouter/m", "wholefile")
+        self.assertGreater(plan.requests, 1)
+        self.assertLess(plan.max_request_output_tokens, plan.output_tokens)
+
+    def test_budget(self):
+        plan = plan_file(Path("a.php"), make_php(50), "openrouter/m", "wholefile")
+        budget = TokenBudget(max_total=plan.total_tokens * 2)
+        self.assertIsNone(budget.reserve(plan))
+        self.assertIsNone(budget.reserve(plan))
+        self.assertIn("budget exhausted", budget.reserve(plan))
+        self.assertIn("per-file", TokenBudget(max_per_file=10).reserve(plan))
+
+    @patch("aicoder.core.batch.improve_file_documentation")
+    def test_document_file_uses_rules_and_budget(self, mock_improve):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "a.php"
+            path.write_text(make_php(500))
+
+            result = document_file(path, "openrouter/m", "wholefile", rules=RULES, budget=TokenBudget(max_per_file=10))
+            self.assertTrue(result.skipped)
+            mock_improve.assert_not_called()
+
+            result = document_file(path, "openrouter/m", "wholefile", rules=RULES)
+            self.assertTrue(result.success)
+            self.assertEqual(type(mock_improve.call_args.args[2]).__name__, "SearchReplaceStrategy")
+
+
+if __name__ == '__main__':
+    unittest.main()
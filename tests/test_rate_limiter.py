@@ -0,0 +1,100 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from openai import RateLimitError
+
+from aicoder.config import Config
+from aicoder.llm.api_client import LLMClient
+from aicoder.llm.providers import OpenAIApiAdapter
+from aicoder.llm.rate_limiter import RateLimiter, TokenBucket, parse_duration
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the token buckets and adaptive concurrency."""
+
+    def test_parse_duration_formats(self):
+        self.assertEqual(parse_duration("1.5"), 1.5)
+        self.assertEqual(parse_duration("6m0s"), 360.0)
+        self.assertAlmostEqual(parse_duration("20ms"), 0.02)
+        self.assertIsNone(parse_duration("soon"))
+        self.assertIsNone(parse_duration(MagicMock()))
+
+    def test_bucket_debt_turns_into_wait_time(self):
+        bucket = TokenBucket(per_minute=60)
+        now = bucket.updated
+        self.assertEqual(bucket.reserve(60, now), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1, now), 1.0)
+        self.assertAlmostEqual(bucket.reserve(1, now), 2.0)
+
+    def test_headers_seed_budgets_unless_configured(self):
+        limiter = RateLimiter("openai/x")
+        limiter.update_from_headers({
+            "x-ratelimit-limit-requests": "500",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2s",
+            "x-ratelimit-limit-tokens": "30000",
+            "x-ratelimit-remaining-tokens": "29000",
+        })
+        self.assertEqual(limiter.requests.per_minute, 500)
+        self.assertEqual(limiter.tokens.tokens, 29000)
+        self.assertGreater(limiter.blocked_for(), 1.5)
+
+        configured = RateLimiter("openrouter/x", rpm=20)
+        configured.update_from_headers({"X-RateLimit-Limit": "200"})
+        self.assertEqual(configured.requests.per_minute, 20)
+
+    def test_aimd_concurrency(self):
+        limiter = RateLimiter("openrouter/x", max_concurrency=8)
+        limiter.on_rate_limited()
+        limiter.on_rate_limited()
+        self.assertEqual(limiter.concurrency, 2)
+        for _ in range(4):
+            limiter.on_success()
+        self.assertGreaterEqual(int(limiter.concurrency), 3)
+
+        for _ in range(10):
+            limiter.on_rate_limited()
+        self.assertEqual(limiter.concurrency, Config.LLM_MIN_CONCURRENCY)
+
+
+class TestRateLimitedClient(unittest.TestCase):
+    """Test cases for LLMClient and adapters feeding the limiter."""
+
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"})
+    def test_openai_rate_limit_error_stays_retryable(self):
+        response = MagicMock(status_code=429, headers={"retry-after": "3"})
+        adapter = OpenAIApiAdapter()
+        adapter.client = MagicMock()
+        adapter.client.chat.completions.with_raw_response.create.side_effect = \
+            RateLimitError("Rate limit reached", response=response, body=None)
+        seen = []
+        adapter.add_response_listener(seen.append)
+
+        with self.assertRaises(RateLimitError):
+            adapter.create_completion("gpt-test", [])
+        self.assertEqual(seen[0]["retry-after"], "3")
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    @patch('aicoder.llm.api_client.time.sleep')
+    def test_retry_after_replaces_linear_backoff(self, mock_sleep, mock_adapter_class):
+        mock_adapter = MagicMock()
+        mock_adapter_class.return_value = mock_adapter
+        client = LLMClient("openai/retry-after-model")
+        self.assertIsNotNone(client.rateLimiter)
+
+        def rate_limited(*args):
+            client.rateLimiter.update_from_headers({"Retry-After": "7"})
+            raise RateLimitError("Rate limit reached", response=MagicMock(status_code=429), body=None)
+
+        calls = [rate_limited, lambda *args: "ok"]
+        mock_adapter.create_completion.side_effect = lambda *args: calls.pop(0)(*args)
+
+        self.assertEqual(client.sendRequest("sys", "user"), "ok")
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 7, delta=0.5)
+        self.assertLess(client.rateLimiter.concurrency, Config.LLM_MAX_CONCURRENCY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aicoder.config import Config
+from aicoder.core.planner import plan_file
+from aicoder.core.router import ModelRouter, ModelStats, size_bucket
+from aicoder.llm import ledger
+from aicoder.llm.providers import OpenRouterApiAdapter
+from aicoder.profiles import ProfileType, profile_loader
+
+
+def row(**values):
+    base = {"outcome": "success", "latency": 4.0, "ttft": 1.0, "completion_tokens": 300, "retries": 0,
+            "strategy": "wholefile", "size_bucket": "small", "validation": None}
+    return {**base, **values}
+
+
+class TestModelRouter(unittest.TestCase):
+    """Test cases for per-file model selection from rolling statistics."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for patcher in (patch.object(Config, "LEDGER_ENABLED", True),
+                        patch.object(Config, "LEDGER_PATH", Path(self.tmp.name) / "ledger.sqlite"),
+                        patch.object(ledger, "_ledger", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _record(self, model, count, validation=None, **values):
+        ids = [ledger.get_ledger().record(**{"started_at": time.time(), "model": model, "outcome": "success",
+                                             "strategy": "wholefile", "size_bucket": "small", **values})
+               for _ in range(count)]
+        if validation:
+            ledger.get_ledger().set_validation(ids, validation == ledger.VALIDATION_PASSED)
+
+    def test_stats_from_rows(self):
+        stats = ModelStats.from_rows([
+            row(validation=ledger.VALIDATION_PASSED),
+            row(retries=2, validation=ledger.VALIDATION_FAILED),
+            row(outcome="error", latency=30.0),
+            row(ttft=None, latency=3.0, size_bucket="large", validation=ledger.VALIDATION_PASSED),
+        ])
+        self.assertEqual(stats.ttft, 1.0)
+        self.assertEqual(stats.tokens_per_sec, 100.0)
+        self.assertAlmostEqual(stats.failure_rate, 3 / 6)
+        # smoothed towards the prior, then falling back to all sizes and to all strategies
+        prior = Config.ROUTER_PRIOR_PASS_RATE
+        self.assertAlmostEqual(stats.pass_rate("wholefile", "small"), (1 + 2 * prior) / 4)
+        self.assertAlmostEqual(stats.pass_rate("wholefile", "medium"), (2 + 2 * prior) / 5)
+        self.assertAlmostEqual(stats.pass_rate("udiff", "small"), (2 + 2 * prior) / 5)
+        self.assertEqual(ModelStats().pass_rate("udiff", "small"), prior)
+
+    def test_picks_lowest_expected_time_to_valid_result(self):
+        self._record("openrouter/fast-but-sloppy", 10, latency=2.0, ttft=0.5, completion_tokens=300,
+                     validation=ledger.VALIDATION_FAILED)
+        self._record("openrouter/slow-but-valid", 10, latency=6.0, ttft=1.0, completion_tokens=300,
+                     validation=ledger.VALIDATION_PASSED)
+        self._record("openrouter/rate-limited", 10, latency=2.0, ttft=0.5, completion_tokens=300, retries=4,
+                     validation=ledger.VALIDATION_PASSED)
+
+        router = ModelRouter(["openrouter/fast-but-sloppy", "openrouter/slow-but-valid", "openrouter/rate-limited"])
+        model, seconds = router.choose("wholefile", 100, 300)
+        self.assertEqual(model, "openrouter/slow-but-valid")
+        self.assertGreater(seconds, 6.0)
+
+    def test_untried_models_use_planning_defaults(self):
+        self._record("openrouter/known-slow", 10, latency=60.0, ttft=10.0, completion_tokens=100)
+        router = ModelRouter(["openrouter/known-slow", "openrouter/new"])
+        self.assertEqual(router.choose("wholefile", 100, 100)[0], "openrouter/new")
+
+    def test_plan_uses_router_unless_a_rule_sets_the_model(self):
+        self._record("openrouter/quick", 10, latency=1.0, ttft=0.2, completion_tokens=400)
+        router = ModelRouter(["openrouter/default", "openrouter/quick"])
+        path = Path(self.tmp.name) / "a.php"
+        content = "<?php\nfunction a() {\n    return 1;\n}\n"
+
+        self.assertEqual(plan_file(path, content, "openrouter/default", "wholefile", None, router).model, "openrouter/quick")
+        rules = [{"max_lines": 10, "model": "openrouter/pinned"}]
+        self.assertEqual(plan_file(path, content, "openrouter/default", "wholefile", rules, router).model, "openrouter/pinned")
+
+    def test_size_buckets(self):
+        self.assertEqual([size_bucket(lines) for lines in (10, 300, 301, 5000)], ["small", "small", "medium", "large"])
+
+    def test_profile_pool_and_provider_preferences(self):
+        profiles = {"pooled": {"pool": ["flash25", "openrouter/x"], "strategy": "wholefile",
+                               "provider": {"sort": "latency"}}}
+        with patch.dict(profile_loader.profiles, {ProfileType.COMMENTER: profiles}), \
+                patch.dict(profile_loader.model_aliases, {"flash25": "openrouter/google/flash"}):
+            resolved = profile_loader.get_profile(ProfileType.COMMENTER, "pooled")
+        self.assertEqual(resolved["pool"], ["openrouter/google/flash", "openrouter/x"])
+        self.assertEqual(resolved["model"], "openrouter/google/flash")
+        self.assertEqual(ModelRouter.from_profile(resolved).pool, resolved["pool"])
+
+        with patch.dict(os.environ, {"OPENROUTER_API_KEY": "sk-test"}), \
+                patch.object(Config, "OPENROUTER_PROVIDER_PREFERENCES", resolved["provider"]):
+            data, _ = OpenRouterApiAdapter().build_request("x", [])
+        self.assertEqual(data["provider"], {"sort": "latency"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import time
+import unittest
+
+from aicoder.utils.search_replace import (AMBIGUOUS, NORMALIZED, NOT_FOUND, OVERLAPPING,
+                                          SearchReplaceEngine)
+
+ORIGINAL = """<?php
+class A
+{
+    public function one()
+    {
+        return 1;
+    }
+
+    public function two()
+    {
+        return 2;
+    }
+}
+"""
+
+
+class TestSearchReplaceEngine(unittest.TestCase):
+    """Test cases for resolving SEARCH/REPLACE blocks against the original in one pass."""
+
+    def test_blocks_are_resolved_against_the_original(self):
+        engine = SearchReplaceEngine(ORIGINAL)
+        # out of file order, and the second block's SEARCH text is not changed by the first
+        engine.add("    public function two()", "    /** Two */\n    public function two()")
+        engine.add("    public function one()", "    /** One */\n    public function one()")
+        result = engine.apply()
+
+        self.assertIn("    /** One */\n    public function one()\n", result)
+        self.assertIn("    /** Two */\n    public function two()\n", result)
+        self.assertEqual(result.replace("    /** One */\n", "").replace("    /** Two */\n", ""), ORIGINAL)
+
+    def test_whitespace_drift_is_reindented(self):
+        engine = SearchReplaceEngine(ORIGINAL)
+        block = engine.add("public function one()\n{", "// first\npublic function one()\n{")
+        self.assertEqual(block.status, NORMALIZED)
+        self.assertIn("    // first\n    public function one()\n    {\n        return 1;", engine.apply())
+
+    def test_ambiguous_overlapping_and_missing_blocks(self):
+        engine = SearchReplaceEngine(ORIGINAL)
+        first = engine.add("    }\n\n    public function two()", "    }\n\n    // two\n    public function two()")
+        # repeated SEARCH text: the first occurrence after the previous block
+        self.assertEqual(engine.add("    {", "    { // brace").start, ORIGINAL.index("    {", first.end))
+        # changes the brace line the previous block changes, too
+        overlapping = engine.add("    {\n        return 2;", "    { // other\n        return 2; // two")
+        self.assertEqual(engine.add("function three()", "x").status, NOT_FOUND)
+        self.assertEqual(engine.add("    {", "").status, AMBIGUOUS)  # no further occurrence after the previous block
+
+        result = engine.apply()
+        self.assertEqual(overlapping.status, OVERLAPPING)
+        self.assertIn("    // two\n    public function two()\n    { // brace\n", result)
+        self.assertNotIn("return 2; // two", result)
+
+    def test_adjacent_blocks_may_share_context_lines(self):
+        engine = SearchReplaceEngine(ORIGINAL)
+        # three lines of context around each docblock, as the prompt asks for
+        engine.add("{\n    public function one()\n    {\n        return 1;",
+                   "{\n    /** One */\n    public function one()\n    {\n        return 1;")
+        engine.add("        return 1;\n    }\n\n    public function two()\n    {\n        return 2;",
+                   "        return 1;\n    }\n\n    /** Two */\n    public function two()\n    {\n        return 2;")
+        result = engine.apply()
+
+        self.assertTrue(all(block.located for block in engine.blocks))
+        self.assertEqual(result, ORIGINAL.replace("    public function one", "    /** One */\n    public function one")
+                                         .replace("    public function two", "    /** Two */\n    public function two"))
+
+    def test_several_candidates_after_the_previous_block_are_ambiguous(self):
+        engine = SearchReplaceEngine(ORIGINAL)
+        self.assertEqual(engine.add("    {", "    { // brace").status, AMBIGUOUS)
+        self.assertEqual(engine.apply(), ORIGINAL)
+
+    def test_part_of_a_line(self):
+        engine = SearchReplaceEngine(ORIGINAL)
+        engine.add("return 2;", "return 2; // two")
+        self.assertIn("        return 2; // two\n", engine.apply())
+
+    def test_hundreds_of_blocks(self):
+        original = "<?php\n" + "".join(f"function f{i}()\n{{\n    return {i};\n}}\n\n" for i in range(2000))
+        started = time.perf_counter()
+        engine = SearchReplaceEngine(original)
+        for i in range(0, 2000, 5):
+            engine.add(f"function f{i}()\n{{", f"/** f{i} */\nfunction f{i}()\n{{")
+        result = engine.apply()
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual(result.count("/** f"), 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import multiprocessing
+import tempfile
+import unittest
+
+from aicoder.llm.rate_limiter import RateLimiter
+from aicoder.llm.shared_quota import SharedQuota, fcntl
+
+
+def _reserve_many(directory, count):
+    quota = SharedQuota("openrouter", "sk-shared", directory)
+    for _ in range(count):
+        quota.reserve("openrouter/model", {"requests": (6000, 1)})
+
+
+@unittest.skipIf(fcntl is None, "file locks are not available on this platform")
+class TestSharedQuota(unittest.TestCase):
+    """Test cases for budgets shared between processes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_processes_draw_from_one_bucket(self):
+        processes = [multiprocessing.Process(target=_reserve_many, args=(self.tmp.name, 50)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        quota = SharedQuota("openrouter", "sk-shared", self.tmp.name)
+        tokens = json.loads(quota.path.read_text())["buckets"]["openrouter/model"]["requests"]["tokens"]
+        # 200 reservations from a 6000/min bucket; refill during the test adds a little back
+        self.assertLess(tokens, 6000 - 150)
+
+    def test_backoff_and_debt_are_visible_to_other_limiters(self):
+        first = RateLimiter("openrouter/model", rpm=60, shared=SharedQuota("openrouter", "sk-a", self.tmp.name))
+        second = RateLimiter("openrouter/model", rpm=60, shared=SharedQuota("openrouter", "sk-a", self.tmp.name))
+        other_key = RateLimiter("openrouter/model", rpm=60, shared=SharedQuota("openrouter", "sk-b", self.tmp.name))
+
+        for _ in range(60):
+            self.assertEqual(first._reserve(0), 0.0)
+        self.assertGreater(second._reserve(0), 0.5)
+        self.assertEqual(other_key._reserve(0), 0.0)
+
+        first.share_backoff(5)
+        self.assertGreater(second.blocked_for(), 4)
+        self.assertEqual(other_key.blocked_for(), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
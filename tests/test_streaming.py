@@ -0,0 +1,162 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from requests.exceptions import HTTPError as RequestsHTTPError
+
+from aicoder.llm.api_client import LLMClient
+from aicoder.llm.providers import OpenRouterApiAdapter
+from aicoder.strategies import SearchReplaceStrategy, UDiffStrategy
+from aicoder.strategies.stream_parsers import SearchReplaceStreamParser, UDiffStreamParser
+
+ORIGINAL = "<?php\nfunction a() {\n    return 1;\n}\n\nfunction b() {\n    return 2;\n}\n"
+
+SEARCH_REPLACE_RESPONSE = (
+    "<<<<<<< SEARCH\nfunction a() {\n=======\n/** Returns one */\nfunction a() {\n>>>>>>> REPLACE\n"
+    "<<<<<<< SEARCH\nfunction missing() {\n=======\n/** nope */\nfunction missing() {\n>>>>>>> REPLACE\n"
+    "<<<<<<< SEARCH\nfunction b() {\n=======\n/** Returns two */\nfunction b() {\n>>>>>>> REPLACE\n"
+)
+
+UDIFF_RESPONSE = (
+    "--- original.php\n+++ modified.php\n"
+    "@@ ... @@\n function a() {\n+    // ---- constant result\n     return 1;\n"
+    "@@ ... @@\n function b() {\n+    // ---- another constant\n     return 2;\n"
+)
+
+
+def pieces(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestStreamParsers(unittest.TestCase):
+    """Test cases for the incremental search/replace and udiff parsers."""
+
+    def test_search_replace_blocks_complete_as_soon_as_closed(self):
+        parser = SearchReplaceStreamParser()
+        completed_after = []
+        for i, piece in enumerate(pieces(SEARCH_REPLACE_RESPONSE)):
+            for block in parser.feed(piece):
+                completed_after.append(i)
+        completed_after += [None for _ in parser.finish()]
+
+        self.assertEqual(len(completed_after), 3)
+        self.assertLess(completed_after[0], len(pieces(SEARCH_REPLACE_RESPONSE)) - 1)
+
+    def test_udiff_hunks_and_fences(self):
+        parser = UDiffStreamParser()
+        hunks = []
+        for piece in pieces("Sure:\n```diff\n" + UDIFF_RESPONSE + "```\n- trailing prose\n"):
+            hunks += parser.feed(piece)
+        hunks += parser.finish()
+
+        self.assertEqual(len(hunks), 2)
+        self.assertEqual(hunks[0][1], "+    // ---- constant result\n")
+
+
+class TestStreamingStrategies(unittest.TestCase):
+    """Test cases for applying streamed responses."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "a.php"
+        self.path.write_text(ORIGINAL)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_search_replace_flags_missing_block_before_stream_ends(self):
+        consumed = []
+
+        def stream():
+            for piece in pieces(SEARCH_REPLACE_RESPONSE):
+                consumed.append(piece)
+                yield piece
+
+        warnings_at = []
+        with patch('aicoder.strategies.searchreplace_strategy.myLogger') as mock_logger:
+            mock_logger.warning.side_effect = lambda msg: warnings_at.append(len(consumed))
+            raw, temp_path = SearchReplaceStrategy().process_llm_stream(stream(), self.path)
+
+        self.assertEqual(raw, SEARCH_REPLACE_RESPONSE)
+        self.assertEqual(len(warnings_at), 1)
+        # the summary after applying does not repeat the block reported while streaming
+        with patch('aicoder.utils.search_replace.myLogger') as mock_logger:
+            SearchReplaceStrategy().process_llm_stream(iter(pieces(SEARCH_REPLACE_RESPONSE)), self.path)
+        self.assertEqual([c.args[0] for c in mock_logger.warning.call_args_list],
+                         ["Applied 2 of 3 search/replace blocks"])
+        self.assertLess(warnings_at[0], len(pieces(SEARCH_REPLACE_RESPONSE)))
+        modified = temp_path.read_text()
+        self.assertEqual(modified, SearchReplaceStrategy()._apply_search_replace_blocks(ORIGINAL, raw))
+        self.assertIn("/** Returns one */\nfunction a()", modified)
+        self.assertIn("/** Returns two */\nfunction b()", modified)
+
+    def test_udiff_stream_matches_batch_result(self):
+        raw, temp_path = UDiffStrategy().process_llm_stream(iter(pieces(UDIFF_RESPONSE)), self.path)
+        expected = UDiffStrategy().process_llm_response(UDIFF_RESPONSE, self.path).read_text()
+        self.assertEqual(temp_path.read_text(), expected)
+        self.assertIn("// ---- another constant", expected)
+
+
+class TestStreamingTransport(unittest.TestCase):
+    """Test cases for SSE parsing and retries before the first token."""
+
+    @patch.dict(os.environ, {"OPENROUTER_API_KEY": "sk-test"})
+    @patch('aicoder.llm.providers.openrouter.get_session')
+    def test_openrouter_sse_deltas(self, mock_get_session):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = [
+            ": OPENROUTER PROCESSING",
+            "",
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+            'data: {"choices": [{"delta": {"content": "lo"}}]}',
+            "data: [DONE]",
+        ]
+        mock_post = mock_get_session.return_value.post
+        mock_post.return_value = response
+
+        adapter = OpenRouterApiAdapter()
+        self.assertEqual(list(adapter.stream_completion("m", [])), ["Hel", "lo"])
+        self.assertTrue(json.loads(mock_post.call_args.kwargs["data"])["stream"])
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    @patch('aicoder.llm.api_client.time.sleep')
+    def test_rate_limit_before_first_token_is_retried(self, mock_sleep, mock_adapter_class):
+        mock_adapter = MagicMock()
+        mock_adapter_class.return_value = mock_adapter
+        error = RequestsHTTPError("429 Too Many Requests")
+        error.response = MagicMock(status_code=429)
+
+        def failing_stream(*args):
+            raise error
+            yield  # pragma: no cover
+
+        mock_adapter.stream_completion.side_effect = [failing_stream(), iter(["ok ", "done"])]
+
+        client = LLMClient("openai/test-model")
+        self.assertEqual(''.join(client.streamRequest("sys", "user")), "ok done")
+        mock_sleep.assert_called_once()
+
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    def test_abandoned_stream_releases_slot_without_feedback(self, mock_adapter_class):
+        mock_adapter_class.return_value.stream_completion.return_value = iter(["a", "b", "c"])
+        client = LLMClient("openai/abandoned-stream-model")
+        self.assertIsNotNone(client.rateLimiter)
+        concurrency = client.rateLimiter.concurrency
+
+        stream = client.streamRequest("sys", "user")
+        self.assertEqual(next(stream), "a")
+        with patch.object(client.rateLimiter, "on_success") as on_success, \
+                patch.object(client.rateLimiter, "release", wraps=client.rateLimiter.release) as release:
+            stream.close()
+        on_success.assert_not_called()
+        release.assert_called_once()
+        self.assertEqual(client.rateLimiter.concurrency, concurrency)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from requests.exceptions import HTTPError as RequestsHTTPError
+
+from aicoder.config import Config
+from aicoder.llm.api_client import LLMClient
+from aicoder.utils import tracing
+
+
+class TestTracing(unittest.TestCase):
+    """Test cases for tracing spans and their JSON lines export."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.trace_file = Path(self.tmp.name) / "trace.jsonl"
+        patcher = patch.object(Config, "TRACE_OUT", self.trace_file)
+        patcher.start()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(patcher.stop)
+        self.addCleanup(tracing.close)
+
+    def _spans(self):
+        return [json.loads(line) for line in self.trace_file.read_text().splitlines()]
+
+    def test_nested_spans_share_trace_and_link_parents(self):
+        with tracing.span("outer", file="a.php") as outer:
+            with tracing.span("inner"):
+                pass
+            tracing.record("measured", 1_000, 2_000, tokens=3)
+            outer.set(bytes=10)
+
+        inner, measured, outer = self._spans()
+        self.assertEqual({inner["traceId"], measured["traceId"]}, {outer["traceId"]})
+        self.assertEqual(inner["parentSpanId"], outer["spanId"])
+        self.assertEqual(measured["parentSpanId"], outer["spanId"])
+        self.assertNotIn("parentSpanId", outer)
+        self.assertEqual(measured["startTimeUnixNano"], "1000")
+        self.assertIn({"key": "tokens", "value": {"intValue": "3"}}, measured["attributes"])
+        self.assertIn({"key": "bytes", "value": {"intValue": "10"}}, outer["attributes"])
+        self.assertEqual(outer["status"], {"code": 1})
+
+    def test_exceptions_mark_span_as_error(self):
+        with self.assertRaises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+        self.assertEqual(self._spans()[0]["status"], {"code": 2, "message": "ValueError: boom"})
+
+    def test_nothing_is_written_without_trace_file(self):
+        with patch.object(Config, "TRACE_OUT", None):
+            with tracing.span("ignored") as ignored:
+                ignored.set(x=1)
+            tracing.record("ignored", 0)
+        self.assertFalse(self.trace_file.exists())
+
+    @patch.object(Config, "LLM_RATE_LIMIT_ENABLED", False)
+    @patch.object(Config, "LLM_RETRY_MIN_DELAY", 0.1)
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    @patch('aicoder.llm.api_client.time.sleep')
+    def test_llm_request_spans(self, mock_sleep, mock_adapter_class):
+        response = MagicMock(status_code=429)
+        rate_limit_error = RequestsHTTPError("429 Too Many Requests")
+        rate_limit_error.response = response
+        mock_adapter_class.return_value.create_completion.side_effect = [rate_limit_error, "documented"]
+
+        LLMClient("openai/test-model").sendRequest("system", "user prompt", verbose=False)
+
+        spans = {span["name"]: span for span in self._spans()}
+        self.assertEqual(set(spans), {"llm.request", "llm.queue_wait", "llm.completion", "llm.retry_sleep"})
+        request = spans["llm.request"]
+        attributes = {a["key"]: a["value"] for a in request["attributes"]}
+        self.assertEqual(attributes["model"], {"stringValue": "openai/test-model"})
+        self.assertEqual(attributes["attempts"], {"intValue": "2"})
+        self.assertEqual(spans["llm.retry_sleep"]["parentSpanId"], request["spanId"])
+
+    @patch.object(Config, "LLM_RATE_LIMIT_ENABLED", False)
+    @patch.object(Config, "LLM_RETRY_MIN_DELAY", 0.1)
+    @patch('aicoder.llm.api_client.OpenAIApiAdapter')
+    @patch('aicoder.llm.api_client.asyncio.sleep', new_callable=AsyncMock)
+    def test_async_request_has_the_same_spans(self, mock_sleep, mock_adapter_class):
+        rate_limit_error = RequestsHTTPError("429 Too Many Requests")
+        rate_limit_error.response = MagicMock(status_code=429)
+        mock_adapter_class.return_value.acreate_completion = AsyncMock(side_effect=[rate_limit_error, "documented"])
+
+        asyncio.run(LLMClient("openai/test-model").asendRequest("system", "user prompt", verbose=False))
+
+        spans = {span["name"]: span for span in self._spans()}
+        self.assertEqual(set(spans), {"llm.request", "llm.queue_wait", "llm.completion", "llm.retry_sleep"})
+        attributes = {a["key"]: a["value"] for a in spans["llm.request"]["attributes"]}
+        self.assertEqual(attributes["attempts"], {"intValue": "2"})
+        self.assertEqual(spans["llm.completion"]["parentSpanId"], spans["llm.request"]["spanId"])
+
+
+if __name__ == '__main__':
+    unittest.main()
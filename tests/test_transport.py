@@ -0,0 +1,50 @@
+import gzip
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from aicoder.config import Config
+from aicoder.llm import transport
+from aicoder.llm.providers import OpenAIApiAdapter
+
+
+class TestTransport(unittest.TestCase):
+    """Test cases for the shared HTTP sessions and SDK clients."""
+
+    def test_session_is_shared_per_base_url(self):
+        first = transport.get_session("https://one.example/api")
+        self.assertIs(first, transport.get_session("https://one.example/api"))
+        self.assertIsNot(first, transport.get_session("https://two.example/api"))
+        self.assertEqual(first.get_adapter("https://one.example/api")._pool_maxsize, Config.HTTP_POOL_SIZE)
+
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"})
+    def test_openai_adapters_reuse_one_client(self):
+        first = OpenAIApiAdapter()._get_client()
+        second = OpenAIApiAdapter()._get_client()
+        self.assertIs(first, second)
+        self.assertIsNot(first, OpenAIApiAdapter(base_url="https://api.deepseek.com")._get_client())
+        self.assertEqual(first.max_retries, 0)
+
+    @patch.object(Config, "HTTP_GZIP_MIN_BYTES", 100)
+    @patch.object(Config, "HTTP_GZIP_REQUESTS", True)
+    def test_large_bodies_are_gzipped_when_enabled(self):
+        small, headers = transport.encode_json_body({"x": "y"})
+        self.assertNotIn("Content-Encoding", headers)
+
+        data = {"messages": [{"role": "user", "content": "x" * 500}]}
+        body, headers = transport.encode_json_body(data)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(body)), data)
+
+    @patch.object(Config, "HTTP_PREWARM", True)
+    @patch('aicoder.llm.transport.threading.Thread')
+    def test_prewarm_runs_once_per_host(self, mock_thread):
+        transport.prewarm("https://prewarm.example/api")
+        transport.prewarm("https://prewarm.example/api")
+        mock_thread.assert_called_once()
+        mock_thread.return_value.start.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
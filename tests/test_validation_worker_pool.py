@@ -0,0 +1,112 @@
+import sys
+import tempfile
+import textwrap
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from aicoder.config import Config
+from aicoder.validation.worker_pool import ValidationWorkerError, ValidationWorkerPool
+
+# Stand-in for `php compare-*.php --worker`: same JSON-lines protocol, compares
+# sources after dropping `#` comment lines
+FAKE_WORKER = textwrap.dedent("""
+    import json, os, sys, time
+
+    def clean(source):
+        return [line for line in source.splitlines() if not line.lstrip().startswith('#')]
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get('crash'):
+            sys.exit(3)
+        if any(isinstance(pair, dict) and pair.get('hang') for pair in request.get('pairs', [])):
+            time.sleep(30)
+        results = [{'normalized': '\\n'.join(clean(source))} for source in request.get('normalize', [])]
+        for pair in request.get('pairs', []):
+            if isinstance(pair, dict) and 'normalized_original' in pair:
+                results.append({'equal': pair['normalized_original'] == '\\n'.join(clean(pair['modified']))})
+                continue
+            if isinstance(pair, dict):
+                a, b = pair['original'], pair['modified']
+            else:
+                a, b = (open(p).read() for p in pair)
+            results.append({'equal': clean(a) == clean(b), 'pid': os.getpid()})
+        print(json.dumps({'id': request['id'], 'results': results}), flush=True)
+""")
+
+
+class TestValidationWorkerPool(unittest.TestCase):
+    """Test cases for the persistent comparator worker pool."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        script = Path(self.tmp.name) / "worker.py"
+        script.write_text(FAKE_WORKER)
+        self.pool = ValidationWorkerPool([sys.executable, str(script)], size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = Path(self.tmp.name) / name
+        path.write_text(content)
+        return path
+
+    def test_batch_of_file_pairs_in_one_round_trip(self):
+        original = self._write("a.php", "code\n")
+        commented = self._write("b.php", "# doc\ncode\n")
+        changed = self._write("c.php", "other\n")
+
+        verdicts = self.pool.compare_many([(original, commented), (original, changed)])
+
+        self.assertEqual(verdicts, [True, False])
+        self.assertTrue(self.pool.compare_contents("x", "# c\nx"))
+
+    def test_normalize_and_compare_against_normalized_original(self):
+        normalized = self.pool.normalize("# doc\ncode\nmore\n")
+        self.assertEqual(normalized, "code\nmore")
+        self.assertTrue(self.pool.compare_normalized(normalized, "code\n# note\nmore\n"))
+        self.assertFalse(self.pool.compare_normalized(normalized, "code\n"))
+
+    def test_workers_are_reused_and_bounded(self):
+        pairs = [{"original": "x", "modified": "# c\nx"}] * 20
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            verdicts = list(executor.map(lambda pair: self.pool.compare_many([pair])[0], pairs))
+
+        self.assertTrue(all(verdicts))
+        self.assertLessEqual(self.pool._spawned, 2)
+
+    def test_dead_worker_raises_and_is_replaced(self):
+        worker = self.pool._acquire()
+        worker.process.stdin.write('{"id": 1, "pairs": [], "crash": true}\n')
+        worker.process.stdin.flush()
+        worker.process.wait(timeout=5)
+        self.pool._release(worker)
+
+        with self.assertRaises(ValidationWorkerError):
+            self.pool.compare_contents("x", "x")
+        self.assertTrue(self.pool.compare_contents("x", "x"))
+
+    def test_waiter_gets_a_replacement_when_the_busy_worker_dies(self):
+        pool = ValidationWorkerPool(self.pool.command, size=1)
+        self.addCleanup(pool.close)
+        worker = pool._acquire()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            waiting = executor.submit(pool.compare_contents, "x", "# c\nx")
+            worker.process.kill()
+            worker.process.wait(timeout=5)
+            pool._discard(worker)
+            self.assertTrue(waiting.result(timeout=5))
+
+    def test_stuck_worker_times_out(self):
+        with patch.object(Config, "VALIDATION_WORKER_TIMEOUT", 0.5):
+            with self.assertRaisesRegex(ValidationWorkerError, "did not answer"):
+                self.pool.compare_many([{"original": "x", "modified": "x", "hang": True}])
+        self.assertTrue(self.pool.compare_contents("x", "x"))
+
+
+if __name__ == '__main__':
+    unittest.main()
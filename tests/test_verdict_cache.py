@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from aicoder.config import Config
+from aicoder.core.processor import _run_comparator
+from aicoder.validation.verdict_cache import (_normalized, clear_validation_caches, content_hash, get_normalized,
+                                             prefetch_normalized)
+
+ORIGINAL = "<?php\n$a = 1;\n"
+
+
+class TestVerdictCache(unittest.TestCase):
+    """Test cases for cached verdicts and originals normalized ahead of validation."""
+
+    def setUp(self):
+        clear_validation_caches()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original = Path(self.tmp.name) / "a.php"
+        self.modified = Path(self.tmp.name) / "b.php"
+        self.original.write_text(ORIGINAL)
+        self.pool = MagicMock()
+        self.pool.normalize.return_value = "$a = 1;"
+        self.pool.compare_normalized.return_value = True
+        patcher = patch("aicoder.validation.verdict_cache.get_worker_pool", return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    @patch.object(Config, "VALIDATION_FAST_PATH", False)
+    @patch("aicoder.core.processor.get_worker_pool")
+    def test_prefetched_original_and_cached_verdict(self, mock_get_pool):
+        mock_get_pool.return_value = self.pool
+        prefetch_normalized(ORIGINAL, ".php")
+        prefetch_normalized(ORIGINAL, ".php")
+        self.assertEqual(get_normalized(ORIGINAL), "$a = 1;")
+        self.pool.normalize.assert_called_once_with(ORIGINAL)
+
+        self.modified.write_text("<?php\n// one\n$a = 1;\n")
+        self.assertTrue(_run_comparator(Path("unused.php"), self.original, self.modified))
+        self.assertTrue(_run_comparator(Path("unused.php"), self.original, self.modified))
+        self.pool.compare_normalized.assert_called_once_with("$a = 1;", "<?php\n// one\n$a = 1;\n")
+        self.pool.compare.assert_not_called()
+
+    def test_failed_normalization_is_retried(self):
+        self.pool.normalize.side_effect = [RuntimeError("worker crashed"), "$a = 1;"]
+        prefetch_normalized(ORIGINAL, ".php")
+        self.assertIsNone(get_normalized(ORIGINAL))
+        self.assertIsNone(_normalized.get(content_hash(ORIGINAL)))
+
+        prefetch_normalized(ORIGINAL, ".php")
+        self.assertEqual(get_normalized(ORIGINAL), "$a = 1;")
+
+    @patch.object(Config, "VALIDATION_FAST_PATH", True)
+    @patch("aicoder.core.processor.get_worker_pool")
+    def test_fast_path_verdict_drops_the_prefetch(self, mock_get_pool):
+        mock_get_pool.return_value = self.pool
+        prefetch_normalized(ORIGINAL, ".php")
+        self.modified.write_text("<?php\n// one\n$a = 1;\n")
+        self.assertTrue(_run_comparator(Path("unused.php"), self.original, self.modified))
+        self.assertIsNone(_normalized.get(content_hash(ORIGINAL)))
+        self.pool.compare_normalized.assert_not_called()
+
+    def test_twig_is_not_prefetched(self):
+        prefetch_normalized("{{ a }}", ".twig")
+        self.assertIsNone(get_normalized("{{ a }}"))
+        self.pool.normalize.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()